@@ -9,13 +9,26 @@ from typing import List, Optional
 from fastapi import APIRouter, Query
 
 from ..config import (
+    get_fast_distance_enabled,
+    get_fast_distance_max_m,
+    get_nearby_index,
+    get_nearby_max_candidates,
     get_nearby_radius_m,
     get_presence_ttl_min,
     get_proximity_weight,
+    get_tile_grid,
     get_tile_size_m,
     get_trust_weight,
 )
-from ..geo import haversine_meters, lat_lng_to_tile, proximity_band, proximity_band_score
+from ..geo import (
+    FastDistance,
+    RadiusFilter,
+    lat_lng_to_tile_key,
+    proximity_band,
+    proximity_band_from_squared,
+    proximity_band_score,
+    tile_key_to_str,
+)
 from ..models import LocationUpdateRequest, LocationUpdateResponse, PresenceCard
 from ..repo import repo
 
@@ -45,7 +58,8 @@ async def update_location(request: LocationUpdateRequest):
     userId = "user_placeholder"  # TODO: Get from auth claims
     
     now = int(time.time())
-    geo = lat_lng_to_tile(request.lat, request.lng, get_tile_size_m())
+    tile_key = lat_lng_to_tile_key(request.lat, request.lng, get_tile_size_m(), get_tile_grid())
+    geo = tile_key_to_str(tile_key)  # Public identifier only
     
     # Store presence (precise coordinates stored server-side only)
     repo.save_user_presence(
@@ -57,6 +71,7 @@ async def update_location(request: LocationUpdateRequest):
         geo=geo,
         now=now,
         rating=None,  # TODO: Get from user profile if helper
+        tile_key=tile_key,
     )
     
     return LocationUpdateResponse(geo=geo, lastSeenAt=now)
@@ -77,6 +92,8 @@ async def get_nearby_network(
     - Never returns exact distances
     - Only returns proximity bands (e.g., "100-250")
     - Only returns coarse grid identifiers
+    - Only returns presence within the radius (bounding-box prefilter,
+      then exact distance)
     
     Args:
         role: Filter by "helper" or "requester"
@@ -98,12 +115,19 @@ async def get_nearby_network(
     ttl_min = get_presence_ttl_min()
     now = int(time.time())
     
-    # Get caller's geo and neighbors
-    caller_geo = lat_lng_to_tile(caller_lat, caller_lng, get_tile_size_m())
-    neighbor_geos = repo.get_neighbor_geos(caller_geo, radius)
-    
-    # Fetch active presence in neighbor geos
-    presence_list = repo.get_active_presence_in_geos(neighbor_geos, now, ttl_min)
+    if get_nearby_index() == "quadtree":
+        # Walk the adaptive quadtree: coarse cells where sparse, fine where dense
+        presence_list = repo.get_active_presence_near(
+            caller_lat, caller_lng, radius, now, ttl_min, get_nearby_max_candidates()
+        )
+    else:
+        # Get the tiles intersecting the search circle (packed int keys)
+        covering = repo.get_covering_tiles(
+            caller_lat, caller_lng, radius, get_tile_size_m(), get_tile_grid()
+        )
+        
+        # Fetch active presence in those tiles
+        presence_list = repo.get_active_presence_in_tiles(covering.tiles, now, ttl_min)
     
     # Filter by role
     filtered = [p for p in presence_list if p["role"] == role]
@@ -112,16 +136,23 @@ async def get_nearby_network(
     w_proximity = get_proximity_weight()
     w_trust = get_trust_weight()
     
+    # Drop candidates outside the radius (bounding box first, exact distance
+    # only for survivors) and map distances to proximity bands. Distances
+    # are computed server-side and never exposed to the client.
+    fast = None
+    to_band = proximity_band
+    if get_fast_distance_enabled():
+        fast = FastDistance(caller_lat, caller_lng, get_fast_distance_max_m())
+        to_band = proximity_band_from_squared
+    result = RadiusFilter(caller_lat, caller_lng, radius, fast).filter(
+        [p["lat"] for p in filtered],
+        [p["lng"] for p in filtered],
+    )
+    filtered = [filtered[i] for i in result.indices]
+    bands = [to_band(dist) for dist in result.distances]
+    
     scored_cards = []
-    for presence in filtered:
-        # Compute distance server-side (never exposed to client)
-        dist_m = haversine_meters(
-            caller_lat, caller_lng,
-            presence["lat"], presence["lng"]
-        )
-        
-        # Map to proximity band (privacy-first)
-        band = proximity_band(dist_m)
+    for presence, band in zip(filtered, bands):
         band_score = proximity_band_score(band)
         
         # Calculate composite score
@@ -132,7 +163,6 @@ async def get_nearby_network(
             "presence": presence,
             "score": score,
             "band": band,
-            "dist_m": dist_m,  # Server-side only
         })
     
     # Sort by score descending
@@ -3,18 +3,60 @@ API routes for matching requests with helpers.
 Protected by Auth0 authentication.
 """
 
-from typing import Dict, List
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Literal, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from ..assignment import assign_helpers
 from ..auth0_verify import verify_auth0_token
-from ..config import get_match_weights, get_top_k
-from ..matching import rank_helpers
-from ..storage import get_helpers_near, get_request, record_match_attempt
+from ..config import (
+    get_assign_max_edges_per_request,
+    get_assign_radius_m,
+    get_geohash_precision,
+    get_match_pruning_enabled,
+    get_match_stream_heartbeat_s,
+    get_match_stream_max_s,
+    get_match_weights,
+    get_storage_backend,
+    get_top_k,
+    get_vector_rank_threshold,
+)
+from ..geo import geohash_rings_for_radius, get_geohash_for_point
+from ..incremental import diff_candidates, incremental_matcher
+from ..match_cache import MatchCache, match_cache_key
+from ..matching import (
+    RankedCandidate,
+    inventory_mask,
+    inventory_products,
+    product_mask,
+    rank_helpers,
+    rank_helpers_bounded,
+)
+from ..pubsub import tile_broker
+from ..storage import (
+    HelperCell,
+    get_helper_cells,
+    get_helper_rings,
+    get_helpers_near,
+    get_match_versions,
+    get_request,
+    iter_helper_cells,
+    nearest_helpers,
+    record_match_attempt,
+    record_match_attempts,
+    update_helper_inventory,
+)
 
 router = APIRouter(prefix="/match", tags=["matching"])
 
+# Ranked /match results, served again while their cells are unchanged
+_match_cache = MatchCache()
+
 
 class MatchRequest(BaseModel):
     """Request body for /match endpoint."""
@@ -41,6 +83,51 @@ class MatchResponse(BaseModel):
     config: MatchConfig
 
 
+class MatchBatchRequest(BaseModel):
+    """Request body for /match/batch endpoint."""
+    requestIds: List[str]
+    # "rank": top K per request; "assign": at most one helper per request,
+    # no helper proposed to two requests
+    mode: Literal["rank", "assign"] = "rank"
+
+
+class MatchBatchResult(BaseModel):
+    """Ranked candidates for one request of a batch."""
+    requestId: str
+    found: bool  # False if the request ID does not exist
+    candidates: List[CandidateResponse]
+
+
+class MatchBatchResponse(BaseModel):
+    """Response from /match/batch endpoint, in request order."""
+    results: List[MatchBatchResult]
+    config: MatchConfig
+
+
+class InventoryUpdate(BaseModel):
+    """Request body for the helper inventory endpoint."""
+    products: List[Literal["pad", "tampon", "liner"]]
+
+
+class InventoryResponse(BaseModel):
+    """Helper inventory after an update."""
+    helperId: str
+    products: List[str]
+
+
+def _to_candidates(ranked: List[Dict]) -> List[CandidateResponse]:
+    """Format ranked candidates for the response."""
+    return [
+        CandidateResponse(
+            helperId=c["id"],
+            score=c["score"],
+            distM=c["distM"],
+            rating=c["rating"],
+        )
+        for c in ranked
+    ]
+
+
 @router.post("", response_model=MatchResponse)
 async def match_helpers(
     match_req: MatchRequest,
@@ -57,6 +144,14 @@ async def match_helpers(
     3. Rank helpers by composite score (urgency + proximity + trust)
     4. Return top K candidates with scores and metadata
     
+    With MATCH_PRUNING (default), steps 2-3 run as branch and bound over
+    geohash cells, nearest first: cells whose best possible score cannot
+    reach the current top K are never loaded or scored.
+    
+    Steps 2-3 are skipped when a cached result exists for the same request
+    and configuration and neither the request nor any geohash cell that
+    search visited has been written since (see `MatchCache`).
+    
     Args:
         match_req: Request body with requestId
         claims: Auth0 token claims (from dependency)
@@ -75,37 +170,47 @@ async def match_helpers(
             detail=f"Request {match_req.requestId} not found"
         )
     
-    # Load candidate helpers (coarse geo filtering)
-    # In production, this uses Firestore geohash queries
-    helpers = get_helpers_near(request["lat"], request["lng"])
+    # Get matching configuration
+    weights = get_match_weights()
+    top_k = get_top_k()
+    pruning = get_match_pruning_enabled()
+    
+    # Re-polls are served from the cache until a visited cell changes
+    cache_key = match_cache_key(match_req.requestId, weights, top_k, pruning)
+    
+    def versions(cells):
+        return get_match_versions(match_req.requestId, cells)
     
-    if not helpers:
+    ranked = _match_cache.get(cache_key, versions)
+    
+    if ranked is None:
+        # Only helpers carrying the requested product are loaded and scored
+        need = product_mask(request.get("productNeed"))
+        visited: List[str] = []
+        if pruning:
+            # Load and rank cell by cell, nearest first, pruning hopeless cells
+            cells = iter_helper_cells(request["lat"], request["lng"], need=need, visited=visited)
+            ranked = rank_helpers_bounded(request, cells, weights, top_k).candidates
+        else:
+            # Load candidate helpers (coarse geo filtering)
+            # In production, this uses Firestore geohash queries
+            helpers = get_helpers_near(request["lat"], request["lng"], need=need, visited=visited)
+            ranked = rank_helpers(request, helpers, weights, top_k, get_vector_rank_threshold())
+        # No await since the search, so no write can land in between
+        _match_cache.put(cache_key, visited, versions(visited), ranked)
+    
+    if not ranked:
         # Return empty result gracefully
         return MatchResponse(
             candidates=[],
             config=MatchConfig(
-                weights=get_match_weights(),
-                topK=get_top_k(),
+                weights=weights,
+                topK=top_k,
             )
         )
     
-    # Get matching configuration
-    weights = get_match_weights()
-    top_k = get_top_k()
-    
-    # Rank helpers
-    ranked = rank_helpers(request, helpers, weights, top_k)
-    
     # Format response
-    candidates = [
-        CandidateResponse(
-            helperId=c["id"],
-            score=c["score"],
-            distM=c["distM"],
-            rating=c["rating"],
-        )
-        for c in ranked
-    ]
+    candidates = _to_candidates(ranked)
     
     # Record match attempt (for analytics/demo)
     record_match_attempt(
@@ -122,3 +227,322 @@ async def match_helpers(
         )
     )
 
+
+@router.put("/helpers/{helperId}/inventory", response_model=InventoryResponse)
+async def set_helper_inventory(
+    helperId: str,
+    update: InventoryUpdate,
+    claims: Dict = Depends(verify_auth0_token)
+):
+    """
+    Set the products a helper carries.
+    
+    Protected by Auth0 - requires valid Bearer token.
+    
+    Only the inventory bitmask and its index entries change; the helper's
+    location and other fields are left as they are. Matching skips helpers
+    that do not carry a request's productNeed before scoring them.
+    
+    Args:
+        helperId: Helper ID
+        update: Request body with the carried products
+        claims: Auth0 token claims (from dependency)
+    
+    Returns:
+        InventoryResponse with the stored products
+    
+    Raises:
+        HTTPException: 404 if helper not found
+    """
+    helper = update_helper_inventory(helperId, inventory_mask(update.products))
+    if helper is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Helper {helperId} not found"
+        )
+    return InventoryResponse(helperId=helperId, products=inventory_products(helper["inventory"]))
+
+
+@router.get("/cache/stats")
+async def get_match_cache_stats(claims: Dict = Depends(verify_auth0_token)):
+    """
+    Get /match result cache counters (hits, misses, stale, hitRate, size).
+    
+    Protected by Auth0 - requires valid Bearer token.
+    """
+    return _match_cache.stats()
+
+
+@router.post("/batch", response_model=MatchBatchResponse)
+async def match_helpers_batch(
+    batch_req: MatchBatchRequest,
+    claims: Dict = Depends(verify_auth0_token)
+):
+    """
+    Match many requests with nearby helpers in one call.
+    
+    Protected by Auth0 - requires valid Bearer token.
+    
+    Helper lookups are shared: with pruning, each cell's helpers are read
+    at most once per product need and reused by every request whose
+    search reaches that cell; without it, requests in the same geohash
+    cell and product need share one ring search (with SQLite, each request
+    runs its own R*Tree search, as /match does). Each request is ranked
+    exactly as /match would rank it.
+    
+    In "assign" mode the batch is solved as one global assignment instead
+    (see `assign_helpers`): each request gets at most one candidate and no
+    helper is proposed to more than one request.
+    
+    Args:
+        batch_req: Request body with requestIds
+        claims: Auth0 token claims (from dependency)
+    
+    Returns:
+        MatchBatchResponse with one result per requestId, in request order;
+        unknown IDs come back with found=False and no candidates
+    """
+    weights = get_match_weights()
+    top_k = get_top_k()
+    if batch_req.mode == "assign":
+        return _assign_batch(batch_req.requestIds, weights, top_k)
+    
+    pruning = get_match_pruning_enabled()
+    threshold = get_vector_rank_threshold()
+    precision = get_geohash_precision()
+    # SQLite radius searches come back in exact distance order, so they are not shared
+    share_rings = get_storage_backend() != "sqlite"
+    
+    # Shared lookups: per product need, cell -> helpers (pruning), or per
+    # (geohash cell, product need), the ring search (no pruning)
+    cell_helpers: Dict[int, Dict[str, List[Dict]]] = {}
+    lookups: Dict[Tuple[str, int], List[HelperCell]] = {}
+    
+    results = []
+    attempts = []
+    for request_id in batch_req.requestIds:
+        request = get_request(request_id)
+        if not request:
+            results.append(MatchBatchResult(requestId=request_id, found=False, candidates=[]))
+            continue
+        
+        lat, lng = request["lat"], request["lng"]
+        need = product_mask(request.get("productNeed"))
+        
+        if pruning:
+            cache = cell_helpers.setdefault(need, {})
+            cells = iter_helper_cells(lat, lng, need=need, cache=cache)
+            ranked = rank_helpers_bounded(request, cells, weights, top_k).candidates
+        elif not share_rings:
+            helpers = get_helpers_near(lat, lng, need=need)
+            ranked = rank_helpers(request, helpers, weights, top_k, threshold)
+        else:
+            key = (get_geohash_for_point(lat, lng, precision), need)
+            lookup = lookups.get(key)
+            if lookup is None:
+                lookup = lookups[key] = get_helper_rings(lat, lng, need=need)
+            helpers = nearest_helpers(lat, lng, lookup)
+            ranked = rank_helpers(request, helpers, weights, top_k, threshold)
+        
+        candidates = _to_candidates(ranked)
+        results.append(MatchBatchResult(requestId=request_id, found=True, candidates=candidates))
+        if candidates:
+            attempts.append((request_id, [c.dict() for c in candidates]))
+    
+    # Record match attempts (for analytics/demo)
+    record_match_attempts(attempts, {"weights": weights, "topK": top_k})
+    
+    return MatchBatchResponse(
+        results=results,
+        config=MatchConfig(
+            weights=weights,
+            topK=top_k,
+        )
+    )
+
+
+def _assign_batch(request_ids: List[str], weights: Dict[str, float], top_k: int) -> MatchBatchResponse:
+    """Solve /match/batch in "assign" mode."""
+    precision = get_geohash_precision()
+    radius_m = get_assign_radius_m()
+    
+    # Candidate helpers: union of the cells within the assignment radius of each request
+    requests = []
+    helpers: Dict[str, Dict] = {}
+    searched = set()
+    for request_id in dict.fromkeys(request_ids):
+        request = get_request(request_id)
+        if not request:
+            continue
+        requests.append(request)
+        cell = get_geohash_for_point(request["lat"], request["lng"], precision)
+        if cell not in searched:
+            searched.add(cell)
+            rings = geohash_rings_for_radius(cell, radius_m)
+            for helper_cell in get_helper_cells(request["lat"], request["lng"], rings=rings):
+                for helper in helper_cell.helpers:
+                    helpers[helper["id"]] = helper
+    
+    max_edges = get_assign_max_edges_per_request()
+    result = assign_helpers(requests, list(helpers.values()), weights, radius_m, max_edges)
+    
+    results = []
+    attempts = []
+    for request_id in request_ids:
+        if request_id not in result.assignments:
+            results.append(MatchBatchResult(requestId=request_id, found=False, candidates=[]))
+            continue
+        assigned = result.assignments[request_id]
+        candidates = _to_candidates([assigned] if assigned else [])
+        results.append(MatchBatchResult(requestId=request_id, found=True, candidates=candidates))
+        if candidates:
+            attempts.append((request_id, [c.dict() for c in candidates]))
+    
+    # Record match attempts (for analytics/demo)
+    record_match_attempts(attempts, {"weights": weights, "topK": top_k, "mode": "assign"})
+    
+    return MatchBatchResponse(
+        results=results,
+        config=MatchConfig(
+            weights=weights,
+            topK=top_k,
+        )
+    )
+
+
+@router.get("/{requestId}/candidates", response_model=MatchResponse)
+async def get_incremental_candidates(
+    requestId: str,
+    claims: Dict = Depends(verify_auth0_token)
+):
+    """
+    Get the incrementally maintained top K for a request.
+    
+    Protected by Auth0 - requires valid Bearer token.
+    
+    Candidates are kept up to date as helpers are created, move, or change
+    availability (see `IncrementalMatcher`), so this is an O(K) read with no
+    helper lookup or ranking. Helpers reported through presence updates are
+    included alongside stored helpers until their presence expires
+    (PRESENCE_TTL_MIN).
+    
+    Args:
+        requestId: Request ID
+        claims: Auth0 token claims (from dependency)
+    
+    Returns:
+        MatchResponse with ranked candidates and config
+    
+    Raises:
+        HTTPException: 404 if request not found
+    """
+    weights = get_match_weights()
+    top_k = get_top_k()
+    _track(requestId, weights, top_k)
+    
+    return MatchResponse(
+        candidates=_to_candidates(incremental_matcher.candidates(requestId)),
+        config=MatchConfig(
+            weights=weights,
+            topK=top_k,
+        )
+    )
+
+
+@router.get("/{requestId}/stream")
+async def stream_match(
+    requestId: str,
+    claims: Dict = Depends(verify_auth0_token)
+):
+    """
+    Stream a request's top K over Server-Sent Events.
+    
+    Protected by Auth0 - requires valid Bearer token.
+    
+    Replaces polling /match: the stream opens with a "snapshot" event
+    holding the current candidates, then sends a "diff" event (see
+    `diff_candidates`) only when a helper change in one of the request's
+    geohash cells actually changes its top K. Changes arrive through the
+    tile pub/sub (`tile_broker`), so idle streams cost nothing; a keep-alive
+    comment is sent every MATCH_STREAM_HEARTBEAT_S seconds. The stream
+    ends after MATCH_STREAM_MAX_S seconds and clients reconnect.
+    
+    Args:
+        requestId: Request ID
+        claims: Auth0 token claims (from dependency)
+    
+    Returns:
+        text/event-stream response
+    
+    Raises:
+        HTTPException: 404 if request not found
+    """
+    _track(requestId, get_match_weights(), get_top_k())
+    return StreamingResponse(
+        _match_events(requestId, get_match_stream_heartbeat_s(), get_match_stream_max_s()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+def _track(request_id: str, weights: Dict[str, float], top_k: int) -> None:
+    """Make sure the incremental matcher tracks a request, or raise 404."""
+    incremental_matcher.evict()
+    incremental_matcher.configure(weights, top_k)
+    if incremental_matcher.is_tracked(request_id):
+        return
+    request = get_request(request_id)
+    if not request:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Request {request_id} not found"
+        )
+    incremental_matcher.track_request(request)
+
+
+async def _match_events(request_id: str, heartbeat_s: float, max_s: float) -> AsyncIterator[str]:
+    """Yield the SSE snapshot, then diffs as the request's cells change."""
+    subscription = tile_broker.subscribe(incremental_matcher.search_cells(request_id))
+    try:
+        current = incremental_matcher.candidates(request_id) or []
+        yield _sse("snapshot", {"requestId": request_id, "candidates": _candidate_dicts(current)})
+        
+        deadline = time.monotonic() + max_s
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(subscription.wait(), min(heartbeat_s, remaining))
+            except asyncio.TimeoutError:
+                # Keep the request tracked while streaming; drop expired helpers
+                incremental_matcher.touch(request_id)
+                incremental_matcher.evict()
+                yield ": keep-alive\n\n"
+                continue
+            
+            latest = incremental_matcher.candidates(request_id)
+            if latest is None:
+                return  # No longer tracked
+            diff = diff_candidates(current, latest)
+            if any(diff.values()):
+                current = latest
+                yield _sse("diff", {
+                    "requestId": request_id,
+                    "entered": _candidate_dicts(diff["entered"]),
+                    "left": diff["left"],
+                    "updated": _candidate_dicts(diff["updated"]),
+                    "order": diff["order"],
+                })
+    finally:
+        tile_broker.unsubscribe(subscription)
+
+
+def _candidate_dicts(ranked: List[RankedCandidate]) -> List[Dict]:
+    """Convert ranked candidates to the JSON dicts sent in SSE events."""
+    return [c.dict() for c in _to_candidates(ranked)]
+
+
+def _sse(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
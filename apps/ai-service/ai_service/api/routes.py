@@ -2,22 +2,62 @@
 FastAPI routes and application setup.
 """
 
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from .. import storage
 from ..config import get_cors_origins
+from ..repo import repo
 from ..core.service import classify_message
+from ..write_behind import WriteBehindFull
 from .models import ClassifyRequest, ClassifyResponse
 from .matching import router as matching_router
 from .geo import router as geo_router
 from .venues import router as venues_router
 from .chat import router as chat_router
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the stores and run background persistence while serving.
+    
+    Importing the app reads no data: the stores are loaded here, on a worker
+    thread so the event loop stays free, and the app serves requests (and
+    reports healthy) only once the load is done. A failed load is logged
+    and aborts startup. Writes are persisted write-behind and the storage
+    log is compacted in the background; on shutdown every queued write is
+    flushed, then the log is compacted once more.
+    """
+    try:
+        await asyncio.to_thread(storage.init_storage)
+    except Exception:
+        logger.exception("Loading storage failed")
+        raise
+    storage.start_write_behind()
+    repo.start_write_behind()
+    storage.start_compactor()
+    try:
+        yield
+    finally:
+        repo.stop_write_behind()
+        storage.stop_write_behind()
+        storage.stop_compactor()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Service",
     description="Message classification service with urgency detection and empathy responses",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Enable CORS for development
@@ -36,6 +76,22 @@ app.include_router(venues_router)
 app.include_router(chat_router)
 
 
+@app.exception_handler(WriteBehindFull)
+async def write_queue_full(request: Request, exc: WriteBehindFull) -> JSONResponse:
+    """
+    Answer 503 when persistence is too far behind to accept a write.
+    
+    The write was not applied, so the client can retry it; handlers never
+    wait for queue space on the event loop.
+    """
+    logger.warning("Rejected write: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many pending writes, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.post("/classify", response_model=ClassifyResponse)
 async def classify(request: ClassifyRequest) -> ClassifyResponse:
     """
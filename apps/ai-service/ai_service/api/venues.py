@@ -8,8 +8,22 @@ from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Path, Query, status
 
-from ..config import get_nearby_radius_m, get_stock_ttl_hours, get_tile_size_m
-from ..geo import haversine_meters, lat_lng_to_tile, proximity_band
+from ..config import (
+    get_fast_distance_enabled,
+    get_fast_distance_max_m,
+    get_nearby_index,
+    get_nearby_max_candidates,
+    get_nearby_radius_m,
+    get_stock_ttl_hours,
+    get_tile_grid,
+    get_tile_size_m,
+)
+from ..geo import (
+    FastDistance,
+    RadiusFilter,
+    proximity_band,
+    proximity_band_from_squared,
+)
 from ..models import (
     StockReportRequest,
     Venue,
@@ -98,7 +112,9 @@ async def get_nearby_venues(
     
     Privacy-first:
     - Server computes neighbor grids from provided lat/lng
-    - Filters by radius using Haversine (server-side)
+    - Filters by radius (server-side): a lat/lng bounding box first, then
+      Haversine, or squared equirectangular distance when FAST_DISTANCE
+      is enabled
     - Returns only coarse grid, not precise coordinates
     - Returns proximity bands, not exact distances
     
@@ -112,27 +128,43 @@ async def get_nearby_venues(
     """
     radius = radiusM or get_nearby_radius_m()
     
-    # Get search center geo and neighbors
-    center_geo = lat_lng_to_tile(lat, lng, get_tile_size_m())
-    neighbor_geos = repo.get_neighbor_geos(center_geo, radius)
-    
-    # Fetch venues in neighbor geos
-    venues = repo.list_venues_in_geos(neighbor_geos)
-    
-    # Filter by radius using Haversine (server-side)
-    filtered_venues = []
-    for venue in venues:
-        dist_m = haversine_meters(lat, lng, venue.lat, venue.lng)
-        if dist_m <= radius:
-            filtered_venues.append((venue, dist_m))
+    if get_nearby_index() == "quadtree":
+        # Walk the adaptive quadtree; every candidate gets the radius check
+        inside_venues = []
+        edge_venues = repo.list_venues_near(lat, lng, radius, get_nearby_max_candidates())
+    else:
+        # Get the tiles intersecting the search circle (packed int keys)
+        covering = repo.get_covering_tiles(lat, lng, radius, get_tile_size_m(), get_tile_grid())
+        
+        # Venues in fully-inside tiles are within the radius by construction;
+        # only venues in edge tiles need the radius check
+        inside_venues = repo.list_venues_in_tiles(covering.inside)
+        edge_venues = repo.list_venues_in_tiles(covering.edge)
+    venues = inside_venues + edge_venues
+    
+    # Filter by radius (server-side, one batch): a bounding-box reject
+    # stage runs before any trig. Fast mode works on squared meters
+    # throughout: radius, sort order and bands need no sqrt.
+    fast = None
+    to_band = proximity_band
+    if get_fast_distance_enabled():
+        fast = FastDistance(lat, lng, get_fast_distance_max_m())
+        to_band = proximity_band_from_squared
+    radius_filter = RadiusFilter(lat, lng, radius, fast)
+    result = radius_filter.filter(
+        [v.lat for v in venues],
+        [v.lng for v in venues],
+        trusted=len(inside_venues),
+    )
+    filtered_venues = [(venues[i], dist) for i, dist in zip(result.indices, result.distances)]
     
     # Sort by distance
     filtered_venues.sort(key=lambda x: x[1])
     
     # Build response cards (privacy-first: no precise coordinates)
     cards = []
-    for venue, dist_m in filtered_venues:
-        band = proximity_band(dist_m)
+    for venue, dist in filtered_venues:
+        band = to_band(dist)
         card = VenueCard(
             id=venue.id,
             name=venue.name,
@@ -0,0 +1,235 @@
+"""
+Global helper assignment across concurrent requests.
+Solves one min-cost matching over a batch instead of ranking each request
+independently, so every helper is proposed to at most one request.
+"""
+
+import heapq
+import math
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .config import get_geohash_precision
+from .geo import RadiusFilter, geohash_neighbors, geohash_rings_for_radius, get_geohash_for_point
+from .matching import (
+    Helper,
+    RankedCandidate,
+    Request,
+    can_supply,
+    product_mask,
+    score_from_distance,
+    urgency_level,
+)
+
+
+class AssignmentResult(NamedTuple):
+    """Result of a global assignment."""
+    assignments: Dict[str, Optional[RankedCandidate]]  # requestId -> helper (None = unassigned)
+    total_score: float  # Sum of assigned scores
+    edges: int  # Request-helper pairs within the radius
+
+
+def assign_helpers(
+    requests: List[Request],
+    helpers: List[Helper],
+    weights: Dict[str, float],
+    radius_m: float,
+    max_edges_per_request: Optional[int] = None
+) -> AssignmentResult:
+    """
+    Assign helpers to requests maximizing the total composite score.
+    
+    Builds a sparse bipartite graph with an edge for every available helper
+    within `radius_m` of a request that carries its productNeed, weighted
+    by the `score_helper` score, then solves a min-cost assignment on it.
+    Each helper goes to at most one request and each request gets at most
+    one helper; a request is left unassigned only when that raises the
+    total score (e.g. no helper in range, or its helpers are better used
+    elsewhere).
+    
+    Args:
+        requests: Open requests
+        helpers: Candidate helpers (unavailable ones are ignored)
+        weights: Matching weights dictionary
+        radius_m: Only pair requests and helpers within this distance
+        max_edges_per_request: Keep only this many best edges per request
+            (None = all); bounds the graph for very dense batches
+    
+    Returns:
+        AssignmentResult with one entry per request ID
+    """
+    available = [h for h in helpers if h.get("available", False)]
+    edges = _build_edges(requests, available, weights, radius_m, max_edges_per_request)
+    
+    # Costs are negated scores; solve rows = requests, columns = helpers
+    adjacency = [[(col, -score) for col, score, _ in row] for row in edges]
+    match = _min_cost_assignment(adjacency, len(available))
+    
+    assignments: Dict[str, Optional[RankedCandidate]] = {}
+    total = 0.0
+    for req, row, col in zip(requests, edges, match):
+        assignments[req["id"]] = None
+        if col is None:
+            continue
+        for helper_col, score, dist_m in row:
+            if helper_col == col:
+                helper = available[col]
+                assignments[req["id"]] = {
+                    "id": helper["id"],
+                    "score": round(score, 4),
+                    "distM": round(dist_m, 2),
+                    "rating": helper["rating"],
+                }
+                total += score
+                break
+    
+    return AssignmentResult(assignments, total, sum(len(row) for row in edges))
+
+
+def _build_edges(
+    requests: List[Request],
+    helpers: List[Helper],
+    weights: Dict[str, float],
+    radius_m: float,
+    max_edges: Optional[int]
+) -> List[List[Tuple[int, float, float]]]:
+    """
+    Build per-request edge lists (helper index, score, distance).
+    
+    Helpers are bucketed by geohash at GEOHASH_PRECISION; each request only
+    looks at the buckets within `radius_m`, drops helpers without its
+    product, and radius-filters the rest (bounding box first).
+    """
+    precision = get_geohash_precision()
+    buckets: Dict[str, List[int]] = {}
+    for i, helper in enumerate(helpers):
+        cell = get_geohash_for_point(helper["lat"], helper["lng"], precision)
+        buckets.setdefault(cell, []).append(i)
+    
+    # Candidate helper indices and coordinates per (request cell, product need),
+    # shared by its requests
+    nearby: Dict[Tuple[str, int], Tuple[List[int], List[float], List[float]]] = {}
+    
+    edges = []
+    for req in requests:
+        lat, lng = req["lat"], req["lng"]
+        center = get_geohash_for_point(lat, lng, precision)
+        need = product_mask(req.get("productNeed"))
+        group = nearby.get((center, need))
+        if group is None:
+            candidates = [
+                i
+                for cell in geohash_neighbors(center, geohash_rings_for_radius(center, radius_m))
+                for i in buckets.get(cell, ())
+                if can_supply(helpers[i], need)
+            ]
+            group = nearby[(center, need)] = (
+                candidates,
+                [helpers[i]["lat"] for i in candidates],
+                [helpers[i]["lng"] for i in candidates],
+            )
+        candidates, lats, lngs = group
+        
+        result = RadiusFilter(lat, lng, radius_m).filter(lats, lngs)
+        urgency_term = weights["urgency"] * urgency_level(req["urgency"])
+        row = [
+            (
+                candidates[j],
+                score_from_distance(urgency_term, dist_m, helpers[candidates[j]]["rating"], weights),
+                dist_m,
+            )
+            for j, dist_m in zip(result.indices, result.distances)
+        ]
+        if max_edges is not None and len(row) > max_edges:
+            row = sorted(row, key=itemgetter(1), reverse=True)[:max_edges]
+        edges.append(row)
+    return edges
+
+
+def _min_cost_assignment(adjacency: List[List[Tuple[int, float]]], n_cols: int) -> List[Optional[int]]:
+    """
+    Sparse min-cost assignment with optional rows.
+    
+    Successive shortest augmenting paths (Jonker-Volgenant style): rows are
+    added one at a time and Dijkstra on reduced costs finds the cheapest
+    augmenting path, touching only edges near the changed part of the
+    matching. Every row also gets a private zero-cost "unassigned" column,
+    so rows with only positive-gain edges stay unassigned and every row
+    always has an augmenting path.
+    
+    Args:
+        adjacency: Per row, (column, cost) edges
+        n_cols: Number of real columns
+    
+    Returns:
+        Matched column per row (None = unassigned)
+    """
+    n_rows = len(adjacency)
+    # Every row also reaches its own dummy column n_cols + r ("unassigned")
+    edges = [row + [(n_cols + r, 0.0)] for r, row in enumerate(adjacency)]
+    
+    # Column potentials. All start at 0 and only scanned (hence matched)
+    # columns move, so free columns share one potential and any of them
+    # may end a path.
+    v = [0.0] * (n_cols + n_rows)
+    
+    col_row: List[Optional[int]] = [None] * (n_cols + n_rows)  # column -> row
+    row_col: List[Optional[int]] = [None] * n_rows  # row -> column
+    row_cost: List[float] = [0.0] * n_rows  # cost of each row's matched edge
+    
+    # Per-search scratch, reset through the touched columns only
+    dist = [math.inf] * (n_cols + n_rows)
+    pred: Dict[int, Tuple[int, float]] = {}  # column -> (row, edge cost)
+    
+    for start in range(n_rows):
+        scanned: Dict[int, float] = {}  # column -> final distance
+        heap: List[Tuple[float, int]] = []
+        # The start row's dummy is always free at distance 0, so nothing
+        # at or beyond the best free column found so far needs a push
+        best_free = math.inf
+        
+        row, base = start, 0.0
+        while True:
+            for col, cost in edges[row]:
+                if col in scanned:
+                    continue  # Final; rounding must not re-open it
+                d = base + cost - v[col]
+                if d < dist[col] and d < best_free:
+                    dist[col] = d
+                    pred[col] = (row, cost)
+                    heapq.heappush(heap, (d, col))
+                    if col_row[col] is None:
+                        best_free = d
+            
+            d, col = heapq.heappop(heap)
+            while col in scanned or d > dist[col]:
+                d, col = heapq.heappop(heap)
+            scanned[col] = d
+            row = col_row[col]
+            if row is None:
+                end, end_dist = col, d
+                break
+            # Leave `row` through its matched (zero reduced cost) edge
+            base = d - (row_cost[row] - v[col])
+        
+        # Update potentials so reduced costs stay >= 0 and tight on matches
+        for col, d in scanned.items():
+            v[col] += d - end_dist
+        for col in pred:
+            dist[col] = math.inf
+        
+        # Augment along the predecessor chain
+        col = end
+        while True:
+            row, cost = pred[col]
+            previous = row_col[row]
+            col_row[col] = row
+            row_col[row] = col
+            row_cost[row] = cost
+            if row == start:
+                break
+            col = previous
+        pred.clear()
+    
+    return [col if col is not None and col < n_cols else None for col in row_col]
+
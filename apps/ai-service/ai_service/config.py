@@ -3,7 +3,7 @@ Configuration management for the AI service.
 """
 
 import os
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -71,6 +71,97 @@ def get_top_k() -> int:
     return int(os.getenv("TOP_K", "5"))
 
 
+def get_vector_rank_threshold() -> int:
+    """Get helper count at which ranking switches to the NumPy path (default 64)."""
+    return int(os.getenv("VECTOR_RANK_THRESHOLD", "64"))
+
+
+def get_match_pruning_enabled() -> bool:
+    """Get whether /match ranks with branch-and-bound over geohash cells (default True)."""
+    return os.getenv("MATCH_PRUNING", "true").lower() == "true"
+
+
+def get_assign_radius_m() -> int:
+    """Get max request-helper distance for /match/batch assignment mode (default 1000m)."""
+    return int(os.getenv("ASSIGN_RADIUS_M", "1000"))
+
+
+def get_assign_max_edges_per_request() -> Optional[int]:
+    """Get how many best-scoring edges each request keeps in assignment mode (default 64, 0 = all)."""
+    value = int(os.getenv("ASSIGN_MAX_EDGES_PER_REQUEST", "64"))
+    return value if value > 0 else None
+
+
+def get_helper_search_max_radius_m() -> int:
+    """Get how far the expanding-ring helper search may grow (default 2000m)."""
+    return int(os.getenv("HELPER_SEARCH_MAX_RADIUS_M", "2000"))
+
+
+def get_match_stream_heartbeat_s() -> float:
+    """Get seconds between keep-alive comments on idle match streams (default 15)."""
+    return float(os.getenv("MATCH_STREAM_HEARTBEAT_S", "15"))
+
+
+def get_match_stream_max_s() -> float:
+    """Get max lifetime of a match stream before the client must reconnect (default 300s)."""
+    return float(os.getenv("MATCH_STREAM_MAX_S", "300"))
+
+
+def get_match_track_idle_s() -> float:
+    """Get how long a request stays incrementally matched without a reader (default 3600s)."""
+    return float(os.getenv("MATCH_TRACK_IDLE_S", "3600"))
+
+
+def get_wal_fsync() -> bool:
+    """Get whether storage log appends are fsynced (default False)."""
+    return os.getenv("WAL_FSYNC", "false").lower() == "true"
+
+
+def get_wal_compact_interval_s() -> float:
+    """Get seconds between storage log compaction checks (default 60)."""
+    return float(os.getenv("WAL_COMPACT_INTERVAL_S", "60"))
+
+
+def get_wal_compact_min_records() -> int:
+    """Get log length at which the compactor writes a new snapshot (default 1000)."""
+    return int(os.getenv("WAL_COMPACT_MIN_RECORDS", "1000"))
+
+
+def get_storage_snapshot_format() -> str:
+    """Get the format compaction writes storage snapshots in: "json" or columnar "binary" (default json)."""
+    return os.getenv("STORAGE_SNAPSHOT_FORMAT", "json").lower()
+
+
+def get_write_behind_max_queue() -> int:
+    """Get max pending writes before the write-behind queue rejects writes (default 10000)."""
+    return int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+
+
+def get_write_behind_batch_size() -> int:
+    """Get max writes persisted per write-behind flush (default 500)."""
+    return int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+
+
+def get_write_behind_max_age_ms() -> float:
+    """Get max time a write waits in the write-behind queue before flushing (default 50ms)."""
+    return float(os.getenv("WRITE_BEHIND_MAX_AGE_MS", "50"))
+
+
+def get_storage_backend() -> str:
+    """Get the store backend: in-memory "memory" (JSON snapshot + log) or "sqlite" (default memory)."""
+    return os.getenv("STORAGE_BACKEND", "memory").lower()
+
+
+def get_sqlite_path() -> str:
+    """Get the SQLite database file for the sqlite backend (default ai_service.db)."""
+    return os.getenv("SQLITE_PATH", "ai_service.db")
+
+
+def get_geohash_precision() -> int:
+    """Get geohash precision for helper/request indexing (default 6, ~1.2km x 0.6km)."""
+    return int(os.getenv("GEOHASH_PRECISION", "6"))
+
+
 def get_match_weights() -> dict:
     """Get all matching weights as a dictionary."""
     return {
@@ -86,6 +177,21 @@ def get_tile_size_m() -> int:
     return int(os.getenv("TILE_SIZE_M", "200"))
 
 
+def get_tile_grid() -> str:
+    """Get tile grid mode: "legacy" or latitude-consistent "banded" (default legacy)."""
+    return os.getenv("TILE_GRID", "legacy").lower()
+
+
+def get_fast_distance_enabled() -> bool:
+    """Get whether fast equirectangular distance mode is enabled (default False)."""
+    return os.getenv("FAST_DISTANCE", "false").lower() == "true"
+
+
+def get_fast_distance_max_m() -> float:
+    """Get radius beyond which fast distance falls back to haversine (default 2000m)."""
+    return float(os.getenv("FAST_DISTANCE_MAX_M", "2000"))
+
+
 def get_proximity_weight() -> float:
     """Get proximity weight for nearby network scoring (default 0.7)."""
     return float(os.getenv("W_PROXIMITY", "0.7"))
@@ -106,6 +212,16 @@ def get_nearby_radius_m() -> int:
     return int(os.getenv("NEARBY_RADIUS_M", "400"))
 
 
+def get_nearby_index() -> str:
+    """Get nearby lookup index: "tiles" (fixed grid) or adaptive "quadtree" (default tiles)."""
+    return os.getenv("NEARBY_INDEX", "tiles").lower()
+
+
+def get_nearby_max_candidates() -> int:
+    """Get max candidates a quadtree nearby query collects (default 500)."""
+    return int(os.getenv("NEARBY_MAX_CANDIDATES", "500"))
+
+
 def get_presence_ttl_min() -> int:
     """Get presence TTL in minutes (default 15)."""
     return int(os.getenv("PRESENCE_TTL_MIN", "15"))
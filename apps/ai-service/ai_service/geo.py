@@ -5,7 +5,15 @@ Privacy-first: maps precise coordinates to coarse grids for client exposure.
 """
 
 import math
-from typing import Literal, Tuple
+from typing import Iterable, List, Literal, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch helpers fall back to pure Python
+    np = None
+
+# Mean Earth radius in meters
+EARTH_RADIUS_M = 6371000.0
 
 
 def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
@@ -22,7 +30,7 @@ def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> floa
         Distance in meters
     """
     # Earth radius in meters
-    R = 6371000
+    R = EARTH_RADIUS_M
     
     # Convert degrees to radians
     phi1 = math.radians(lat1)
@@ -41,57 +49,387 @@ def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> floa
     return distance
 
 
-def geohash_neighbors(geohash: str, precision: int = 7) -> list[str]:
+def haversine_many(
+    lat: float,
+    lng: float,
+    lats: Sequence[float],
+    lngs: Sequence[float]
+):
     """
-    Get neighboring geohash cells for a given geohash.
+    Calculate distances from one origin to many points (many-to-one).
+    
+    NumPy-backed: the whole batch is one array expression instead of one
+    interpreter round trip per point. Falls back to `haversine_meters` in a
+    loop when NumPy is not installed.
     
-    This is a stub implementation. In production, you would:
-    1. Use a geohash library (e.g., python-geohash) to encode lat/lng
-    2. Generate the 8 neighboring cells (N, NE, E, SE, S, SW, W, NW)
-    3. Use these as prefixes in Firestore queries to pre-filter candidates
-    4. Example: WHERE geohash IN ['abc1234', 'abc1235', 'abc1236', ...]
+    Args:
+        lat: Origin latitude (degrees)
+        lng: Origin longitude (degrees)
+        lats: Point latitudes (degrees), list or array
+        lngs: Point longitudes (degrees), list or array
+    
+    Returns:
+        Distances in meters, one per point (ndarray with NumPy, else list)
+    """
+    if len(lats) != len(lngs):
+        raise ValueError("lats and lngs must have the same length")
+    
+    if np is None:
+        return [haversine_meters(lat, lng, p_lat, p_lng) for p_lat, p_lng in zip(lats, lngs)]
+    
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    
+    a = (
+        np.sin(delta_phi / 2) ** 2
+        + math.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    )
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def haversine_pairwise(
+    lats1: Sequence[float],
+    lngs1: Sequence[float],
+    lats2: Sequence[float],
+    lngs2: Sequence[float]
+):
+    """
+    Calculate the M x N distance matrix between two point sets (many-to-many).
     
-    This allows efficient geo queries without full table scans.
+    Row i holds the distances from point i of the first set to every point of
+    the second set. NumPy broadcasting computes the full matrix in one pass;
+    without NumPy a list of rows is built with `haversine_many`.
     
     Args:
-        geohash: Geohash string
-        precision: Geohash precision (default 7, ~153m accuracy)
+        lats1: Latitudes of the first set (M points)
+        lngs1: Longitudes of the first set (M points)
+        lats2: Latitudes of the second set (N points)
+        lngs2: Longitudes of the second set (N points)
     
     Returns:
-        List of neighboring geohash strings (stub returns empty list)
+        Distances in meters with shape (M, N) (ndarray with NumPy, else list of lists)
+    """
+    if len(lats1) != len(lngs1) or len(lats2) != len(lngs2):
+        raise ValueError("lat and lng sequences must have the same length")
     
-    Note:
-        In production, implement using:
-        - geohash.encode(lat, lng, precision=precision)
-        - geohash.neighbors(geohash)
-        - Use these in Firestore WHERE clauses for coarse filtering
+    if np is None:
+        return [haversine_many(lat, lng, lats2, lngs2) for lat, lng in zip(lats1, lngs1)]
+    
+    phi1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, None]
+    lam1 = np.radians(np.asarray(lngs1, dtype=np.float64))[:, None]
+    phi2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+    lam2 = np.radians(np.asarray(lngs2, dtype=np.float64))[None, :]
+    
+    a = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    )
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+# Meters per degree of latitude on the haversine sphere
+_METERS_PER_DEG_LAT = EARTH_RADIUS_M * math.pi / 180.0
+
+
+class FastDistance:
+    """
+    Fast equirectangular distance from a fixed query point.
+    
+    The cos(lat) scale factor is computed once per query, after which each
+    candidate costs two multiplies and an add on squared meters: no sqrt or
+    trig. Points farther than `max_radius_m` (by the flat estimate) fall back
+    to haversine so long distances stay exact.
+    
+    Error bound: using the query latitude for the longitude scale gives a
+    relative error of roughly tan(lat) * dlat / 2, i.e. well under a meter
+    at the 1-2 km radii used for proximity bands at mid latitudes.
+    """
+    
+    def __init__(self, lat: float, lng: float, max_radius_m: float = 2000.0):
+        """
+        Args:
+            lat: Query latitude (degrees)
+            lng: Query longitude (degrees)
+            max_radius_m: Beyond this flat distance, use haversine instead
+        """
+        self.lat = lat
+        self.lng = lng
+        self.max_radius_m = max_radius_m
+        self.max_radius_sq = max_radius_m * max_radius_m
+        self.k_lat = _METERS_PER_DEG_LAT
+        self.k_lng = _METERS_PER_DEG_LAT * math.cos(math.radians(lat))
+    
+    def squared_meters(self, lat: float, lng: float) -> float:
+        """Squared distance in meters² to a point (haversine² beyond max radius)."""
+        dy = (lat - self.lat) * self.k_lat
+        dlng = lng - self.lng
+        if dlng > 180.0 or dlng < -180.0:
+            dlng = (dlng + 180.0) % 360.0 - 180.0
+        dx = dlng * self.k_lng
+        d_sq = dx * dx + dy * dy
+        if d_sq > self.max_radius_sq:
+            dist = haversine_meters(self.lat, self.lng, lat, lng)
+            return dist * dist
+        return d_sq
+    
+    def squared_meters_many(self, lats: Sequence[float], lngs: Sequence[float]):
+        """
+        Squared distances in meters² to many points.
+        
+        Returns:
+            ndarray with NumPy, else list
+        """
+        if len(lats) != len(lngs):
+            raise ValueError("lats and lngs must have the same length")
+        
+        if np is None:
+            return [self.squared_meters(lat, lng) for lat, lng in zip(lats, lngs)]
+        
+        lat_arr = np.asarray(lats, dtype=np.float64)
+        lng_arr = np.asarray(lngs, dtype=np.float64)
+        dy = (lat_arr - self.lat) * self.k_lat
+        dx = ((lng_arr - self.lng + 180.0) % 360.0 - 180.0) * self.k_lng
+        d_sq = dx * dx + dy * dy
+        
+        far = d_sq > self.max_radius_sq
+        if far.any():
+            d_sq[far] = haversine_many(self.lat, self.lng, lat_arr[far], lng_arr[far]) ** 2
+        return d_sq
+    
+    def meters(self, lat: float, lng: float) -> float:
+        """Distance in meters to a point."""
+        return math.sqrt(self.squared_meters(lat, lng))
+    
+    def within(self, lat: float, lng: float, radius_m: float) -> bool:
+        """Check whether a point is within `radius_m` without taking a sqrt."""
+        return self.squared_meters(lat, lng) <= radius_m * radius_m
+    
+    def proximity_band(self, lat: float, lng: float) -> Literal["0-100", "100-250", "250-500", "500-1000", ">1000"]:
+        """Map a point to its proximity band using squared thresholds."""
+        return proximity_band_from_squared(self.squared_meters(lat, lng))
+
+
+# Safety margin added to the radius when building prefilter boxes
+_PREFILTER_MARGIN_M = 1.0
+
+
+class RadiusFilterStats(NamedTuple):
+    """Per-stage counters of a radius filter pass."""
+    candidates: int  # Candidates passed in
+    bbox_rejected: int  # Rejected by the lat/lng box (no trig)
+    radius_rejected: int  # Passed the box, rejected by exact distance
+    accepted: int  # Within the radius
+
+
+class RadiusFilterResult(NamedTuple):
+    """Accepted candidates of a radius filter pass."""
+    indices: List[int]  # Positions of accepted candidates, input order
+    distances: List[float]  # Distance per accepted candidate (meters², if squared)
+    stats: RadiusFilterStats
+
+
+class RadiusFilter:
     """
-    # Stub implementation
-    # TODO: Implement using python-geohash or similar library
-    # Example production code:
-    # import geohash
-    # neighbors = geohash.neighbors(geohash)
-    # return [geohash] + neighbors  # Include self and 8 neighbors
-    return []
+    Two-stage radius filter: a lat/lng bounding box, then exact distance.
+    
+    The box is the tightest lat/lng box around the search circle on the
+    sphere, computed once per query. Rejecting against it costs a couple of
+    subtractions and compares, so candidates from the corners of a tile
+    ring never reach haversine. The box contains the circle for both
+    haversine and `FastDistance`, so the result matches filtering every
+    candidate by exact distance.
+    """
+    
+    def __init__(self, lat: float, lng: float, radius_m: float, fast: Optional[FastDistance] = None):
+        """
+        Args:
+            lat: Query latitude (degrees)
+            lng: Query longitude (degrees)
+            radius_m: Search radius in meters
+            fast: Measure with this FastDistance (squared meters) instead of haversine
+        """
+        self.lat = lat
+        self.lng = lng
+        self.radius_m = radius_m
+        self.fast = fast
+        self.limit = radius_m * radius_m if fast is not None else radius_m
+        
+        angle = (radius_m + _PREFILTER_MARGIN_M) / EARTH_RADIUS_M
+        self.d_lat = math.degrees(angle)
+        self.min_lat = lat - self.d_lat
+        self.max_lat = lat + self.d_lat
+        
+        # Longitude half-width of the circle; unrestricted if it reaches a pole
+        self.d_lng = 180.0
+        cos_lat = math.cos(math.radians(lat))
+        if self.min_lat > -90.0 and self.max_lat < 90.0 and math.sin(angle) < cos_lat:
+            self.d_lng = math.degrees(math.asin(math.sin(angle) / cos_lat))
+    
+    @property
+    def box(self) -> Tuple[float, float, float, float]:
+        """Prefilter box (min_lat, min_lng, max_lat, max_lng); lngs may pass ±180."""
+        return (self.min_lat, self.lng - self.d_lng, self.max_lat, self.lng + self.d_lng)
+    
+    def in_box(self, lat: float, lng: float) -> bool:
+        """Check whether a point passes the bounding-box stage."""
+        if lat < self.min_lat or lat > self.max_lat:
+            return False
+        if self.d_lng >= 180.0:
+            return True
+        dlng = lng - self.lng
+        if dlng > 180.0 or dlng < -180.0:
+            dlng = (dlng + 180.0) % 360.0 - 180.0
+        return -self.d_lng <= dlng <= self.d_lng
+    
+    def distance(self, lat: float, lng: float) -> float:
+        """Exact distance to a point (squared meters with FastDistance)."""
+        if self.fast is not None:
+            return self.fast.squared_meters(lat, lng)
+        return haversine_meters(self.lat, self.lng, lat, lng)
+    
+    def filter(self, lats: Sequence[float], lngs: Sequence[float], trusted: int = 0) -> RadiusFilterResult:
+        """
+        Filter candidates to those within the radius.
+        
+        Args:
+            lats: Candidate latitudes (degrees), list or array
+            lngs: Candidate longitudes (degrees), list or array
+            trusted: The first `trusted` candidates are known to be inside
+                (e.g. from fully-inside tiles); they skip both reject stages
+                but still get a distance
+        
+        Returns:
+            RadiusFilterResult with accepted indices, their distances and
+            per-stage counters
+        """
+        if len(lats) != len(lngs):
+            raise ValueError("lats and lngs must have the same length")
+        
+        if np is None:
+            return self._filter_scalar(lats, lngs, trusted)
+        return self._filter_vectorized(lats, lngs, trusted)
+    
+    def _filter_scalar(self, lats: Sequence[float], lngs: Sequence[float], trusted: int) -> RadiusFilterResult:
+        """Pure-Python filter: one box check per candidate, trig only for survivors."""
+        indices: List[int] = []
+        distances: List[float] = []
+        bbox_rejected = 0
+        radius_rejected = 0
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            if i >= trusted and not self.in_box(lat, lng):
+                bbox_rejected += 1
+                continue
+            dist = self.distance(lat, lng)
+            if i >= trusted and dist > self.limit:
+                radius_rejected += 1
+                continue
+            indices.append(i)
+            distances.append(dist)
+        
+        stats = RadiusFilterStats(len(lats), bbox_rejected, radius_rejected, len(indices))
+        return RadiusFilterResult(indices, distances, stats)
+    
+    def _filter_vectorized(self, lats: Sequence[float], lngs: Sequence[float], trusted: int) -> RadiusFilterResult:
+        """NumPy filter: box mask over the batch, distances only for survivors."""
+        lat_arr = np.asarray(lats, dtype=np.float64)
+        lng_arr = np.asarray(lngs, dtype=np.float64)
+        
+        mask = (lat_arr >= self.min_lat) & (lat_arr <= self.max_lat)
+        if self.d_lng < 180.0:
+            dlng = (lng_arr - self.lng + 180.0) % 360.0 - 180.0
+            mask &= np.abs(dlng) <= self.d_lng
+        mask[:trusted] = True
+        boxed = np.flatnonzero(mask)
+        
+        if self.fast is not None:
+            dist = np.asarray(self.fast.squared_meters_many(lat_arr[boxed], lng_arr[boxed]))
+        else:
+            dist = np.asarray(haversine_many(self.lat, self.lng, lat_arr[boxed], lng_arr[boxed]))
+        keep = (dist <= self.limit) | (boxed < trusted)
+        
+        indices = boxed[keep]
+        stats = RadiusFilterStats(
+            candidates=len(lat_arr),
+            bbox_rejected=len(lat_arr) - len(boxed),
+            radius_rejected=len(boxed) - len(indices),
+            accepted=len(indices),
+        )
+        return RadiusFilterResult(indices.tolist(), dist[keep].tolist(), stats)
+
+
+# Geohash base32 alphabet (no a, i, l, o)
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_DECODE = {c: i for i, c in enumerate(_GEOHASH_BASE32)}
+
+
+def _geohash_bits(precision: int) -> Tuple[int, int]:
+    """Split the 5*precision geohash bits into (lat_bits, lng_bits)."""
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+
+def _quantize(value: float, lo: float, span: float, bits: int) -> int:
+    """Map a coordinate onto a 2**bits integer grid (clamped to the last cell)."""
+    cells = 1 << bits
+    idx = int((value - lo) / span * cells)
+    return min(max(idx, 0), cells - 1)
+
+
+def _geohash_from_indices(lat_idx: int, lng_idx: int, precision: int) -> str:
+    """Interleave lat/lng cell indices (lng bit first) into a geohash string."""
+    lat_bits, lng_bits = _geohash_bits(precision)
+    code = 0
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bit = (lng_idx >> (lng_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_idx >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+    
+    chars = []
+    for shift in range(5 * (precision - 1), -1, -5):
+        chars.append(_GEOHASH_BASE32[(code >> shift) & 0x1F])
+    return "".join(chars)
+
+
+def _geohash_to_indices(geohash: str) -> Tuple[int, int]:
+    """De-interleave a geohash string into (lat_idx, lng_idx) cell indices."""
+    precision = len(geohash)
+    code = 0
+    for char in geohash.lower():
+        if char not in _GEOHASH_DECODE:
+            raise ValueError(f"Invalid geohash character: {char!r}")
+        code = (code << 5) | _GEOHASH_DECODE[char]
+    
+    lat_idx = 0
+    lng_idx = 0
+    for i in range(5 * precision):
+        bit = (code >> (5 * precision - 1 - i)) & 1
+        if i % 2 == 0:
+            lng_idx = (lng_idx << 1) | bit
+        else:
+            lat_idx = (lat_idx << 1) | bit
+    return lat_idx, lng_idx
 
 
 def get_geohash_for_point(lat: float, lng: float, precision: int = 7) -> str:
     """
     Generate geohash for a lat/lng point.
     
-    Stub implementation. In production:
-    - Use geohash.encode(lat, lng, precision=precision)
-    - Store geohash on request/helper documents
-    - Use in Firestore queries: WHERE geohash IN [neighbors]
-    - This enables efficient geo queries with composite indexes
+    Pure-Python encoder: coordinates are quantized onto the geohash bit grid
+    and the lat/lng bits are interleaved (longitude first), then packed into
+    base32 characters. Stored on request/helper records so candidate lookups
+    only touch the cells around the query point.
     
     Args:
         lat: Latitude (degrees)
         lng: Longitude (degrees)
-        precision: Geohash precision (default 7)
+        precision: Geohash precision (default 7, ~153m x 153m cells)
     
     Returns:
-        Geohash string (stub returns empty string)
+        Geohash string of length `precision`
     
     Note:
         Firestore index strategy:
@@ -101,13 +439,334 @@ def get_geohash_for_point(lat: float, lng: float, precision: int = 7) -> str:
         4. Limit to reasonable batch size (e.g., 100)
         5. Then compute exact distances server-side and rank
     """
-    # Stub implementation
-    # TODO: Implement using python-geohash
-    # return geohash.encode(lat, lng, precision=precision)
-    return ""
+    if precision < 1:
+        raise ValueError("precision must be >= 1")
+    
+    lat_bits, lng_bits = _geohash_bits(precision)
+    lat_idx = _quantize(lat, -90.0, 180.0, lat_bits)
+    lng_idx = _quantize(lng, -180.0, 360.0, lng_bits)
+    return _geohash_from_indices(lat_idx, lng_idx, precision)
+
+
+def get_geohashes_for_points(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    precision: int = 7
+) -> List[str]:
+    """
+    Batch-encode many points to geohashes.
+    
+    Uses NumPy to quantize all coordinates in one pass when available,
+    falling back to the scalar encoder otherwise. Results are identical
+    to calling `get_geohash_for_point` per point.
+    
+    Args:
+        lats: Latitudes (degrees), list or array
+        lngs: Longitudes (degrees), list or array
+        precision: Geohash precision (default 7)
+    
+    Returns:
+        List of geohash strings, one per input point
+    """
+    if len(lats) != len(lngs):
+        raise ValueError("lats and lngs must have the same length")
+    
+    if np is None:
+        return [
+            get_geohash_for_point(float(lat), float(lng), precision)
+            for lat, lng in zip(lats, lngs)
+        ]
+    
+    if precision < 1:
+        raise ValueError("precision must be >= 1")
+    
+    lat_bits, lng_bits = _geohash_bits(precision)
+    lat_arr = np.asarray(lats, dtype=np.float64)
+    lng_arr = np.asarray(lngs, dtype=np.float64)
+    lat_idx = np.clip(
+        ((lat_arr + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1
+    )
+    lng_idx = np.clip(
+        ((lng_arr + 180.0) / 360.0 * (1 << lng_bits)).astype(np.int64), 0, (1 << lng_bits) - 1
+    )
+    
+    # Interleave bits column-wise, then emit one base32 character per 5 bits
+    codes = np.zeros(lat_arr.shape, dtype=np.int64)
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            bit = (lng_idx >> (lng_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_idx >> (lat_bits - 1 - i // 2)) & 1
+        codes = (codes << 1) | bit
+    
+    alphabet = np.frombuffer(_GEOHASH_BASE32.encode("ascii"), dtype="S1")
+    chars = np.stack(
+        [alphabet[(codes >> shift) & 0x1F] for shift in range(5 * (precision - 1), -1, -5)],
+        axis=-1,
+    )
+    return [row.tobytes().decode("ascii") for row in chars.reshape(-1, precision)]
 
 
-def lat_lng_to_tile(lat: float, lng: float, tile_size_m: int = 200) -> str:
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    Get the bounding box of a geohash cell.
+    
+    Args:
+        geohash: Geohash string
+    
+    Returns:
+        Tuple of (min_lat, min_lng, max_lat, max_lng) in degrees
+    """
+    lat_bits, lng_bits = _geohash_bits(len(geohash))
+    lat_idx, lng_idx = _geohash_to_indices(geohash)
+    lat_step = 180.0 / (1 << lat_bits)
+    lng_step = 360.0 / (1 << lng_bits)
+    min_lat = -90.0 + lat_idx * lat_step
+    min_lng = -180.0 + lng_idx * lng_step
+    return min_lat, min_lng, min_lat + lat_step, min_lng + lng_step
+
+
+def decode_geohash(geohash: str) -> Tuple[float, float]:
+    """
+    Decode a geohash to the center point of its cell.
+    
+    Args:
+        geohash: Geohash string
+    
+    Returns:
+        Tuple of (lat, lng) in degrees
+    """
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def geohash_ring(geohash: str, k: int) -> list[str]:
+    """
+    Get the geohash cells exactly `k` cells away from a given cell.
+    
+    Ring 0 is the cell itself, ring 1 its 8 neighbors, ring 2 the 16 cells
+    around those, and so on. Longitude wraps at the antimeridian; cells
+    past the poles are dropped.
+    
+    Args:
+        geohash: Center geohash string
+        k: Ring index (Chebyshev distance in cells)
+    
+    Returns:
+        List of geohash strings on the ring
+    """
+    if k < 0:
+        raise ValueError("k must be >= 0")
+    
+    precision = len(geohash)
+    lat_bits, lng_bits = _geohash_bits(precision)
+    lat_idx, lng_idx = _geohash_to_indices(geohash)
+    if k == 0:
+        return [geohash.lower()]
+    
+    ring = []
+    seen = set()
+    for dlat in range(-k, k + 1):
+        for dlng in range(-k, k + 1):
+            if max(abs(dlat), abs(dlng)) != k:
+                continue
+            n_lat = lat_idx + dlat
+            if n_lat < 0 or n_lat >= (1 << lat_bits):
+                continue
+            n_lng = (lng_idx + dlng) % (1 << lng_bits)
+            cell = _geohash_from_indices(n_lat, n_lng, precision)
+            if cell not in seen:
+                seen.add(cell)
+                ring.append(cell)
+    return ring
+
+
+def geohash_neighbors(geohash: str, rings: int = 1) -> list[str]:
+    """
+    Get a geohash cell plus its neighbors out to `rings` cells.
+    
+    With the default `rings=1` this is the cell and its 8 neighbors
+    (N, NE, E, SE, S, SW, W, NW), the classic pre-filter for geo queries:
+    WHERE geohash IN [cell + neighbors].
+    
+    Args:
+        geohash: Geohash string
+        rings: Number of rings to expand (default 1)
+    
+    Returns:
+        List of geohash strings, the original cell first
+    """
+    cells = []
+    for k in range(rings + 1):
+        cells.extend(geohash_ring(geohash, k))
+    return cells
+
+
+def geohash_rings_for_radius(geohash: str, radius_m: float) -> int:
+    """
+    Number of neighbor rings around a cell that cover `radius_m`.
+    
+    Every point within `radius_m` of any point of the cell lies in
+    `geohash_neighbors(geohash, rings)`. Always at least 1.
+    
+    Args:
+        geohash: Center geohash string
+        radius_m: Radius in meters
+    
+    Returns:
+        Ring count
+    """
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+    height = (max_lat - min_lat) * _METERS_PER_DEG_LAT
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    width = (max_lng - min_lng) * _METERS_PER_DEG_LAT * cos_lat
+    side = min(height, width)
+    if side <= 0:
+        return 1
+    return max(1, math.ceil(radius_m / side))
+
+
+# Packed tile keys: signed 32-bit tile_lat in the high half, tile_lng in the
+# low half of an int64. String ids ("tile_X_Y") are only built at the API edge.
+_TILE_PREFIX = "tile_"
+_LOW_MASK = 0xFFFFFFFF
+
+# Meters per degree used by the tile grids
+_GRID_METERS_PER_DEG = 111320.0
+
+# Tile grid modes:
+# - legacy: columns scaled by cos(lat) of each point. Column boundaries shift
+#   with latitude, so tiles are only approximately stable.
+# - banded: fixed latitude bands, each with a fixed number of equal-width
+#   longitude columns (sized at the band's center latitude). Tile boundaries
+#   are the same everywhere, so tile-keyed indexes and caches are reliable.
+TILE_GRID_LEGACY = "legacy"
+TILE_GRID_BANDED = "banded"
+TILE_GRIDS = (TILE_GRID_LEGACY, TILE_GRID_BANDED)
+
+
+def pack_tile_key(tile_lat: int, tile_lng: int) -> int:
+    """
+    Pack integer tile coordinates into a single int64 tile key.
+    
+    Args:
+        tile_lat: Tile row (signed)
+        tile_lng: Tile column (signed)
+    
+    Returns:
+        Packed tile key
+    """
+    return (tile_lat << 32) | (tile_lng & _LOW_MASK)
+
+
+def unpack_tile_key(key: int) -> Tuple[int, int]:
+    """
+    Unpack an int64 tile key into (tile_lat, tile_lng).
+    
+    Args:
+        key: Packed tile key
+    
+    Returns:
+        Tuple of (tile_lat, tile_lng)
+    """
+    tile_lng = key & _LOW_MASK
+    if tile_lng >= 0x80000000:
+        tile_lng -= 0x100000000
+    return key >> 32, tile_lng
+
+
+def tile_key_to_str(key: int) -> str:
+    """Format a packed tile key as its public "tile_X_Y" identifier."""
+    tile_lat, tile_lng = unpack_tile_key(key)
+    return f"{_TILE_PREFIX}{tile_lat}_{tile_lng}"
+
+
+def parse_tile(tile: str) -> Optional[int]:
+    """
+    Parse a "tile_X_Y" identifier into a packed tile key.
+    
+    Args:
+        tile: Tile identifier string
+    
+    Returns:
+        Packed tile key, or None if the string is not a tile identifier
+    """
+    if not tile.startswith(_TILE_PREFIX):
+        return None
+    
+    parts = tile[len(_TILE_PREFIX):].split("_")
+    if len(parts) != 2:
+        return None
+    
+    try:
+        return pack_tile_key(int(parts[0]), int(parts[1]))
+    except ValueError:
+        return None
+
+
+def _check_grid(grid: str) -> None:
+    """Validate a tile grid mode."""
+    if grid not in TILE_GRIDS:
+        raise ValueError(f"Unknown tile grid: {grid!r} (expected one of {TILE_GRIDS})")
+
+
+def _banded_columns(row: int, tile_size_m: int) -> int:
+    """Number of longitude columns in a banded-grid row."""
+    center_lat = (row + 0.5) * tile_size_m / _GRID_METERS_PER_DEG
+    center_lat = min(max(center_lat, -90.0), 90.0)
+    width_m = 360.0 * _GRID_METERS_PER_DEG * math.cos(math.radians(center_lat))
+    return max(1, int(width_m / tile_size_m))
+
+
+def _banded_column(row: int, lng: float, tile_size_m: int) -> int:
+    """Column index of a longitude within a banded-grid row."""
+    n_cols = _banded_columns(row, tile_size_m)
+    return math.floor((lng + 180.0) / 360.0 * n_cols) % n_cols
+
+
+def lat_lng_to_tile_key(
+    lat: float,
+    lng: float,
+    tile_size_m: int = 200,
+    grid: str = TILE_GRID_LEGACY
+) -> int:
+    """
+    Convert lat/lng to a packed integer tile key.
+    
+    Same grid as `lat_lng_to_tile`, without building a string.
+    
+    Args:
+        lat: Latitude (degrees)
+        lng: Longitude (degrees)
+        tile_size_m: Tile size in meters (default 200m)
+        grid: Tile grid mode, "legacy" (default) or "banded"
+    
+    Returns:
+        Packed tile key
+    """
+    _check_grid(grid)
+    if grid == TILE_GRID_BANDED:
+        row = math.floor(lat * _GRID_METERS_PER_DEG / tile_size_m)
+        return pack_tile_key(row, _banded_column(row, lng, tile_size_m))
+    
+    # Approximate meters per degree (at equator)
+    # More accurate would account for latitude, but this is sufficient for coarse grids
+    meters_per_degree_lat = _GRID_METERS_PER_DEG
+    meters_per_degree_lng = _GRID_METERS_PER_DEG * math.cos(math.radians(lat))
+    
+    # Calculate tile coordinates
+    tile_lat = int(lat * meters_per_degree_lat / tile_size_m)
+    tile_lng = int(lng * meters_per_degree_lng / tile_size_m)
+    
+    return pack_tile_key(tile_lat, tile_lng)
+
+
+def lat_lng_to_tile(
+    lat: float,
+    lng: float,
+    tile_size_m: int = 200,
+    grid: str = TILE_GRID_LEGACY
+) -> str:
     """
     Convert lat/lng to a coarse grid tile identifier.
     
@@ -118,61 +777,533 @@ def lat_lng_to_tile(lat: float, lng: float, tile_size_m: int = 200) -> str:
         lat: Latitude (degrees)
         lng: Longitude (degrees)
         tile_size_m: Tile size in meters (default 200m)
+        grid: Tile grid mode, "legacy" (default) or "banded"
     
     Returns:
         Tile identifier string (e.g., "tile_1234_5678")
     
     Note:
-        In production, consider using geohash for better neighbor queries.
-        This simple tile system works for hackathon/demo purposes.
+        Internal lookups should use `lat_lng_to_tile_key`; this string
+        form is for API responses and stored records.
     """
-    # Approximate meters per degree (at equator)
-    # More accurate would account for latitude, but this is sufficient for coarse grids
-    meters_per_degree_lat = 111320.0
-    meters_per_degree_lng = 111320.0 * math.cos(math.radians(lat))
+    return tile_key_to_str(lat_lng_to_tile_key(lat, lng, tile_size_m, grid))
+
+
+def get_tile_neighbor_keys(
+    key: int,
+    radius_m: int = 400,
+    tile_size_m: int = 200,
+    grid: str = TILE_GRID_LEGACY
+) -> list[int]:
+    """
+    Get neighboring tile keys for a given tile key within radius.
     
-    # Calculate tile coordinates
-    tile_lat = int(lat * meters_per_degree_lat / tile_size_m)
-    tile_lng = int(lng * meters_per_degree_lng / tile_size_m)
+    Returns the full square of tiles around `key`; use `cover_circle` to
+    get only the tiles that intersect the query circle.
+    
+    Args:
+        key: Packed tile key
+        radius_m: Search radius in meters
+        tile_size_m: Tile size in meters (default 200m)
+        grid: Tile grid mode, "legacy" (default) or "banded"
+    
+    Returns:
+        List of packed tile keys including the original tile
+    """
+    _check_grid(grid)
+    tile_lat, tile_lng = unpack_tile_key(key)
+    
+    # Calculate how many tiles to include in each direction
+    tile_radius = max(1, math.ceil(radius_m / tile_size_m))
     
-    return f"tile_{tile_lat}_{tile_lng}"
+    if grid == TILE_GRID_BANDED:
+        # Columns of adjacent bands don't line up: re-locate the tile's
+        # center longitude in each band and take columns around it
+        n_cols = _banded_columns(tile_lat, tile_size_m)
+        center_lng = -180.0 + (tile_lng + 0.5) * 360.0 / n_cols
+        neighbors = []
+        for dlat in range(-tile_radius, tile_radius + 1):
+            row = tile_lat + dlat
+            row_cols = _banded_columns(row, tile_size_m)
+            col = _banded_column(row, center_lng, tile_size_m)
+            seen = set()
+            for dlng in range(-tile_radius, tile_radius + 1):
+                neighbor = pack_tile_key(row, (col + dlng) % row_cols)
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    neighbors.append(neighbor)
+        return neighbors
+    
+    neighbors = []
+    for dlat in range(-tile_radius, tile_radius + 1):
+        row = (tile_lat + dlat) << 32
+        for dlng in range(-tile_radius, tile_radius + 1):
+            neighbors.append(row | ((tile_lng + dlng) & _LOW_MASK))
+    
+    return neighbors
 
 
-def get_tile_neighbors(tile: str, radius_m: int = 400) -> list[str]:
+def get_tile_neighbors(
+    tile: str,
+    radius_m: int = 400,
+    tile_size_m: int = 200,
+    grid: str = TILE_GRID_LEGACY
+) -> list[str]:
     """
     Get neighboring tiles for a given tile within radius.
     
+    String wrapper around `get_tile_neighbor_keys` for API callers.
+    
     Args:
         tile: Tile identifier (e.g., "tile_1234_5678")
         radius_m: Search radius in meters
+        tile_size_m: Tile size in meters (default 200m)
+        grid: Tile grid mode, "legacy" (default) or "banded"
     
     Returns:
         List of tile identifiers including the original tile
     """
-    if not tile.startswith("tile_"):
+    key = parse_tile(tile)
+    if key is None:
         return [tile]
     
-    # Parse tile coordinates
-    parts = tile.replace("tile_", "").split("_")
-    if len(parts) != 2:
-        return [tile]
+    return [tile_key_to_str(k) for k in get_tile_neighbor_keys(key, radius_m, tile_size_m, grid)]
+
+
+# Safety margin for tile classification, absorbs lat/lng box vs sphere error
+_COVER_MARGIN_M = 1.0
+
+
+class TileCovering(NamedTuple):
+    """Tiles intersecting a query circle, split by how they intersect it."""
+    tiles: frozenset  # All intersecting tile keys (inside | edge)
+    inside: frozenset  # Tiles entirely within the radius: no distance check needed
+    edge: frozenset  # Tiles crossing the circle boundary: distance check needed
+
+
+def _trunc_span(index: int) -> Tuple[float, float]:
+    """Grid-unit span of the values that int() truncates to `index`."""
+    if index > 0:
+        return float(index), index + 1.0
+    if index < 0:
+        return index - 1.0, float(index)
+    return -1.0, 1.0
+
+
+def _row_lat_bounds(row: int, tile_size_m: int) -> Tuple[float, float]:
+    """Latitude span (degrees) of a tile row."""
+    lo, hi = _trunc_span(row)
+    scale = tile_size_m / _GRID_METERS_PER_DEG
+    return max(-90.0, lo * scale), min(90.0, hi * scale)
+
+
+def _cos_range(lat_lo: float, lat_hi: float) -> Tuple[float, float]:
+    """Min and max of cos(lat) over a latitude span."""
+    c_lo = math.cos(math.radians(lat_lo))
+    c_hi = math.cos(math.radians(lat_hi))
+    c_max = 1.0 if lat_lo < 0.0 < lat_hi else max(c_lo, c_hi)
+    return max(min(c_lo, c_hi), 1e-12), c_max
+
+
+def tile_key_bounds(
+    key: int,
+    tile_size_m: int = 200,
+    grid: str = TILE_GRID_LEGACY
+) -> Tuple[float, float, float, float]:
+    """
+    Get a lat/lng bounding box for a tile.
     
-    try:
-        tile_lat = int(parts[0])
-        tile_lng = int(parts[1])
-    except ValueError:
-        return [tile]
+    Banded tiles are exact lat/lng rectangles. Legacy tile columns are
+    scaled by cos(lat) of each point, so their edges are not exact
+    meridians; the box returned covers the whole tile.
     
-    # Calculate how many tiles to include in each direction
-    # Assuming ~200m tiles, radius_m/200 gives tile count
-    tile_radius = max(1, int(radius_m / 200))
+    Args:
+        key: Packed tile key
+        tile_size_m: Tile size in meters (default 200m)
+        grid: Tile grid mode, "legacy" (default) or "banded"
     
-    neighbors = []
-    for dlat in range(-tile_radius, tile_radius + 1):
-        for dlng in range(-tile_radius, tile_radius + 1):
-            neighbors.append(f"tile_{tile_lat + dlat}_{tile_lng + dlng}")
+    Returns:
+        Tuple of (min_lat, min_lng, max_lat, max_lng) in degrees
+    """
+    _check_grid(grid)
+    row, col = unpack_tile_key(key)
+    if grid == TILE_GRID_BANDED:
+        lat_step = tile_size_m / _GRID_METERS_PER_DEG
+        lng_step = 360.0 / _banded_columns(row, tile_size_m)
+        return (
+            max(-90.0, row * lat_step),
+            -180.0 + col * lng_step,
+            min(90.0, (row + 1) * lat_step),
+            -180.0 + (col + 1) * lng_step,
+        )
     
-    return neighbors
+    lat_lo, lat_hi = _row_lat_bounds(row, tile_size_m)
+    c_min, c_max = _cos_range(lat_lo, lat_hi)
+    
+    lo, hi = _trunc_span(col)
+    edges = [
+        v * tile_size_m / (_GRID_METERS_PER_DEG * c)
+        for v in (lo, hi)
+        for c in (c_min, c_max)
+    ]
+    return lat_lo, min(edges), lat_hi, max(edges)
+
+
+def _cap_half_width_deg(lat: float, angle: float, lat_lo: float, lat_hi: float) -> Optional[float]:
+    """
+    Widest longitude half-width (degrees) of a spherical cap within a latitude span.
+    
+    Returns None if the cap does not reach the span, 180 if it wraps all
+    longitudes (e.g. contains a pole).
+    """
+    phi0 = math.radians(lat)
+    cos_angle = math.cos(angle)
+    if abs(math.sin(phi0)) >= cos_angle:
+        return 180.0
+    
+    # The cap is widest at sin(phi) = sin(phi0) / cos(angle); clamp into the span
+    phi_star = math.asin(math.sin(phi0) / cos_angle)
+    phi = min(max(phi_star, math.radians(lat_lo)), math.radians(lat_hi))
+    
+    num = math.sin(angle / 2) ** 2 - math.sin((phi - phi0) / 2) ** 2
+    if num < 0:
+        return None
+    den = math.cos(phi) * math.cos(phi0)
+    if den <= 0:
+        return 180.0
+    x = math.sqrt(num / den)
+    if x >= 1.0:
+        return 180.0
+    return math.degrees(2 * math.asin(x))
+
+
+def box_distance_range(
+    lat: float,
+    lng: float,
+    min_lat: float,
+    min_lng: float,
+    max_lat: float,
+    max_lng: float
+) -> Tuple[float, float]:
+    """
+    Get the nearest and farthest distance from a point to a lat/lng box.
+    
+    The nearest point is the point clamped into the box (with the point's
+    longitude taken on the box's side of the antimeridian); the farthest
+    is the farthest corner. Both are haversine distances in meters.
+    
+    Args:
+        lat: Point latitude (degrees)
+        lng: Point longitude (degrees)
+        min_lat, min_lng, max_lat, max_lng: Box bounds (degrees)
+    
+    Returns:
+        Tuple of (nearest_m, farthest_m)
+    """
+    return (
+        _box_nearest_m(lat, lng, min_lat, min_lng, max_lat, max_lng),
+        _box_farthest_m(lat, lng, min_lat, min_lng, max_lat, max_lng),
+    )
+
+
+def _box_nearest_m(lat: float, lng: float, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> float:
+    """Haversine distance from a point to the nearest point of a lat/lng box."""
+    center_lng = lng
+    box_mid = (min_lng + max_lng) / 2
+    if box_mid - center_lng > 180.0:
+        center_lng += 360.0
+    elif center_lng - box_mid > 180.0:
+        center_lng -= 360.0
+    near_lat = min(max(lat, min_lat), max_lat)
+    near_lng = min(max(center_lng, min_lng), max_lng)
+    return haversine_meters(lat, lng, near_lat, near_lng)
+
+
+def _box_farthest_m(lat: float, lng: float, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> float:
+    """Haversine distance from a point to the farthest corner of a lat/lng box."""
+    return max(
+        haversine_meters(lat, lng, corner_lat, corner_lng)
+        for corner_lat in (min_lat, max_lat)
+        for corner_lng in (min_lng, max_lng)
+    )
+
+
+def _circle_columns(
+    row: int,
+    lng: float,
+    half_width: float,
+    span_lo: float,
+    span_hi: float,
+    tile_size_m: int,
+    grid: str
+) -> List[int]:
+    """Column indices of a row that overlap [lng - half_width, lng + half_width]."""
+    if grid == TILE_GRID_BANDED:
+        n_cols = _banded_columns(row, tile_size_m)
+        if half_width >= 180.0:
+            return list(range(n_cols))
+        first = math.floor((lng - half_width + 180.0) / 360.0 * n_cols)
+        last = math.floor((lng + half_width + 180.0) / 360.0 * n_cols)
+        if last - first + 1 >= n_cols:
+            return list(range(n_cols))
+        return [col % n_cols for col in range(first, last + 1)]
+    
+    # Legacy: extremes of lng * cos(lat) over the row span
+    units_per_deg = _GRID_METERS_PER_DEG / tile_size_m
+    c_min, c_max = _cos_range(span_lo, span_hi)
+    col_values = [
+        bound * units_per_deg * c
+        for bound in (lng - half_width, lng + half_width)
+        for c in (c_min, c_max)
+    ]
+    return list(range(int(min(col_values)), int(max(col_values)) + 1))
+
+
+def cover_circle(
+    lat: float,
+    lng: float,
+    radius_m: float,
+    tile_size_m: int = 200,
+    grid: str = TILE_GRID_LEGACY
+) -> TileCovering:
+    """
+    Get the tiles that intersect a query circle.
+    
+    Unlike `get_tile_neighbor_keys`, which returns a full square of tiles,
+    this walks the circle row by row and keeps only tiles whose box comes
+    within the radius, using the configured tile size and the latitude of
+    each row. Each tile is classified as fully inside the circle (points in
+    it need no distance check against the radius) or on the edge.
+    
+    Args:
+        lat: Circle center latitude (degrees)
+        lng: Circle center longitude (degrees)
+        radius_m: Circle radius in meters
+        tile_size_m: Tile size in meters (default 200m)
+        grid: Tile grid mode, "legacy" (default) or "banded"
+    
+    Returns:
+        TileCovering with all, inside and edge tile key sets
+    """
+    _check_grid(grid)
+    angle = radius_m / EARTH_RADIUS_M
+    d_lat = math.degrees(angle)
+    lat_min = max(-90.0, lat - d_lat)
+    lat_max = min(90.0, lat + d_lat)
+    units_per_deg = _GRID_METERS_PER_DEG / tile_size_m
+    
+    if grid == TILE_GRID_BANDED:
+        rows = range(math.floor(lat_min * units_per_deg), math.floor(lat_max * units_per_deg) + 1)
+    else:
+        rows = range(int(lat_min * units_per_deg), int(lat_max * units_per_deg) + 1)
+    
+    boxes = []
+    for row in rows:
+        if grid == TILE_GRID_BANDED:
+            row_lo = max(-90.0, row / units_per_deg)
+            row_hi = min(90.0, (row + 1) / units_per_deg)
+        else:
+            row_lo, row_hi = _row_lat_bounds(row, tile_size_m)
+        span_lo = max(row_lo, lat_min)
+        span_hi = min(row_hi, lat_max)
+        if span_lo > span_hi:
+            continue
+        
+        half_width = _cap_half_width_deg(lat, angle, span_lo, span_hi)
+        if half_width is None:
+            continue
+        
+        for col in _circle_columns(row, lng, half_width, span_lo, span_hi, tile_size_m, grid):
+            key = pack_tile_key(row, col)
+            boxes.append((key, tile_key_bounds(key, tile_size_m, grid)))
+    
+    return classify_tiles(lat, lng, radius_m, boxes)
+
+
+def classify_tiles(
+    lat: float,
+    lng: float,
+    radius_m: float,
+    boxes: Iterable[Tuple[int, Tuple[float, float, float, float]]]
+) -> TileCovering:
+    """
+    Classify candidate tiles against a query circle, as `cover_circle` does.
+    
+    Args:
+        lat: Circle center latitude (degrees)
+        lng: Circle center longitude (degrees)
+        radius_m: Circle radius in meters
+        boxes: (tile key, `tile_key_bounds` box) pairs to classify
+    
+    Returns:
+        TileCovering of the candidates that intersect the circle
+    """
+    inside = []
+    edge = []
+    for key, box in boxes:
+        # Most rejected tiles are settled by the nearest point alone
+        if _box_nearest_m(lat, lng, *box) > radius_m + _COVER_MARGIN_M:
+            continue
+        if _box_farthest_m(lat, lng, *box) <= radius_m - _COVER_MARGIN_M:
+            inside.append(key)
+        else:
+            edge.append(key)
+    
+    inside_set = frozenset(inside)
+    edge_set = frozenset(edge)
+    return TileCovering(tiles=inside_set | edge_set, inside=inside_set, edge=edge_set)
+
+
+# Quadtree cells (Web Mercator quadkeys). A cell is packed into one int:
+# x and y (up to 29 bits each) above a 5-bit level, so cells of every
+# level share one key space and parents/children are bit shifts.
+QUAD_MAX_LEVEL = 29
+_MERCATOR_MAX_LAT = 85.05112878
+_EARTH_CIRCUMFERENCE_M = 2 * math.pi * EARTH_RADIUS_M
+
+
+def pack_quad_cell(level: int, x: int, y: int) -> int:
+    """Pack a quadtree cell (level, x, y) into an int key."""
+    return (((x << 29) | y) << 5) | level
+
+
+def unpack_quad_cell(cell: int) -> Tuple[int, int, int]:
+    """Unpack a quadtree cell key into (level, x, y)."""
+    level = cell & 0x1F
+    xy = cell >> 5
+    return level, xy >> 29, xy & ((1 << 29) - 1)
+
+
+def lat_lng_to_quad_cell(lat: float, lng: float, level: int) -> int:
+    """
+    Convert lat/lng to the quadtree cell containing it at a given level.
+    
+    Args:
+        lat: Latitude (degrees, clamped to the Mercator range)
+        lng: Longitude (degrees)
+        level: Quadtree level (0 = whole world, each level splits cells in 4)
+    
+    Returns:
+        Packed quadtree cell key
+    """
+    if not 0 <= level <= QUAD_MAX_LEVEL:
+        raise ValueError(f"level must be in [0, {QUAD_MAX_LEVEL}]")
+    
+    n = 1 << level
+    lat = min(max(lat, -_MERCATOR_MAX_LAT), _MERCATOR_MAX_LAT)
+    sin_lat = math.sin(math.radians(lat))
+    x = int((lng + 180.0) / 360.0 * n) % n
+    y = int((0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * n)
+    return pack_quad_cell(level, x, min(max(y, 0), n - 1))
+
+
+def quad_cell_parent(cell: int) -> int:
+    """Get the parent of a quadtree cell (one level coarser)."""
+    level, x, y = unpack_quad_cell(cell)
+    if level == 0:
+        raise ValueError("level 0 cell has no parent")
+    return pack_quad_cell(level - 1, x >> 1, y >> 1)
+
+
+def quad_cell_ancestor(cell: int, level: int) -> int:
+    """Get the ancestor of a quadtree cell at a coarser level."""
+    cell_level, x, y = unpack_quad_cell(cell)
+    shift = cell_level - level
+    if shift < 0:
+        raise ValueError("ancestor level must not be finer than the cell")
+    return pack_quad_cell(level, x >> shift, y >> shift)
+
+
+def quad_cell_children(cell: int) -> list[int]:
+    """Get the 4 children of a quadtree cell (one level finer)."""
+    level, x, y = unpack_quad_cell(cell)
+    if level >= QUAD_MAX_LEVEL:
+        raise ValueError("cell is at the finest level")
+    return [
+        pack_quad_cell(level + 1, 2 * x + dx, 2 * y + dy)
+        for dy in (0, 1)
+        for dx in (0, 1)
+    ]
+
+
+def _mercator_y_to_lat(y: float, n: int) -> float:
+    """Latitude of a Mercator tile row edge."""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def quad_cell_bounds(cell: int) -> Tuple[float, float, float, float]:
+    """
+    Get the lat/lng bounds of a quadtree cell.
+    
+    Returns:
+        Tuple of (min_lat, min_lng, max_lat, max_lng) in degrees
+    """
+    level, x, y = unpack_quad_cell(cell)
+    n = 1 << level
+    return (
+        _mercator_y_to_lat(y + 1, n),
+        x / n * 360.0 - 180.0,
+        _mercator_y_to_lat(y, n),
+        (x + 1) / n * 360.0 - 180.0,
+    )
+
+
+def quad_cell_to_quadkey(cell: int) -> str:
+    """Format a quadtree cell as a quadkey string (one digit per level)."""
+    level, x, y = unpack_quad_cell(cell)
+    digits = []
+    for i in range(level, 0, -1):
+        mask = 1 << (i - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def quadkey_to_quad_cell(quadkey: str) -> int:
+    """Parse a quadkey string into a packed quadtree cell key."""
+    x = 0
+    y = 0
+    for digit in quadkey:
+        if digit not in "0123":
+            raise ValueError(f"Invalid quadkey digit: {digit!r}")
+        value = int(digit)
+        x = (x << 1) | (value & 1)
+        y = (y << 1) | (value >> 1)
+    return pack_quad_cell(len(quadkey), x, y)
+
+
+def quad_level_for_radius(lat: float, radius_m: float) -> int:
+    """
+    Get the finest quadtree level whose cells are at least `radius_m` wide.
+    
+    A circle then spans at most 3x3 cells at that level, which makes it a
+    good starting level for a radius query.
+    """
+    width_at_level0 = _EARTH_CIRCUMFERENCE_M * math.cos(math.radians(min(abs(lat), _MERCATOR_MAX_LAT)))
+    if radius_m <= 0:
+        return QUAD_MAX_LEVEL
+    level = int(math.floor(math.log2(width_at_level0 / radius_m)))
+    return min(max(level, 0), QUAD_MAX_LEVEL)
+
+
+def quad_cells_in_box(
+    min_lat: float,
+    min_lng: float,
+    max_lat: float,
+    max_lng: float,
+    level: int
+) -> list[int]:
+    """Get all quadtree cells at `level` overlapping a lat/lng box (lng may wrap)."""
+    n = 1 << level
+    _, x0, y_top = unpack_quad_cell(lat_lng_to_quad_cell(max_lat, min_lng, level))
+    _, x1, y_bottom = unpack_quad_cell(lat_lng_to_quad_cell(min_lat, max_lng, level))
+    span = (x1 - x0) % n
+    if max_lng - min_lng >= 360.0:
+        span = n - 1
+    return [
+        pack_quad_cell(level, (x0 + dx) % n, y)
+        for y in range(y_top, y_bottom + 1)
+        for dx in range(span + 1)
+    ]
 
 
 def proximity_band(distance_m: float) -> Literal["0-100", "100-250", "250-500", "500-1000", ">1000"]:
@@ -199,6 +1330,34 @@ def proximity_band(distance_m: float) -> Literal["0-100", "100-250", "250-500",
         return ">1000"
 
 
+# Band upper limits as squared meters, for sqrt-free comparisons
+_BAND_LIMITS_SQ = (
+    (100.0 ** 2, "0-100"),
+    (250.0 ** 2, "100-250"),
+    (500.0 ** 2, "250-500"),
+    (1000.0 ** 2, "500-1000"),
+)
+
+
+def proximity_band_from_squared(distance_sq_m: float) -> Literal["0-100", "100-250", "250-500", "500-1000", ">1000"]:
+    """
+    Map a squared distance (meters²) to a proximity band.
+    
+    Same bands as `proximity_band`, compared on squared thresholds so
+    callers holding squared distances never need a sqrt.
+    
+    Args:
+        distance_sq_m: Squared distance in meters²
+    
+    Returns:
+        Proximity band string
+    """
+    for limit_sq, band in _BAND_LIMITS_SQ:
+        if distance_sq_m <= limit_sq:
+            return band
+    return ">1000"
+
+
 def proximity_band_score(band: str) -> float:
     """
     Get numeric score for a proximity band.
@@ -0,0 +1,449 @@
+"""
+Incremental matching: per-request top-K candidate lists kept up to date
+as helpers are created, move, or change availability.
+
+Instead of re-ranking every open request on every change, a helper update
+only touches the requests whose search cells contain the helper's old or
+new geohash cell, and their top K is rebuilt only when the update can
+change it. Reading the current candidates is O(K).
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import (
+    get_geohash_precision,
+    get_match_track_idle_s,
+    get_match_weights,
+    get_presence_ttl_min,
+    get_top_k,
+)
+from .geo import get_geohash_for_point, haversine_meters
+from .matching import (
+    Helper,
+    RankedCandidate,
+    Request,
+    can_supply,
+    product_mask,
+    score_from_distance,
+    urgency_level,
+)
+from .repo import add_presence_listener
+from . import storage
+from .pubsub import tile_broker
+
+# Ranking key of a candidate: (rounded score, -arrival seq); larger is better
+_Key = Tuple[float, int]
+
+
+class IncrementalMatcher:
+    """
+    Top-K candidate lists for open requests, updated on helper changes.
+    
+    Candidates for a request are the available helpers carrying its
+    productNeed in the cells /match searches: its geohash cell and the
+    rings around it out to HELPER_SEARCH_MAX_RADIUS_M
+    (`storage.helper_search_cells`). For each tracked request all in-range
+    helper scores are kept, plus the ranked top K and its K-th key, so
+    most updates are a dict write and one comparison.
+    Ties are broken by the order in which helpers were first seen.
+    
+    Helpers are fed through `update_helper`. With a `helper_source`, the
+    helpers already stored in a cell are also read from it the first time
+    a tracked request searches that cell, so the matcher never has to load
+    every stored helper up front.
+    
+    `evict` bounds what is kept: helpers given an `expires_at` (presence,
+    whose records expire after PRESENCE_TTL_MIN) are dropped once it has
+    passed, and requests nobody has read for `request_idle_s` are
+    untracked (callers track them again on their next read).
+    """
+    
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        top_k: Optional[int] = None,
+        helper_source: Optional[Callable[[str], Iterable[Helper]]] = None,
+        request_idle_s: Optional[float] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            weights: Matching weights (default from config)
+            top_k: Candidates kept per request (default from config)
+            helper_source: Available helpers stored in a geohash cell
+                (e.g. `storage.get_cell_helpers`)
+            request_idle_s: Untrack requests not read for this long
+                (None = keep until `untrack_request`)
+            clock: Current time in seconds (epoch, like presence lastSeenAt)
+        """
+        self.weights = weights if weights is not None else get_match_weights()
+        self.top_k = top_k if top_k is not None else get_top_k()
+        self.precision = get_geohash_precision()
+        self._helper_source = helper_source
+        self._seeded: Set[str] = set()  # Cells already read from helper_source
+        self.request_idle_s = request_idle_s
+        self._clock = clock
+        
+        self._requests: Dict[str, Request] = {}
+        self._request_cells: Dict[str, List[str]] = {}  # request ID -> search cells
+        self._requests_by_cell: Dict[str, Set[str]] = {}  # search cell -> request IDs
+        self._request_need: Dict[str, int] = {}  # request ID -> product bitmask
+        
+        self._helpers: Dict[str, Helper] = {}  # helper ID -> latest record
+        self._helper_cell: Dict[str, str] = {}  # helper ID -> geohash cell
+        self._helpers_by_cell: Dict[str, Set[str]] = {}  # cell -> helper IDs
+        self._helper_seq: Dict[str, int] = {}  # helper ID -> first-seen order
+        
+        # request ID -> helper ID -> (key, distance); available, in-range helpers
+        self._scores: Dict[str, Dict[str, Tuple[_Key, float]]] = {}
+        self._top: Dict[str, List[RankedCandidate]] = {}  # request ID -> ranked top K
+        self._top_ids: Dict[str, Set[str]] = {}  # request ID -> helper IDs in top K
+        self._kth: Dict[str, Optional[_Key]] = {}  # request ID -> K-th key (None = not full)
+        
+        # Oldest first, so `evict` only looks at the front of each
+        self._helper_expiry: "OrderedDict[str, float]" = OrderedDict()  # helper ID -> expires_at
+        self._request_read: "OrderedDict[str, float]" = OrderedDict()  # request ID -> last read
+        
+        self.updates = 0  # Request lists touched by helper changes
+        self.rebuilds = 0  # Top-K rebuilds
+        self.evicted_helpers = 0  # Helpers dropped after expiring
+        self.evicted_requests = 0  # Requests untracked after idling
+        
+        # Called with the cells each helper change touched (e.g. to publish them)
+        self._cell_listeners: List[Callable[[Set[str]], None]] = []
+    
+    # Requests
+    
+    def track_request(self, request: Request) -> None:
+        """Start (or restart) maintaining candidates for a request."""
+        self.untrack_request(request["id"])
+        
+        request_id = request["id"]
+        cells = storage.helper_search_cells(self._cell(request["lat"], request["lng"]))
+        self._requests[request_id] = request
+        self._request_cells[request_id] = cells
+        for cell in cells:
+            self._requests_by_cell.setdefault(cell, set()).add(request_id)
+        self._request_need[request_id] = need = product_mask(request.get("productNeed"))
+        self._seed(cells)
+        
+        scores: Dict[str, Tuple[_Key, float]] = {}
+        for cell in cells:
+            for helper_id in self._helpers_by_cell.get(cell, ()):
+                helper = self._helpers[helper_id]
+                if helper.get("available", False) and can_supply(helper, need):
+                    scores[helper_id] = self._score(request, helper)
+        self._scores[request_id] = scores
+        self._rebuild(request_id)
+        self.touch(request_id)
+    
+    def untrack_request(self, request_id: str) -> None:
+        """Stop maintaining candidates for a request (e.g. once fulfilled)."""
+        if request_id not in self._requests:
+            return
+        del self._requests[request_id]
+        for cell in self._request_cells.pop(request_id):
+            members = self._requests_by_cell[cell]
+            members.discard(request_id)
+            if not members:
+                del self._requests_by_cell[cell]
+        for table in (self._request_need, self._scores, self._top, self._top_ids, self._kth, self._request_read):
+            table.pop(request_id, None)
+    
+    def candidates(self, request_id: str) -> Optional[List[RankedCandidate]]:
+        """
+        Get the current top K for a tracked request in O(K).
+        
+        Counts as a read for idle eviction.
+        
+        Returns:
+            Ranked candidates (same fields as `rank_helpers`), or None if
+            the request is not tracked
+        """
+        top = self._top.get(request_id)
+        if top is None:
+            return None
+        self.touch(request_id)
+        return list(top)
+    
+    def touch(self, request_id: str) -> None:
+        """Mark a tracked request as read now (e.g. by an open stream), deferring idle eviction."""
+        if request_id in self._requests:
+            self._request_read[request_id] = self._clock()
+            self._request_read.move_to_end(request_id)
+    
+    def is_tracked(self, request_id: str) -> bool:
+        """Check whether a request is tracked."""
+        return request_id in self._requests
+    
+    def search_cells(self, request_id: str) -> List[str]:
+        """Get the geohash cells a tracked request's candidates come from."""
+        return list(self._request_cells[request_id])
+    
+    def add_cell_listener(self, listener: Callable[[Set[str]], None]) -> None:
+        """Call `listener` with the old and new cells of every helper change."""
+        self._cell_listeners.append(listener)
+    
+    # Helpers
+    
+    def update_helper(self, helper: Helper, expires_at: Optional[float] = None) -> None:
+        """
+        Apply a created, moved, or (un)available helper.
+        
+        Only requests whose search cells include the helper's old or new
+        cell are touched.
+        
+        Args:
+            helper: Latest helper record
+            expires_at: When `evict` drops the helper unless updated again
+                (None = never, e.g. stored helpers)
+        """
+        helper_id = helper["id"]
+        if expires_at is None:
+            self._helper_expiry.pop(helper_id, None)
+        else:
+            self._helper_expiry[helper_id] = expires_at
+            self._helper_expiry.move_to_end(helper_id)
+        old_cell = self._helper_cell.get(helper_id)
+        new_cell = self._cell(helper["lat"], helper["lng"])
+        
+        self._helpers[helper_id] = helper
+        self._helper_seq.setdefault(helper_id, len(self._helper_seq))
+        if old_cell != new_cell:
+            self._move_helper(helper_id, old_cell, new_cell)
+        
+        in_range = self._requests_near(new_cell)
+        affected = set(in_range)
+        if old_cell is not None and old_cell != new_cell:
+            affected |= self._requests_near(old_cell)
+        
+        available = helper.get("available", False)
+        for request_id in affected:
+            if (
+                available
+                and request_id in in_range
+                and can_supply(helper, self._request_need[request_id])
+            ):
+                self._apply(request_id, helper_id, self._score(self._requests[request_id], helper))
+            else:
+                self._apply(request_id, helper_id, None)
+        
+        self._notify({new_cell} if old_cell is None else {old_cell, new_cell})
+    
+    def remove_helper(self, helper_id: str) -> None:
+        """Drop a helper from every candidate list."""
+        cell = self._helper_cell.get(helper_id)
+        if cell is None:
+            return
+        for request_id in self._requests_near(cell):
+            self._apply(request_id, helper_id, None)
+        self._move_helper(helper_id, cell, None)
+        del self._helpers[helper_id]
+        self._helper_expiry.pop(helper_id, None)
+        self._notify({cell})
+    
+    def evict(self) -> Dict[str, int]:
+        """
+        Drop expired helpers and untrack idle requests.
+        
+        Expiry and read times are kept oldest first, so this only looks at
+        entries that are due and is cheap to call often (e.g. on every
+        read or presence update). Dropped helpers are reported to cell
+        listeners like any removal, so open streams see them leave.
+        
+        Returns:
+            Dict with the number of "helpers" and "requests" evicted
+        """
+        now = self._clock()
+        helpers = 0
+        while self._helper_expiry:
+            helper_id, expires_at = next(iter(self._helper_expiry.items()))
+            if expires_at > now:
+                break
+            self.remove_helper(helper_id)
+            self._helper_expiry.pop(helper_id, None)
+            helpers += 1
+        
+        requests = 0
+        if self.request_idle_s is not None:
+            cutoff = now - self.request_idle_s
+            while self._request_read:
+                request_id, read_at = next(iter(self._request_read.items()))
+                if read_at > cutoff:
+                    break
+                self.untrack_request(request_id)  # Also pops the read time
+                requests += 1
+        
+        self.evicted_helpers += helpers
+        self.evicted_requests += requests
+        return {"helpers": helpers, "requests": requests}
+    
+    def configure(self, weights: Dict[str, float], top_k: int) -> None:
+        """Switch weights / K; rescoring every tracked request only if they changed."""
+        if weights == self.weights and top_k == self.top_k:
+            return
+        self.weights = dict(weights)
+        self.top_k = top_k
+        for request in list(self._requests.values()):
+            self.track_request(request)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get tracked counts and update/rebuild/eviction counters."""
+        return {
+            "requests": len(self._requests),
+            "helpers": len(self._helpers),
+            "updates": self.updates,
+            "rebuilds": self.rebuilds,
+            "evictedHelpers": self.evicted_helpers,
+            "evictedRequests": self.evicted_requests,
+        }
+    
+    # Internals
+    
+    def _cell(self, lat: float, lng: float) -> str:
+        return get_geohash_for_point(lat, lng, self.precision)
+    
+    def _notify(self, cells: Set[str]) -> None:
+        for listener in self._cell_listeners:
+            listener(cells)
+    
+    def _seed(self, cells: List[str]) -> None:
+        """
+        Read the stored helpers of cells not searched before.
+        
+        Every cell a tracked request searches is seeded when it is tracked,
+        so no tracked request can rank a newly seeded helper yet and none
+        needs updating. Helpers already known (e.g. from a later
+        `update_helper`) are kept as they are.
+        """
+        if self._helper_source is None:
+            return
+        for cell in cells:
+            if cell in self._seeded:
+                continue
+            self._seeded.add(cell)
+            for helper in self._helper_source(cell):
+                helper_id = helper["id"]
+                if helper_id not in self._helpers:
+                    self._helpers[helper_id] = helper
+                    self._helper_seq.setdefault(helper_id, len(self._helper_seq))
+                    self._move_helper(helper_id, None, self._cell(helper["lat"], helper["lng"]))
+    
+    def _requests_near(self, cell: str) -> Set[str]:
+        """Tracked requests whose search cells include `cell`."""
+        return self._requests_by_cell.get(cell, set())
+    
+    def _move_helper(self, helper_id: str, old_cell: Optional[str], new_cell: Optional[str]) -> None:
+        if old_cell is not None:
+            members = self._helpers_by_cell[old_cell]
+            members.discard(helper_id)
+            if not members:
+                del self._helpers_by_cell[old_cell]
+        if new_cell is None:
+            self._helper_cell.pop(helper_id, None)
+            return
+        self._helper_cell[helper_id] = new_cell
+        self._helpers_by_cell.setdefault(new_cell, set()).add(helper_id)
+    
+    def _score(self, request: Request, helper: Helper) -> Tuple[_Key, float]:
+        """Ranking key and distance, with the same floats as `rank_helpers`."""
+        dist_m = haversine_meters(request["lat"], request["lng"], helper["lat"], helper["lng"])
+        urgency_term = self.weights["urgency"] * urgency_level(request["urgency"])
+        score = score_from_distance(urgency_term, dist_m, helper["rating"], self.weights)
+        return (round(score, 4), -self._helper_seq[helper["id"]]), dist_m
+    
+    def _apply(self, request_id: str, helper_id: str, entry: Optional[Tuple[_Key, float]]) -> None:
+        """Set (or clear) one helper's entry and rebuild the top K if it can change."""
+        scores = self._scores[request_id]
+        if entry is None and helper_id not in scores:
+            return
+        self.updates += 1
+        
+        if entry is None:
+            del scores[helper_id]
+        else:
+            scores[helper_id] = entry
+        
+        kth = self._kth[request_id]
+        if (
+            helper_id in self._top_ids[request_id]
+            or kth is None
+            or (entry is not None and entry[0] > kth)
+        ):
+            self._rebuild(request_id)
+    
+    def _rebuild(self, request_id: str) -> None:
+        """Recompute a request's top K from its kept scores (O(n log k))."""
+        self.rebuilds += 1
+        scores = self._scores[request_id]
+        best = heapq.nlargest(self.top_k, scores.items(), key=lambda item: item[1][0])
+        
+        self._top[request_id] = [
+            {
+                "id": helper_id,
+                "score": key[0],
+                "distM": round(dist_m, 2),
+                "rating": self._helpers[helper_id]["rating"],
+            }
+            for helper_id, (key, dist_m) in best
+        ]
+        self._top_ids[request_id] = {helper_id for helper_id, _ in best}
+        self._kth[request_id] = best[-1][1][0] if self.top_k > 0 and len(best) == self.top_k else None
+
+
+def presence_to_helper(presence: Dict) -> Helper:
+    """Convert a repo presence record (role "helper") to a Helper."""
+    return {
+        "id": presence["userId"],
+        "lat": presence["lat"],
+        "lng": presence["lng"],
+        "rating": presence.get("rating", 0.5) or 0.5,
+        "available": presence["available"],
+        "updatedAt": str(presence["lastSeenAt"]),
+    }
+
+
+def diff_candidates(old: List[RankedCandidate], new: List[RankedCandidate]) -> Dict[str, list]:
+    """
+    Describe how a ranked candidate list changed.
+    
+    Returns:
+        Dict with "entered" (new candidates), "left" (IDs no longer
+        ranked), "updated" (kept candidates whose score, distance or rating
+        changed) and "order" (the full new ID order, only if it changed);
+        all empty when nothing changed
+    """
+    old_by_id = {c["id"]: c for c in old}
+    new_ids = [c["id"] for c in new]
+    entered = [c for c in new if c["id"] not in old_by_id]
+    updated = [c for c in new if c["id"] in old_by_id and c != old_by_id[c["id"]]]
+    kept = set(new_ids)
+    left = [c["id"] for c in old if c["id"] not in kept]
+    order = new_ids if new_ids != [c["id"] for c in old] else []
+    return {"entered": entered, "left": left, "updated": updated, "order": order}
+
+
+def _on_presence(presence: Dict) -> None:
+    """Feed helper presence into the global matcher; it expires after PRESENCE_TTL_MIN."""
+    if presence["role"] == "helper":
+        expires_at = presence["lastSeenAt"] + get_presence_ttl_min() * 60
+        incremental_matcher.update_helper(presence_to_helper(presence), expires_at)
+    else:
+        incremental_matcher.remove_helper(presence["userId"])
+    incremental_matcher.evict()
+
+
+# Global matcher instance, fed by storage and presence writes. Stored helpers
+# are read per cell as requests need them and stored requests are tracked on
+# first use (see api.matching), so importing this module loads nothing.
+incremental_matcher = IncrementalMatcher(
+    helper_source=storage.get_cell_helpers,
+    request_idle_s=get_match_track_idle_s(),
+)
+storage.add_helper_listener(incremental_matcher.update_helper)
+storage.add_request_listener(incremental_matcher.track_request)
+add_presence_listener(_on_presence)
+incremental_matcher.add_cell_listener(tile_broker.publish)
@@ -0,0 +1,103 @@
+"""
+Versioned LRU cache for /match results.
+Clients re-poll the same request while the user waits, so the ranked result
+is kept and served again until anything it was computed from changes.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .matching import RankedCandidate
+
+
+class _Entry(NamedTuple):
+    cells: Tuple[str, ...]  # Geohash cells the search visited
+    versions: Hashable  # Index generations of those cells when computed
+    ranked: List[RankedCandidate]
+
+
+def match_cache_key(request_id: str, weights: Dict[str, float], top_k: int, pruning: bool) -> Tuple:
+    """Build the cache key for one /match configuration."""
+    return (request_id, tuple(sorted(weights.items())), top_k, pruning)
+
+
+class MatchCache:
+    """
+    LRU cache of ranked candidates keyed by (request, weights, topK, path).
+    
+    Each entry remembers the geohash cells its search visited and their
+    generations, with the request's (see `storage.get_match_versions`). A
+    lookup reads the current generations of those cells and only gets the
+    entry back while they are unchanged, so a helper write in a visited
+    cell invalidates it and writes elsewhere, including cells the search
+    pruned, do not. Results without versions (storage shared with other
+    processes) are not cached.
+    """
+    
+    def __init__(self, maxsize: int = 1024):
+        """
+        Args:
+            maxsize: Maximum number of cached entries
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0  # Misses on an entry whose generations had changed
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+    
+    def get(
+        self,
+        key: Hashable,
+        versions: Callable[[Sequence[str]], Hashable]
+    ) -> Optional[List[RankedCandidate]]:
+        """
+        Get a cached result if its cells are unchanged.
+        
+        Args:
+            key: Cache key (see `match_cache_key`)
+            versions: Current generations of the given cells
+        
+        Returns:
+            Ranked candidates (shared, do not mutate), or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.versions == versions(entry.cells):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.ranked
+        
+        self.misses += 1
+        if entry is not None:
+            self.stale += 1
+            del self._entries[key]
+        return None
+    
+    def put(self, key: Hashable, cells: Sequence[str], versions: Hashable, ranked: List[RankedCandidate]) -> None:
+        """Store a result computed from `cells` at `versions` (not stored if `versions` is None)."""
+        if versions is None:
+            return
+        self._entries[key] = _Entry(tuple(cells), versions, ranked)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, float]:
+        """Get hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+    
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
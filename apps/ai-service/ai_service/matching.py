@@ -3,9 +3,17 @@ Matching algorithm for ranking helpers based on urgency, proximity, and trust.
 Uses configurable weights for explainable scoring.
 """
 
-from typing import Dict, List, Literal, TypedDict
+import heapq
+from collections.abc import Sized
+from operator import itemgetter
+from typing import Dict, Iterable, List, Literal, NamedTuple, Optional, Tuple, TypedDict
 
-from .geo import haversine_meters
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; ranking falls back to the scalar path
+    np = None
+
+from .geo import haversine_many, haversine_meters
 
 Urgency = Literal["urgent", "normal", "low"]
 
@@ -20,7 +28,12 @@ class Request(TypedDict):
     createdAt: str
 
 
-class Helper(TypedDict):
+class _HelperOptional(TypedDict, total=False):
+    """Optional helper fields."""
+    inventory: int  # Products carried (PRODUCT_* bits); missing = unknown, treated as all
+
+
+class Helper(_HelperOptional):
     """Helper data structure."""
     id: str
     lat: float
@@ -38,6 +51,60 @@ class RankedCandidate(TypedDict):
     rating: float
 
 
+# Product inventory bits, matching Request.productNeed values
+PRODUCT_PAD = 1
+PRODUCT_TAMPON = 2
+PRODUCT_LINER = 4
+ALL_PRODUCTS = PRODUCT_PAD | PRODUCT_TAMPON | PRODUCT_LINER
+PRODUCT_BITS = {"pad": PRODUCT_PAD, "tampon": PRODUCT_TAMPON, "liner": PRODUCT_LINER}
+
+
+def product_mask(product_need: Optional[str]) -> int:
+    """
+    Convert a request's productNeed to its inventory bit.
+    
+    Accepts singular or plural names ("pad", "pads"). Missing or unknown
+    needs give 0, which every helper satisfies.
+    """
+    if not product_need:
+        return 0
+    name = product_need.strip().lower()
+    if name not in PRODUCT_BITS and name.endswith("s"):
+        name = name[:-1]
+    return PRODUCT_BITS.get(name, 0)
+
+
+def inventory_mask(products: Iterable[str]) -> int:
+    """
+    Build an inventory bitmask from product names.
+    
+    Raises:
+        ValueError: If a product name is unknown
+    """
+    mask = 0
+    for product in products:
+        bit = product_mask(product)
+        if not bit:
+            raise ValueError(f"Unknown product: {product}")
+        mask |= bit
+    return mask
+
+
+def inventory_products(mask: int) -> List[str]:
+    """List the product names in an inventory bitmask."""
+    return [name for name, bit in PRODUCT_BITS.items() if mask & bit]
+
+
+def helper_inventory(helper: Helper) -> int:
+    """Get a helper's inventory bitmask (all products if not reported)."""
+    return helper.get("inventory", ALL_PRODUCTS)
+
+
+def can_supply(helper: Helper, need: int) -> bool:
+    """Check whether a helper carries every product in `need`."""
+    return helper_inventory(helper) & need == need
+
+
 def urgency_level(urgency: Urgency) -> float:
     """
     Convert urgency level to numeric score.
@@ -106,60 +173,348 @@ def score_helper(
     # Calculate distance
     dist_m = haversine_meters(req["lat"], req["lng"], helper["lat"], helper["lng"])
     
-    # Get component scores
-    u_score = urgency_level(req["urgency"])
-    p_score = proximity_score(dist_m)
-    t_score = helper["rating"]
+    urgency_term = weights["urgency"] * urgency_level(req["urgency"])
+    return score_from_distance(urgency_term, dist_m, helper["rating"], weights)
+
+
+def score_from_distance(
+    urgency_term: float,
+    dist_m: float,
+    rating: float,
+    weights: Dict[str, float]
+) -> float:
+    """
+    Calculate composite score from a precomputed distance.
+    
+    Shared by `score_helper` and the ranking loop so both produce the same
+    floats: the urgency term depends only on the request and is computed
+    once per ranking.
+    
+    Args:
+        urgency_term: weights["urgency"] * urgency_level(req["urgency"])
+        dist_m: Request-to-helper distance in meters
+        rating: Helper rating (0.0 to 1.0)
+        weights: Dictionary with "proximity" and "trust" keys
+    
+    Returns:
+        Composite score (higher is better)
+    """
+    return (
+        urgency_term
+        + weights["proximity"] * proximity_score(dist_m)
+        + weights["trust"] * rating
+    )
+
+
+# Below this many helpers the scalar loop beats building columns
+# (see scripts/bench_rank_helpers.py)
+VECTOR_RANK_THRESHOLD = 64
+
+# Proximity band upper limits (meters) and scores, as in `proximity_score`
+_PROXIMITY_LIMITS = (100.0, 250.0, 500.0, 1000.0)
+_PROXIMITY_SCORES = (1.0, 0.8, 0.6, 0.4, 0.2)
+
+
+class HelperColumns(NamedTuple):
+    """
+    Columnar helper snapshot: parallel arrays, one entry per helper.
+    
+    Build it once with `from_helpers` and rank against it many times;
+    scoring then runs as array expressions instead of a Python loop.
+    """
+    ids: List[str]
+    lat: "np.ndarray"
+    lng: "np.ndarray"
+    rating: "np.ndarray"
+    available: "np.ndarray"  # bool
+    inventory: "np.ndarray"  # int64 product bitmasks
+    
+    @classmethod
+    def from_helpers(cls, helpers: List[Helper]) -> "HelperColumns":
+        """Build a snapshot from helper dicts (requires NumPy)."""
+        if np is None:
+            raise RuntimeError("HelperColumns requires NumPy")
+        return cls(
+            ids=[h["id"] for h in helpers],
+            lat=np.fromiter((h["lat"] for h in helpers), dtype=np.float64, count=len(helpers)),
+            lng=np.fromiter((h["lng"] for h in helpers), dtype=np.float64, count=len(helpers)),
+            rating=np.fromiter((h["rating"] for h in helpers), dtype=np.float64, count=len(helpers)),
+            available=np.fromiter((bool(h.get("available", False)) for h in helpers), dtype=bool, count=len(helpers)),
+            inventory=np.fromiter((helper_inventory(h) for h in helpers), dtype=np.int64, count=len(helpers)),
+        )
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def proximity_scores(meters: "np.ndarray") -> "np.ndarray":
+    """
+    Vectorized `proximity_score`: band lookup with searchsorted.
+    
+    Args:
+        meters: Distances in meters
+    
+    Returns:
+        Proximity scores, one per distance
+    """
+    bands = np.searchsorted(_PROXIMITY_LIMITS, meters, side="left")
+    return np.asarray(_PROXIMITY_SCORES)[bands]
+
+
+def score_columns(
+    req: Request,
+    columns: HelperColumns,
+    weights: Dict[str, float],
+    mask: Optional["np.ndarray"] = None
+):
+    """
+    Score every helper in a columnar snapshot.
+    
+    Uses the same formula and operation order as `score_from_distance`.
+    
+    Args:
+        req: Request data
+        columns: Helper snapshot
+        weights: Matching weights dictionary
+        mask: Only score these rows (bool array; default all)
     
-    # Weighted sum
-    score = (
-        weights["urgency"] * u_score
-        + weights["proximity"] * p_score
-        + weights["trust"] * t_score
+    Returns:
+        Tuple of (row indices, scores, distances in meters) as arrays
+    """
+    rows = np.arange(len(columns)) if mask is None else np.flatnonzero(mask)
+    dists = haversine_many(req["lat"], req["lng"], columns.lat[rows], columns.lng[rows])
+    urgency_term = weights["urgency"] * urgency_level(req["urgency"])
+    scores = (
+        urgency_term
+        + weights["proximity"] * proximity_scores(dists)
+        + weights["trust"] * columns.rating[rows]
     )
+    return rows, scores, dists
+
+
+def rank_columns(
+    req: Request,
+    columns: HelperColumns,
+    weights: Dict[str, float],
+    top_k: int
+) -> List[RankedCandidate]:
+    """
+    Rank a columnar helper snapshot and return top K.
+    
+    argpartition finds the K-th best score in O(n); every row scoring at
+    least that much is then sorted by (score desc, row asc), so ties keep
+    input order exactly like `rank_helpers`. Helpers that do not carry
+    the request's product are masked out before scoring.
+    
+    Args:
+        req: Request data
+        columns: Helper snapshot
+        weights: Matching weights dictionary
+        top_k: Number of top results to return
+    
+    Returns:
+        List of ranked candidates with score, distance, and rating
+    """
+    if top_k <= 0:
+        return []
+    
+    mask = columns.available
+    need = product_mask(req.get("productNeed"))
+    if need:
+        mask = mask & (columns.inventory & need == need)
+    rows, scores, dists = score_columns(req, columns, weights, mask)
+    ranked = np.round(scores, 4)
+    
+    picked = np.arange(len(rows))
+    if top_k < len(rows):
+        kth = np.argpartition(-ranked, top_k - 1)[top_k - 1]
+        picked = np.flatnonzero(ranked >= ranked[kth])
+    winners = picked[np.lexsort((picked, -ranked[picked]))][:top_k]
     
-    return score
+    return [
+        {
+            "id": columns.ids[rows[i]],
+            "score": round(float(scores[i]), 4),
+            "distM": round(float(dists[i]), 2),
+            "rating": float(columns.rating[rows[i]]),
+        }
+        for i in winners
+    ]
 
 
 def rank_helpers(
     req: Request,
     helpers: List[Helper],
     weights: Dict[str, float],
-    top_k: int
+    top_k: int,
+    vector_threshold: int = VECTOR_RANK_THRESHOLD
 ) -> List[RankedCandidate]:
     """
     Rank helpers by composite score and return top K.
     
+    Single pass: each distance is computed once, a bounded heap keeps the
+    K best (O(n log k)), and result records are built for the winners
+    only. Ties keep input order, as with a stable sort by score.
+    
+    Helpers that are unavailable or do not carry the request's productNeed
+    (see `can_supply`) are skipped before scoring.
+    
+    With NumPy installed and at least `vector_threshold` helpers, ranking
+    switches to the columnar path (`rank_columns`), which gives the same
+    result.
+    
     Args:
         req: Request data
         helpers: List of candidate helpers
         weights: Matching weights dictionary
         top_k: Number of top results to return
+        vector_threshold: Minimum helper count for the columnar path
     
     Returns:
         List of ranked candidates with score, distance, and rating
     """
-    # Filter to available helpers only
-    available_helpers = [h for h in helpers if h.get("available", False)]
+    if top_k <= 0:
+        return []
+    if np is not None and len(helpers) >= vector_threshold:
+        return rank_columns(req, HelperColumns.from_helpers(helpers), weights, top_k)
     
-    # Calculate scores and distances for each helper
-    candidates = []
-    for helper in available_helpers:
-        dist_m = haversine_meters(
-            req["lat"], req["lng"], helper["lat"], helper["lng"]
-        )
-        score = score_helper(req, helper, weights)
-        
-        candidates.append({
+    lat = req["lat"]
+    lng = req["lng"]
+    urgency_term = weights["urgency"] * urgency_level(req["urgency"])
+    need = product_mask(req.get("productNeed"))
+    
+    def scored():
+        """Yield (rounded score, distance, helper) for eligible helpers."""
+        for helper in helpers:
+            if not helper.get("available", False):
+                continue
+            if need and not can_supply(helper, need):
+                continue
+            dist_m = haversine_meters(lat, lng, helper["lat"], helper["lng"])
+            score = score_from_distance(urgency_term, dist_m, helper["rating"], weights)
+            yield round(score, 4), dist_m, helper
+    
+    # nlargest is stable: equal scores keep their input order
+    winners = heapq.nlargest(top_k, scored(), key=itemgetter(0))
+    
+    return [
+        {
             "id": helper["id"],
-            "score": round(score, 4),
+            "score": score,
             "distM": round(dist_m, 2),
             "rating": helper["rating"],
-        })
+        }
+        for score, dist_m, helper in winners
+    ]
+
+
+class BoundedRanking(NamedTuple):
+    """Result of a branch-and-bound ranking with work counters."""
+    candidates: List[RankedCandidate]
+    cells_visited: int  # Cells whose helpers were scored
+    cells_pruned: int  # Cells skipped by the score bound (never fetched; see rank_helpers_bounded)
+    helpers_scored: int  # Distances computed
+
+
+def score_upper_bound(urgency_term: float, min_dist_m: float, weights: Dict[str, float]) -> float:
+    """
+    Best score any helper at least `min_dist_m` away could reach.
     
-    # Sort by score descending
-    candidates.sort(key=lambda x: x["score"], reverse=True)
+    The proximity term is the band of the nearest possible distance and
+    trust is at most 1.0 (negative weights take their best end instead).
+    
+    Args:
+        urgency_term: weights["urgency"] * urgency_level(req["urgency"])
+        min_dist_m: Lower bound on the helper's distance in meters
+        weights: Matching weights dictionary
     
-    # Return top K
-    return candidates[:top_k]
+    Returns:
+        Upper bound on the composite score
+    """
+    w_proximity = weights["proximity"]
+    w_trust = weights["trust"]
+    return (
+        urgency_term
+        + max(w_proximity * proximity_score(min_dist_m), w_proximity * _PROXIMITY_SCORES[-1])
+        + max(w_trust, 0.0)
+    )
 
+
+def rank_helpers_bounded(
+    req: Request,
+    cells: Iterable[Tuple[float, Iterable[Helper]]],
+    weights: Dict[str, float],
+    top_k: int
+) -> BoundedRanking:
+    """
+    Rank helpers cell by cell, nearest cells first, with branch and bound.
+    
+    `cells` yields (min distance from the request to the cell, helpers in
+    the cell) in increasing min distance. Before a cell is expanded its
+    score upper bound is compared with the current K-th best score; once
+    the bound can no longer beat it, the remaining cells (all farther away,
+    so bounded by the same or a lower band) are pruned without fetching
+    their helpers or computing distances. A lazy `cells` iterator is not
+    drawn from again, so the cells behind it are never even listed; only
+    sized `cells` (e.g. lists) count every pruned cell in `cells_pruned`.
+    
+    The result equals `rank_helpers` over every helper in `cells`, with
+    ties kept in visit order (including its productNeed filter).
+    
+    Args:
+        req: Request data
+        cells: (min_dist_m, helpers) pairs, nearest first; consumed lazily
+        weights: Matching weights dictionary
+        top_k: Number of top results to return
+    
+    Returns:
+        BoundedRanking with ranked candidates and work counters
+    """
+    if top_k <= 0:
+        return BoundedRanking([], 0, 0, 0)
+    
+    lat = req["lat"]
+    lng = req["lng"]
+    urgency_term = weights["urgency"] * urgency_level(req["urgency"])
+    need = product_mask(req.get("productNeed"))
+    
+    # Min-heap of the K best so far: (rounded score, -visit seq, dist, helper)
+    best: List[Tuple[float, int, float, Helper]] = []
+    seq = 0
+    visited = 0
+    
+    for min_dist_m, helpers in cells:
+        if len(best) == top_k:
+            bound = round(score_upper_bound(urgency_term, min_dist_m, weights) + 1e-9, 4)
+            if best[0][0] > bound:
+                pruned = len(cells) - visited if isinstance(cells, Sized) else 1
+                break
+        visited += 1
+        
+        for helper in helpers:
+            if not helper.get("available", False):
+                continue
+            if need and not can_supply(helper, need):
+                continue
+            dist_m = haversine_meters(lat, lng, helper["lat"], helper["lng"])
+            score = round(score_from_distance(urgency_term, dist_m, helper["rating"], weights), 4)
+            seq += 1
+            entry = (score, -seq, dist_m, helper)
+            if len(best) < top_k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+    else:
+        pruned = 0
+    
+    best.sort(reverse=True)
+    candidates = [
+        {
+            "id": helper["id"],
+            "score": score,
+            "distM": round(dist_m, 2),
+            "rating": helper["rating"],
+        }
+        for score, _, dist_m, helper in best
+    ]
+    return BoundedRanking(candidates, visited, pruned, seq)
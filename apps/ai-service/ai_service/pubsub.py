@@ -0,0 +1,106 @@
+"""
+In-process pub/sub keyed by tile (geohash cell).
+Writers publish the cells a change touched; subscribers (e.g. match streams)
+wake up only for changes in the cells they watch.
+
+In production, this would be replaced by a shared broker (e.g. Redis pub/sub
+or Firestore listeners) so every server instance sees every change.
+"""
+
+import asyncio
+import threading
+from typing import Dict, Iterable, Set
+
+
+class TileSubscription:
+    """
+    A subscriber's view of changes in a fixed set of tiles.
+    
+    Changes are coalesced: however many publishes arrive between two
+    `wait` calls, the subscriber wakes once and gets the union of the
+    changed tiles, so a slow consumer never builds up a backlog.
+    """
+    
+    def __init__(self, tiles: Iterable[str]):
+        self.tiles = frozenset(tiles)
+        self._changed: Set[str] = set()
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+    
+    async def wait(self) -> Set[str]:
+        """Wait for the next change and return the tiles changed since the last call."""
+        await self._event.wait()
+        self._event.clear()
+        changed, self._changed = self._changed, set()
+        return changed
+    
+    def _notify(self, tiles: Set[str]) -> None:
+        self._changed |= tiles
+        self._event.set()
+
+
+class TileBroker:
+    """
+    Fan-out of tile change notifications to subscriptions.
+    
+    Publishing is safe from any thread: the subscriber map is guarded by a
+    lock and notifications are handed to each subscriber's event loop, so
+    sync code paths (e.g. storage writes, worker threads) can publish
+    directly.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()  # Guards _subscribers and the counters
+        self._subscribers: Dict[str, Set[TileSubscription]] = {}  # tile -> subscriptions
+        self.published = 0  # Publish calls
+        self.delivered = 0  # Subscription notifications sent
+    
+    def subscribe(self, tiles: Iterable[str]) -> TileSubscription:
+        """Subscribe to changes in `tiles`; must be called from a running event loop."""
+        subscription = TileSubscription(tiles)
+        with self._lock:
+            for tile in subscription.tiles:
+                self._subscribers.setdefault(tile, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: TileSubscription) -> None:
+        """Stop delivering changes to a subscription."""
+        with self._lock:
+            for tile in subscription.tiles:
+                members = self._subscribers.get(tile)
+                if members is not None:
+                    members.discard(subscription)
+                    if not members:
+                        del self._subscribers[tile]
+    
+    def publish(self, tiles: Iterable[str]) -> None:
+        """Notify every subscription watching any of `tiles`."""
+        matched: Dict[TileSubscription, Set[str]] = {}
+        with self._lock:
+            self.published += 1
+            for tile in tiles:
+                for subscription in self._subscribers.get(tile, ()):
+                    matched.setdefault(subscription, set()).add(tile)
+            self.delivered += len(matched)
+        
+        # Outside the lock: a closed loop makes us unsubscribe, which takes it
+        for subscription, changed in matched.items():
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._notify, changed)
+            except RuntimeError:
+                # Loop already closed; the stream is gone
+                self.unsubscribe(subscription)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get subscription and delivery counters."""
+        with self._lock:
+            return {
+                "tiles": len(self._subscribers),
+                "subscriptions": len({s for members in self._subscribers.values() for s in members}),
+                "published": self.published,
+                "delivered": self.delivered,
+            }
+
+
+# Global broker for helper changes, keyed by geohash cell
+tile_broker = TileBroker()
@@ -1,5 +1,6 @@
 """
-In-memory repository for presence and venues.
+In-memory repository for presence and venues, plus a SQLite-backed one
+(STORAGE_BACKEND=sqlite) that persists them and is shared across workers.
 Designed with clear interfaces for easy Firestore migration.
 
 In production, replace with Firestore adapters using:
@@ -7,16 +8,48 @@ In production, replace with Firestore adapters using:
 - Geohash neighbor queries for efficient filtering
 """
 
-from typing import Dict, List, Optional
+import sqlite3
+import threading
+from typing import Callable, Collection, Dict, Iterator, List, Optional, Tuple
 
+from .config import (
+    get_storage_backend,
+    get_write_behind_batch_size,
+    get_write_behind_max_age_ms,
+    get_write_behind_max_queue,
+)
+from .geo import (
+    TILE_GRID_LEGACY,
+    TileCovering,
+    parse_tile,
+    tile_key_to_str,
+)
 from .models import PresenceCard, StockReport, Venue, VenueStock
+from .spatial_index import GridIndex, QuadTreeIndex
+from .sqlite_store import RTREE_IN_BOX, SQLiteDatabase, bounding_box, open_database
+from .tile_cache import TileCache
+from .write_behind import WriteBehindQueue
 
 
 # In-memory storage
 _presence_store: Dict[str, Dict] = {}  # userId -> presence data
 _venues_store: Dict[str, Venue] = {}  # venueId -> venue
+
+# Uniform-grid indexes (packed tile key -> IDs), kept in step with writes
+_presence_tiles = GridIndex()  # userId by tile
+_venue_tiles = GridIndex()  # venueId by tile
+
+# Adaptive quadtree indexes (fine cells in hot spots, coarse cells elsewhere)
+_presence_quadtree = QuadTreeIndex()  # userId by location
+_venue_quadtree = QuadTreeIndex()  # venueId by location
+
+# Memoized neighbor rings and coverings for hot tiles
+_tile_cache = TileCache()
 _stock_reports: List[StockReport] = []  # Event log
 
+# Called with every saved presence record (e.g. incremental matching)
+_presence_listeners: List[Callable[[Dict], None]] = []
+
 
 class Repository:
     """Repository interface for presence and venue data."""
@@ -31,17 +64,25 @@ class Repository:
         lng: float,
         geo: str,
         now: int,
-        rating: Optional[float] = None
+        rating: Optional[float] = None,
+        tile_key: Optional[int] = None
     ) -> None:
         """
         Save or update user presence.
         
+        The packed tile key is stored alongside the public geo string so
+        lookups compare ints. Callers that already hold the key pass it as
+        `tile_key` to skip parsing `geo`.
+        
         In production (Firestore):
         - Collection: 'users_presence'
         - Document ID: userId
         - Fields: role, available, lat (server-only), lng (server-only), geo, lastSeenAt, rating
         - Index: (geo, available, lastSeenAt) for efficient queries
         """
+        if tile_key is None:
+            tile_key = parse_tile(geo)
+        
         _presence_store[userId] = {
             "userId": userId,
             "role": role,
@@ -49,9 +90,24 @@ class Repository:
             "lat": lat,  # Server-side only
             "lng": lng,  # Server-side only
             "geo": geo,
+            "tileKey": tile_key,
             "lastSeenAt": now,
             "rating": rating,
         }
+        _presence_tiles.move(userId, tile_key)
+        _presence_quadtree.insert(userId, lat, lng)
+        for listener in _presence_listeners:
+            listener(_presence_store[userId])
+    
+    def start_write_behind(self) -> None:
+        """Start batching persistence writes (nothing to persist in memory)."""
+    
+    def stop_write_behind(self) -> None:
+        """Flush batched persistence writes (nothing to persist in memory)."""
+    
+    def add_presence_listener(self, listener: Callable[[Dict], None]) -> None:
+        """Call `listener` with every presence record saved by `save_user_presence`."""
+        add_presence_listener(listener)
     
     def get_active_presence_in_geos(
         self,
@@ -62,8 +118,25 @@ class Repository:
         """
         Get active presence records in given geos.
         
+        String wrapper around `get_active_presence_in_tiles`; geos that are
+        not "tile_X_Y" identifiers match nothing.
+        """
+        return self.get_active_presence_in_tiles(_parse_tiles(geos), now, ttl_min)
+    
+    def get_active_presence_in_tiles(
+        self,
+        tile_keys: Collection[int],
+        now: int,
+        ttl_min: int
+    ) -> List[Dict]:
+        """
+        Get active presence records in given tiles.
+        
+        Only the requested tiles are visited (via the tile index), so the
+        cost does not grow with the total number of users online.
+        
         Filters by:
-        - geo in geos list
+        - tile key in tile_keys
         - lastSeenAt within TTL
         - available == True
         
@@ -75,12 +148,41 @@ class Repository:
         cutoff_time = now - (ttl_min * 60)
         results = []
         
-        for presence in _presence_store.values():
-            if (
-                presence["geo"] in geos
-                and presence["available"]
-                and presence["lastSeenAt"] > cutoff_time
-            ):
+        for user_id in _presence_tiles.ids_in(tile_keys):
+            presence = _presence_store[user_id]
+            if presence["available"] and presence["lastSeenAt"] > cutoff_time:
+                results.append(presence)
+        
+        # Sort by lastSeenAt descending
+        results.sort(key=lambda x: x["lastSeenAt"], reverse=True)
+        return results
+    
+    def get_active_presence_near(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: int,
+        now: int,
+        ttl_min: int,
+        max_candidates: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Get active presence records in quadtree cells around a point.
+        
+        Walks the presence quadtree nearest cells first, refining only dense
+        cells, and stops after `max_candidates` records. Records are
+        cell-level candidates: callers still check exact distances.
+        
+        In production (Firestore):
+        - Query on a quadkey prefix field instead of a fixed-size geo
+        """
+        cutoff_time = now - (ttl_min * 60)
+        result = _presence_quadtree.query(lat, lng, radius_m, max_candidates)
+        
+        results = []
+        for user_id in result.ids:
+            presence = _presence_store[user_id]
+            if presence["available"] and presence["lastSeenAt"] > cutoff_time:
                 results.append(presence)
         
         # Sort by lastSeenAt descending
@@ -92,15 +194,34 @@ class Repository:
         """
         List venues in given geos.
         
+        String wrapper around `list_venues_in_tiles`.
+        """
+        return self.list_venues_in_tiles(_parse_tiles(geos))
+    
+    def list_venues_in_tiles(self, tile_keys: Collection[int]) -> List[Venue]:
+        """
+        List venues in given tiles.
+        
         In production (Firestore):
         - Query: WHERE geo IN [geos]
         - Index: (geo) for efficient queries
         """
-        results = []
-        for venue in _venues_store.values():
-            if venue.geo in geos:
-                results.append(venue)
-        return results
+        return [_venues_store[venue_id] for venue_id in _venue_tiles.ids_in(tile_keys)]
+    
+    def list_venues_near(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: int,
+        max_candidates: Optional[int] = None
+    ) -> List[Venue]:
+        """
+        List venues in quadtree cells around a point, nearest cells first.
+        
+        Candidates are cell-level: callers still check exact distances.
+        """
+        result = _venue_quadtree.query(lat, lng, radius_m, max_candidates)
+        return [_venues_store[venue_id] for venue_id in result.ids]
     
     def get_venue(self, venueId: str) -> Optional[Venue]:
         """
@@ -162,17 +283,377 @@ class Repository:
         - Document ID: venue.id
         """
         _venues_store[venue.id] = venue
+        _venue_tiles.move(venue.id, parse_tile(venue.geo))
+        _venue_quadtree.insert(venue.id, venue.lat, venue.lng)
     
-    def get_neighbor_geos(self, geo: str, radius_m: int) -> List[str]:
+    def get_neighbor_geos(
+        self,
+        geo: str,
+        radius_m: int,
+        tile_size_m: int = 200,
+        grid: str = TILE_GRID_LEGACY
+    ) -> List[str]:
         """
         Get neighbor geos for a given geo within radius.
         
-        Helper method that delegates to geo utilities.
+        String wrapper around the cached `get_neighbor_tiles`.
+        """
+        tile_key = parse_tile(geo)
+        if tile_key is None:
+            return [geo]
+        return [
+            tile_key_to_str(k)
+            for k in self.get_neighbor_tiles(tile_key, radius_m, tile_size_m, grid)
+        ]
+    
+    def get_neighbor_tiles(
+        self,
+        tile_key: int,
+        radius_m: int,
+        tile_size_m: int = 200,
+        grid: str = TILE_GRID_LEGACY
+    ) -> frozenset:
+        """
+        Get neighbor tile keys for a given tile key within radius.
+        
+        Served from the LRU tile cache (radius rounded up to its bucket).
+        Returns a frozenset for O(1) membership tests in the tile lookups.
         """
-        from .geo import get_tile_neighbors
-        return get_tile_neighbors(geo, radius_m)
+        return _tile_cache.neighbors(tile_key, radius_m, tile_size_m, grid)
+    
+    def get_covering_tiles(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: int,
+        tile_size_m: int = 200,
+        grid: str = TILE_GRID_LEGACY
+    ) -> TileCovering:
+        """
+        Get the tiles intersecting a query circle, split into inside/edge.
+        
+        Served from the LRU tile cache keyed by the query point's tile and
+        radius bucket, then trimmed to the exact point and radius.
+        """
+        return _tile_cache.covering(lat, lng, radius_m, tile_size_m, grid)
+    
+    def get_tile_cache_stats(self) -> Dict:
+        """Get hit/miss counters for the neighbor/covering cache."""
+        return _tile_cache.stats()
+
+
+def _parse_tiles(geos: List[str]) -> set:
+    """Convert "tile_X_Y" identifiers to a set of packed tile keys."""
+    keys = set()
+    for geo in geos:
+        key = parse_tile(geo)
+        if key is not None:
+            keys.add(key)
+    return keys
+
+
+# A queued SQLiteRepository write, applied inside the batch's transaction
+_Write = Callable[[sqlite3.Connection], None]
+
+# SQLite statements for SQLiteRepository (schema in sqlite_store). Tile-key
+# lookups bind this many keys per statement (SQLite's default
+# variable limit is 999); fixed-size chunks keep the statement text stable
+_TILE_CHUNK = 64
+_TILE_PARAMS = ", ".join("?" * _TILE_CHUNK)
+
+_UPSERT_PRESENCE = (
+    "INSERT INTO presence (user_id, role, available, lat, lng, geo, tile_key, last_seen_at, rating) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET role = excluded.role, available = excluded.available, "
+    "lat = excluded.lat, lng = excluded.lng, geo = excluded.geo, tile_key = excluded.tile_key, "
+    "last_seen_at = excluded.last_seen_at, rating = excluded.rating "
+    "RETURNING rid"
+)
+_PRESENCE_COLUMNS = "p.user_id, p.role, p.available, p.lat, p.lng, p.geo, p.tile_key, p.last_seen_at, p.rating"
+_PRESENCE_IN_BOX = (
+    f"SELECT {_PRESENCE_COLUMNS} FROM presence_rtree r JOIN presence p ON p.rid = r.rid "
+    f"WHERE {RTREE_IN_BOX} "
+    "AND p.available = 1 AND p.last_seen_at > ? "
+    "ORDER BY p.last_seen_at DESC"
+)
+_PRESENCE_IN_TILES = (
+    f"SELECT {_PRESENCE_COLUMNS} FROM presence p "
+    f"WHERE p.tile_key IN ({_TILE_PARAMS}) AND p.available = 1 AND p.last_seen_at > ?"
+)
+_UPSERT_VENUE = (
+    "INSERT INTO venues (id, tile_key, data) VALUES (?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET tile_key = excluded.tile_key, data = excluded.data "
+    "RETURNING rid"
+)
+_GET_VENUE = "SELECT data FROM venues WHERE id = ?"
+_SET_VENUE = "UPDATE venues SET data = ? WHERE id = ?"
+_VENUES_IN_TILES = f"SELECT data FROM venues WHERE tile_key IN ({_TILE_PARAMS})"
+_VENUES_IN_BOX = (
+    "SELECT v.data FROM venues_rtree r JOIN venues v ON v.rid = r.rid "
+    f"WHERE {RTREE_IN_BOX}"
+)
+_ADD_REPORT = (
+    "INSERT INTO stock_reports (venue_id, user_id, pads, tampons, liners, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_GET_REPORTS = (
+    "SELECT venue_id, user_id, pads, tampons, liners, created_at FROM stock_reports "
+    "WHERE venue_id = ? AND created_at > ? ORDER BY seq"
+)
+
+
+class SQLiteRepository(Repository):
+    """
+    SQLite implementation of the presence and venue `Repository`.
+    
+    Neighbor tiles, coverings and the tile cache are computed, not stored,
+    so they are inherited unchanged. The `*_near` lookups return every row
+    in the query's bounding box; like the quadtree versions, callers still
+    check exact distances.
+    
+    While write-behind runs, writes are queued and committed in batches.
+    Venue and stock reads flush the queue first, so a caller sees its own
+    writes; presence reads do not wait and may lag by one flush
+    (WRITE_BEHIND_MAX_AGE_MS), well within the presence TTL.
+    """
+    
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self._writes: WriteBehindQueue[_Write] = WriteBehindQueue(
+            self._commit,
+            max_size=get_write_behind_max_queue(),
+            batch_size=get_write_behind_batch_size(),
+            max_age_s=get_write_behind_max_age_ms() / 1000,
+            name="repo-write-behind",
+        )
+    
+    def batch(self):
+        """Group the writes in a `with` block into one transaction."""
+        return self.db.transaction()
+    
+    def start_write_behind(self) -> None:
+        """Queue writes and commit them in batches from a background thread."""
+        self._writes.start()
+    
+    def stop_write_behind(self) -> None:
+        """Commit every queued write and write synchronously again."""
+        self._writes.stop()
+    
+    def _commit(self, writes: List[_Write]) -> None:
+        """Apply a batch of queued writes in one transaction."""
+        with self.db.transaction() as conn:
+            for write in writes:
+                write(conn)
+    
+    # Presence methods
+    def save_user_presence(
+        self,
+        userId: str,
+        role: str,
+        available: bool,
+        lat: float,
+        lng: float,
+        geo: str,
+        now: int,
+        rating: Optional[float] = None,
+        tile_key: Optional[int] = None
+    ) -> None:
+        """Save or update user presence."""
+        if tile_key is None:
+            tile_key = parse_tile(geo)
+        
+        row = (userId, role, int(available), lat, lng, geo, tile_key, now, rating)
+        
+        def write(conn: sqlite3.Connection) -> None:
+            (rid,) = conn.execute(_UPSERT_PRESENCE, row).fetchone()
+            self.db.put_point(conn, "presence_rtree", rid, lat, lng)
+        
+        self._writes.put(write)
+        presence = {
+            "userId": userId,
+            "role": role,
+            "available": available,
+            "lat": lat,
+            "lng": lng,
+            "geo": geo,
+            "tileKey": tile_key,
+            "lastSeenAt": now,
+            "rating": rating,
+        }
+        for listener in _presence_listeners:
+            listener(presence)
+    
+    def get_active_presence_in_tiles(
+        self,
+        tile_keys: Collection[int],
+        now: int,
+        ttl_min: int
+    ) -> List[Dict]:
+        """Get active presence records in given tiles, most recent first."""
+        cutoff_time = now - (ttl_min * 60)
+        conn = self.db.connection()
+        results = []
+        for chunk in _chunks(list(tile_keys)):
+            results.extend(
+                _presence_row(row)
+                for row in conn.execute(_PRESENCE_IN_TILES, (*chunk, cutoff_time))
+            )
+        results.sort(key=lambda x: x["lastSeenAt"], reverse=True)
+        return results
+    
+    def get_active_presence_near(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: int,
+        now: int,
+        ttl_min: int,
+        max_candidates: Optional[int] = None
+    ) -> List[Dict]:
+        """Get active presence records in the bounding box of a query circle."""
+        cutoff_time = now - (ttl_min * 60)
+        rows = self.db.connection().execute(
+            _PRESENCE_IN_BOX, (*bounding_box(lat, lng, radius_m), cutoff_time)
+        )
+        results = [_presence_row(row) for row in rows]
+        return results if max_candidates is None else results[:max_candidates]
+    
+    # Venue methods
+    def list_venues_in_tiles(self, tile_keys: Collection[int]) -> List[Venue]:
+        """List venues in given tiles."""
+        self._writes.flush()
+        conn = self.db.connection()
+        venues = []
+        for chunk in _chunks(list(tile_keys)):
+            venues.extend(
+                Venue.model_validate_json(data)
+                for (data,) in conn.execute(_VENUES_IN_TILES, chunk)
+            )
+        return venues
+    
+    def list_venues_near(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: int,
+        max_candidates: Optional[int] = None
+    ) -> List[Venue]:
+        """List venues in the bounding box of a query circle."""
+        self._writes.flush()
+        rows = self.db.connection().execute(_VENUES_IN_BOX, bounding_box(lat, lng, radius_m))
+        venues = [Venue.model_validate_json(data) for (data,) in rows]
+        return venues if max_candidates is None else venues[:max_candidates]
+    
+    def get_venue(self, venueId: str) -> Optional[Venue]:
+        """Get venue by ID."""
+        self._writes.flush()
+        row = self.db.connection().execute(_GET_VENUE, (venueId,)).fetchone()
+        return None if row is None else Venue.model_validate_json(row[0])
+    
+    def set_venue_stock(self, venueId: str, stock: VenueStock, updatedAt: int) -> None:
+        """Update venue stock."""
+        def write(conn: sqlite3.Connection) -> None:
+            row = conn.execute(_GET_VENUE, (venueId,)).fetchone()
+            if row is None:
+                return
+            venue = Venue.model_validate_json(row[0])
+            venue.stock = stock
+            venue.stockUpdatedAt = updatedAt
+            conn.execute(_SET_VENUE, (venue.model_dump_json(), venueId))
+        
+        self._writes.put(write)
+    
+    def add_stock_report(self, report: StockReport) -> None:
+        """Add a stock report event."""
+        row = (report.venueId, report.userId, report.pads, report.tampons, report.liners, report.createdAt)
+        self._writes.put(lambda conn: conn.execute(_ADD_REPORT, row))
+    
+    def get_stock_reports(self, venueId: str, since: int) -> List[StockReport]:
+        """Get stock reports for a venue since timestamp."""
+        self._writes.flush()
+        rows = self.db.connection().execute(_GET_REPORTS, (venueId, since))
+        return [
+            StockReport(venueId=v, userId=u, pads=p, tampons=t, liners=l, createdAt=c)
+            for v, u, p, t, l, c in rows
+        ]
+    
+    def create_venue(self, venue: Venue) -> None:
+        """Create a new venue."""
+        row = (venue.id, parse_tile(venue.geo), venue.model_dump_json())
+        lat, lng = venue.lat, venue.lng
+        
+        def write(conn: sqlite3.Connection) -> None:
+            (rid,) = conn.execute(_UPSERT_VENUE, row).fetchone()
+            self.db.put_point(conn, "venues_rtree", rid, lat, lng)
+        
+        self._writes.put(write)
+
+
+def _chunks(keys: List[int]) -> Iterator[Tuple[Optional[int], ...]]:
+    """Split tile keys into `_TILE_CHUNK`-sized tuples, padded with NULLs (which match nothing)."""
+    for start in range(0, len(keys), _TILE_CHUNK):
+        chunk = keys[start:start + _TILE_CHUNK]
+        yield tuple(chunk) + (None,) * (_TILE_CHUNK - len(chunk))
+
+
+def _presence_row(row: Tuple) -> Dict:
+    """Convert a presence row to the dict shape `Repository` returns."""
+    user_id, role, available, lat, lng, geo, tile_key, last_seen_at, rating = row
+    return {
+        "userId": user_id,
+        "role": role,
+        "available": bool(available),
+        "lat": lat,
+        "lng": lng,
+        "geo": geo,
+        "tileKey": tile_key,
+        "lastSeenAt": last_seen_at,
+        "rating": rating,
+    }
+
+
+def add_presence_listener(listener: Callable[[Dict], None]) -> None:
+    """
+    Call `listener` with every presence record saved by `save_user_presence`.
+    
+    Listeners are shared by every repository, so registering one does not
+    create the global repository.
+    """
+    _presence_listeners.append(listener)
+
+
+def _create_repo() -> Repository:
+    """Create the repository for the configured storage backend."""
+    if get_storage_backend() == "sqlite":
+        return SQLiteRepository(open_database())
+    return Repository()
+
+
+class _LazyRepository:
+    """
+    The global repository, created on first use.
+    
+    Importing this module opens nothing (like `storage`): the configured
+    backend, and with it the SQLite database, is created by the first
+    attribute access, normally the app lifespan's `start_write_behind`.
+    """
+    
+    def __init__(self, factory: Callable[[], Repository]):
+        self._factory = factory
+        self._repo: Optional[Repository] = None
+        self._lock = threading.Lock()
+    
+    def _get(self) -> Repository:
+        if self._repo is None:
+            with self._lock:
+                if self._repo is None:
+                    self._repo = self._factory()
+        return self._repo
+    
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
 
 
 # Global repository instance
-repo = Repository()
+repo = _LazyRepository(_create_repo)
 
@@ -0,0 +1,260 @@
+"""
+Binary columnar snapshot format for the in-memory stores.
+
+A snapshot is a set of named sections (e.g. "requests", "helpers"), each a
+list of records stored as:
+
+- columns: fixed-width numbers (struct/array type codes, little-endian) or
+  NUL-separated strings, for the fields indexes are built from
+- records: each full record as compact JSON, with an offsets column
+
+The file is mmapped, so opening it reads only the table of contents.
+Indexes can be built straight from the columns, and `LazyRecords` decodes
+a record's JSON only when it is first accessed.
+
+File layout: MAGIC, uint32 TOC length, TOC (JSON), padding to 8 bytes,
+then the column data (TOC offsets are relative to its start).
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+MAGIC = b"AISNAP01"
+_SEP = "\0"  # String column separator (must not appear in values)
+
+# Column spec: field name -> (type code, getter). Type codes are array codes
+# ("d" float64, "q" int64, "b" int8, ...) or "s" for strings.
+Columns = Dict[str, Tuple[str, Callable[[Dict], Any]]]
+
+
+def _pad(buf: bytearray) -> None:
+    """Pad to an 8-byte boundary so numeric columns are aligned."""
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def _numbers(code: str, values: Iterable) -> bytes:
+    data = array(code, values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data.tobytes()
+
+
+def encode_snapshot(sections: Dict[str, Tuple[Iterable[Dict], Columns]]) -> bytes:
+    """
+    Encode sections of records as a binary snapshot.
+    
+    Args:
+        sections: Section name -> (records, column spec)
+    
+    Returns:
+        Snapshot file contents
+    
+    Raises:
+        ValueError: If a string column value contains a NUL character
+    """
+    data = bytearray()
+    toc: Dict[str, Dict] = {}
+    for name, (records, columns) in sections.items():
+        records = list(records)
+        section = {"count": len(records), "columns": {}}
+        
+        for field, (code, get) in columns.items():
+            if code == "s":
+                values = [str(get(record)) for record in records]
+                if any(_SEP in value for value in values):
+                    raise ValueError(f"{name}.{field} values must not contain NUL")
+                chunk = _SEP.join(values).encode("utf-8")
+            else:
+                chunk = _numbers(code, (get(record) for record in records))
+            _pad(data)
+            section["columns"][field] = [code, len(data), len(chunk)]
+            data += chunk
+        
+        blobs = [json.dumps(record, separators=(",", ":")).encode("utf-8") for record in records]
+        _pad(data)
+        section["offsets"] = len(data)
+        data += _numbers("q", accumulate((len(blob) for blob in blobs), initial=0))
+        section["records"] = len(data)
+        data += b"".join(blobs)
+        toc[name] = section
+    
+    header = bytearray(MAGIC)
+    toc_bytes = json.dumps(toc, separators=(",", ":")).encode("utf-8")
+    header += struct.pack("<I", len(toc_bytes)) + toc_bytes
+    _pad(header)
+    return bytes(header + data)
+
+
+class SnapshotSection:
+    """One section of an open snapshot; columns are views into the mapped file."""
+    
+    def __init__(self, view: memoryview, toc: Dict):
+        self._view = view
+        self._columns = toc["columns"]
+        self.count = toc["count"]
+        self._offsets = self._numbers("q", toc["offsets"], self.count + 1)
+        self._records = toc["records"]
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _numbers(self, code: str, start: int, count: int):
+        size = array(code).itemsize
+        chunk = self._view[start:start + size * count]
+        if sys.byteorder == "little":
+            return chunk.cast(code)  # Zero-copy
+        values = array(code, chunk.tobytes())
+        values.byteswap()
+        return values
+    
+    def has_column(self, field: str) -> bool:
+        """Check whether the section stores a column for `field`."""
+        return field in self._columns
+    
+    def column(self, field: str):
+        """Get a numeric column as a sequence (a zero-copy view on little-endian hosts)."""
+        code, start, length = self._columns[field]
+        if code == "s":
+            raise TypeError(f"{field} is a string column; use strings()")
+        return self._numbers(code, start, self.count)
+    
+    def strings(self, field: str) -> List[str]:
+        """Decode a string column."""
+        code, start, length = self._columns[field]
+        if code != "s":
+            raise TypeError(f"{field} is a numeric column; use column()")
+        if not self.count:
+            return []
+        return str(self._view[start:start + length], "utf-8").split(_SEP)
+    
+    def record(self, row: int) -> Dict:
+        """Decode the full record at `row`."""
+        start = self._records + self._offsets[row]
+        end = self._records + self._offsets[row + 1]
+        return json.loads(self._view[start:end].tobytes())
+    
+    def records(self) -> Iterator[Dict]:
+        """Decode every record, in order."""
+        for row in range(self.count):
+            yield self.record(row)
+
+
+class Snapshot:
+    """A binary snapshot file, mapped read-only."""
+    
+    def __init__(self, path: str):
+        """
+        Raises:
+            ValueError: If the file is not a binary snapshot
+            OSError: If it cannot be read
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a binary snapshot")
+        (toc_length,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        toc_start = len(MAGIC) + 4
+        self._toc = json.loads(self._mmap[toc_start:toc_start + toc_length])
+        base = toc_start + toc_length
+        self._data = memoryview(self._mmap)[base + (-base % 8):]
+    
+    def section(self, name: str) -> Optional[SnapshotSection]:
+        """Get a section, or None if the snapshot has none by that name."""
+        toc = self._toc.get(name)
+        return None if toc is None else SnapshotSection(self._data, toc)
+    
+    def sections(self) -> List[str]:
+        """Names of the sections in the file."""
+        return list(self._toc)
+
+
+def load_snapshot(path: str) -> Union[Snapshot, Dict, None]:
+    """
+    Open a snapshot in either format.
+    
+    Returns:
+        A mapped `Snapshot` for binary files, the parsed dict for JSON
+        files, or None if the file is missing, empty or unreadable
+    """
+    try:
+        with open(path, "rb") as f:
+            binary = f.read(len(MAGIC)) == MAGIC
+        if binary:
+            return Snapshot(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class LazyRecords(MutableMapping):
+    """
+    Dict of records keyed by ID whose values are decoded on first access.
+    
+    Starts with every row of a snapshot section pending; reading a key
+    decodes (and keeps) that record, writes replace it. Iterating values
+    decodes everything, so hot paths should read by key.
+    """
+    
+    def __init__(
+        self,
+        section: Optional[SnapshotSection] = None,
+        key: str = "id",
+        on_decode: Optional[Callable[[Dict], Any]] = None
+    ):
+        """
+        Args:
+            section: Snapshot section to read records from
+            key: String column holding each record's key
+            on_decode: Called with each record once it is decoded
+        """
+        self._decoded: Dict[str, Dict] = {}
+        self._section = section
+        self._rows: Dict[str, int] = {}
+        if section is not None and len(section):
+            self._rows = dict(zip(section.strings(key), range(len(section))))
+        self._on_decode = on_decode
+    
+    @property
+    def pending(self) -> int:
+        """Number of records not decoded yet."""
+        return len(self._rows)
+    
+    def __getitem__(self, key: str) -> Dict:
+        try:
+            return self._decoded[key]
+        except KeyError:
+            pass
+        row = self._rows.pop(key)  # KeyError if absent
+        record = self._section.record(row)
+        if self._on_decode is not None:
+            self._on_decode(record)
+        self._decoded[key] = record
+        if not self._rows:
+            self._section = None  # Everything decoded; release the file view
+        return record
+    
+    def __setitem__(self, key: str, value: Dict) -> None:
+        self._rows.pop(key, None)
+        self._decoded[key] = value
+    
+    def __delitem__(self, key: str) -> None:
+        if self._rows.pop(key, None) is None:
+            del self._decoded[key]
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._decoded or key in self._rows
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from self._decoded
+        yield from list(self._rows)
+    
+    def __len__(self) -> int:
+        return len(self._decoded) + len(self._rows)
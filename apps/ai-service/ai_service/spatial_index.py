@@ -0,0 +1,223 @@
+"""
+In-memory spatial indexes for presence and venues.
+Maps IDs to cells so nearby queries only visit the cells that matter.
+
+In production, these would be replaced by Firestore geo indexes.
+"""
+
+import heapq
+import math
+from typing import Collection, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .geo import (
+    EARTH_RADIUS_M,
+    box_distance_range,
+    lat_lng_to_quad_cell,
+    quad_cell_ancestor,
+    quad_cell_bounds,
+    quad_cell_children,
+    quad_cells_in_box,
+    quad_level_for_radius,
+    unpack_quad_cell,
+)
+
+# Safety margin when deciding whether a cell can touch the query circle
+_CELL_MARGIN_M = 1.0
+
+
+class GridIndex:
+    """
+    Uniform-grid index: packed tile key -> set of IDs.
+    
+    Kept in step with writes, so a lookup only touches the requested tiles
+    and costs O(tiles + matches) no matter how many IDs are indexed.
+    """
+    
+    def __init__(self):
+        self._tiles: Dict[int, Set[str]] = {}  # tile key -> IDs
+        self._tile_of: Dict[str, int] = {}  # ID -> tile key
+    
+    def __len__(self) -> int:
+        return len(self._tile_of)
+    
+    def move(self, item_id: str, tile_key: Optional[int]) -> None:
+        """
+        Place an ID in a tile, removing it from its previous tile.
+        
+        Both maps are updated together with no await in between, so readers
+        never see an ID in two tiles or in none. A None tile unindexes it.
+        """
+        previous = self._tile_of.get(item_id)
+        if previous == tile_key:
+            return
+        if previous is not None:
+            members = self._tiles[previous]
+            members.discard(item_id)
+            if not members:
+                del self._tiles[previous]
+        
+        if tile_key is None:
+            self._tile_of.pop(item_id, None)
+            return
+        self._tile_of[item_id] = tile_key
+        self._tiles.setdefault(tile_key, set()).add(item_id)
+    
+    def remove(self, item_id: str) -> None:
+        """Remove an ID from the index if present."""
+        self.move(item_id, None)
+    
+    def tile_of(self, item_id: str) -> Optional[int]:
+        """Get the tile an ID is indexed in."""
+        return self._tile_of.get(item_id)
+    
+    def count(self, tile_key: int) -> int:
+        """Get the number of IDs in a tile."""
+        return len(self._tiles.get(tile_key, ()))
+    
+    def ids_in(self, tile_keys: Collection[int]) -> Iterator[str]:
+        """Iterate the IDs in the given tiles."""
+        for tile_key in tile_keys:
+            members = self._tiles.get(tile_key)
+            if members:
+                yield from members
+
+
+class QuadQueryResult(NamedTuple):
+    """Result of a quadtree radius query."""
+    ids: List[str]  # Candidate IDs, nearest cells first
+    cells_visited: int  # Number of cells popped from the search frontier
+    truncated: bool  # True if max_candidates cut the search short
+
+
+class QuadTreeIndex:
+    """
+    Multi-resolution quadtree index over Web Mercator quadkey cells.
+    
+    Each ID is stored in its cell at every level from `min_level` to
+    `max_level`, so every cell knows its population. A radius query starts
+    at the level where cells are about as wide as the radius, then walks
+    cells nearest-first: sparse cells (at most `leaf_capacity` IDs) are
+    emitted whole, dense cells are split into their children. Sparse areas
+    are answered from a few coarse cells, hot spots are refined down to
+    fine cells, and `max_candidates` bounds the work in either case.
+    """
+    
+    def __init__(self, min_level: int = 10, max_level: int = 18, leaf_capacity: int = 32):
+        """
+        Args:
+            min_level: Coarsest level stored (larger radii start here)
+            max_level: Finest level stored (cells are never split past it)
+            leaf_capacity: Cells with at most this many IDs are not split
+        """
+        if not 0 <= min_level <= max_level:
+            raise ValueError("expected 0 <= min_level <= max_level")
+        self.min_level = min_level
+        self.max_level = max_level
+        self.leaf_capacity = leaf_capacity
+        self._cells: Dict[int, Set[str]] = {}  # cell (any level) -> IDs
+        self._leaf_of: Dict[str, int] = {}  # ID -> finest-level cell
+    
+    def __len__(self) -> int:
+        return len(self._leaf_of)
+    
+    def insert(self, item_id: str, lat: float, lng: float) -> None:
+        """Insert or move an ID to a new location."""
+        leaf = lat_lng_to_quad_cell(lat, lng, self.max_level)
+        previous = self._leaf_of.get(item_id)
+        if previous == leaf:
+            return
+        if previous is not None:
+            self.remove(item_id)
+        
+        self._leaf_of[item_id] = leaf
+        for level in range(self.min_level, self.max_level + 1):
+            cell = quad_cell_ancestor(leaf, level)
+            self._cells.setdefault(cell, set()).add(item_id)
+    
+    def remove(self, item_id: str) -> None:
+        """Remove an ID from the index if present."""
+        leaf = self._leaf_of.pop(item_id, None)
+        if leaf is None:
+            return
+        for level in range(self.min_level, self.max_level + 1):
+            cell = quad_cell_ancestor(leaf, level)
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self._cells[cell]
+    
+    def cell_of(self, item_id: str) -> Optional[int]:
+        """Get the finest-level cell an ID is stored in."""
+        return self._leaf_of.get(item_id)
+    
+    def count(self, cell: int) -> int:
+        """Get the number of IDs in a cell."""
+        return len(self._cells.get(cell, ()))
+    
+    def query(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        max_candidates: Optional[int] = None
+    ) -> QuadQueryResult:
+        """
+        Find IDs in cells intersecting a circle, nearest cells first.
+        
+        Candidates are cell-level: callers still check exact distances.
+        
+        Args:
+            lat: Circle center latitude (degrees)
+            lng: Circle center longitude (degrees)
+            radius_m: Circle radius in meters
+            max_candidates: Stop once this many IDs are collected (None = all)
+        
+        Returns:
+            QuadQueryResult with candidate IDs and visit statistics
+        """
+        start_level = min(max(quad_level_for_radius(lat, radius_m), self.min_level), self.max_level)
+        d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+        cos_lat = math.cos(math.radians(min(abs(lat) + d_lat, 90.0)))
+        d_lng = 180.0 if cos_lat < 1e-9 else min(180.0, d_lat / cos_lat)
+        
+        frontier: List[Tuple[float, int]] = []
+        for cell in quad_cells_in_box(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng, start_level):
+            self._push(frontier, cell, lat, lng, radius_m)
+        
+        ids: List[str] = []
+        seen: Set[int] = set()
+        visited = 0
+        truncated = False
+        while frontier:
+            _, cell = heapq.heappop(frontier)
+            if cell in seen:
+                continue
+            seen.add(cell)
+            visited += 1
+            
+            members = self._cells.get(cell)
+            if not members:
+                continue
+            
+            level, _, _ = unpack_quad_cell(cell)
+            if level < self.max_level and len(members) > self.leaf_capacity:
+                for child in quad_cell_children(cell):
+                    self._push(frontier, child, lat, lng, radius_m)
+                continue
+            
+            if max_candidates is not None and len(ids) + len(members) > max_candidates:
+                ids.extend(list(members)[:max_candidates - len(ids)])
+                truncated = True
+                break
+            ids.extend(members)
+        
+        return QuadQueryResult(ids=ids, cells_visited=visited, truncated=truncated)
+    
+    def _push(self, frontier: List[Tuple[float, int]], cell: int, lat: float, lng: float, radius_m: float) -> None:
+        """Push a non-empty cell onto the frontier if it can touch the circle."""
+        if cell not in self._cells:
+            return
+        nearest, _ = box_distance_range(lat, lng, *quad_cell_bounds(cell))
+        if nearest <= radius_m + _CELL_MARGIN_M:
+            heapq.heappush(frontier, (nearest, cell))
@@ -0,0 +1,373 @@
+"""
+SQLite backend for requests, helpers, presence and venues.
+Durable across restarts and shared by every worker process on one host.
+
+- R*Tree virtual tables index helper, presence and venue locations, so a
+  radius lookup is a bounding-box query plus an exact distance check on the
+  few rows inside the box.
+- WAL journal mode lets readers run alongside the single writer, across
+  threads and processes.
+- Statements are module-level constants, so each connection's statement
+  cache reuses the prepared statements.
+- Bulk writes share one transaction (`create_helpers`, `repo.SQLiteRepository.batch`).
+
+In production, Firestore replaces this; it fits single-host deployments
+that have outgrown the in-memory stores.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import get_geohash_precision, get_helper_search_max_radius_m, get_sqlite_path
+from .geo import EARTH_RADIUS_M, geohash_bounds, get_geohash_for_point, haversine_meters
+from .matching import Helper, Request, helper_inventory
+
+_METERS_PER_DEG = EARTH_RADIUS_M * math.pi / 180.0
+
+# First radius tried by expanding searches (doubled until enough candidates)
+_START_RADIUS_M = 250.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS helpers (
+    rid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    available INTEGER NOT NULL,
+    inventory INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS helpers_rtree USING rtree(rid, min_lat, max_lat, min_lng, max_lng);
+CREATE TABLE IF NOT EXISTS match_attempts (
+    seq INTEGER PRIMARY KEY,
+    request_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS presence (
+    rid INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL UNIQUE,
+    role TEXT NOT NULL,
+    available INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL,
+    geo TEXT NOT NULL,
+    tile_key INTEGER,
+    last_seen_at INTEGER NOT NULL,
+    rating REAL
+);
+CREATE INDEX IF NOT EXISTS presence_tile ON presence (tile_key, last_seen_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS presence_rtree USING rtree(rid, min_lat, max_lat, min_lng, max_lng);
+CREATE TABLE IF NOT EXISTS venues (
+    rid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    tile_key INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS venues_tile ON venues (tile_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS venues_rtree USING rtree(rid, min_lat, max_lat, min_lng, max_lng);
+CREATE TABLE IF NOT EXISTS stock_reports (
+    seq INTEGER PRIMARY KEY,
+    venue_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    pads INTEGER NOT NULL,
+    tampons INTEGER NOT NULL,
+    liners INTEGER NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stock_reports_venue ON stock_reports (venue_id, created_at);
+"""
+
+# R*Tree overlap test against (min_lat, max_lat, min_lng, max_lng); the tree
+# stores float32 bounds rounded outward, so points on the box edge still match
+RTREE_IN_BOX = "r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?"
+
+# Requests / helpers
+_PUT_REQUEST = "INSERT OR REPLACE INTO requests (id, data) VALUES (?, ?)"
+_GET_REQUEST = "SELECT data FROM requests WHERE id = ?"
+_LIST_REQUESTS = "SELECT data FROM requests"
+_UPSERT_HELPER = (
+    "INSERT INTO helpers (id, available, inventory, data) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET available = excluded.available, "
+    "inventory = excluded.inventory, data = excluded.data "
+    "RETURNING rid"
+)
+_GET_HELPER = "SELECT data FROM helpers WHERE id = ?"
+_LIST_HELPERS = "SELECT data FROM helpers"
+_HELPERS_IN_BOX = (
+    "SELECT h.data FROM helpers_rtree r JOIN helpers h ON h.rid = r.rid "
+    f"WHERE {RTREE_IN_BOX} "
+    "AND h.available = 1 AND (h.inventory & ?) = ?"
+)
+_HELPERS_IN_BOX_BY_RID = _HELPERS_IN_BOX + " ORDER BY h.rid"
+_PUT_ATTEMPT = "INSERT INTO match_attempts (request_id, data) VALUES (?, ?)"
+
+_PUT_POINT = "INSERT OR REPLACE INTO {table} (rid, min_lat, max_lat, min_lng, max_lng) VALUES (?, ?, ?, ?, ?)"
+
+
+_databases: Dict[str, "SQLiteDatabase"] = {}
+_databases_lock = threading.Lock()
+
+
+def open_database(path: Optional[str] = None) -> "SQLiteDatabase":
+    """Get the shared database for `path` (default from config), opening it once per process."""
+    path = get_sqlite_path() if path is None else path
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = SQLiteDatabase(path)
+        return _databases[path]
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Get a lat/lng box containing every point within `radius_m` of a point.
+    
+    The box does not wrap the antimeridian: longitudes are clamped to
+    [-180, 180].
+    
+    Returns:
+        Tuple of (min_lat, max_lat, min_lng, max_lng) in degrees
+    """
+    dlat = radius_m / _METERS_PER_DEG
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = radius_m / (_METERS_PER_DEG * cos_lat)
+    return min_lat, max_lat, max(lng - dlng, -180.0), min(lng + dlng, 180.0)
+
+
+class SQLiteDatabase:
+    """
+    Connections to one SQLite file: one per thread, in WAL mode.
+    
+    Writes go through `transaction`, which nests: inner blocks join the
+    outermost one, so a batch of writes commits (and syncs) once.
+    """
+    
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        """
+        Args:
+            path: Database file (":memory:" is per connection, so tests
+                should use a temporary file instead)
+            busy_timeout_ms: How long a writer waits for another process's
+                write lock before failing
+        """
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self.connection()
+        with self.transaction():
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+    
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly below
+            # check_same_thread is off only so `close` can close every
+            # thread's connection; each is otherwise used by its own thread
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, cached_statements=256, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a write transaction (joining an enclosing one)."""
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        
+        # IMMEDIATE takes the write lock up front, so the busy timeout
+        # applies here rather than failing on a later lock upgrade
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+    
+    def put_point(self, conn: sqlite3.Connection, table: str, rid: int, lat: float, lng: float) -> None:
+        """(Re)place a row's location in an R*Tree table."""
+        conn.execute(_PUT_POINT.format(table=table), (rid, lat, lat, lng, lng))
+    
+    def close(self) -> None:
+        """Close every thread's connection."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SQLiteStore:
+    """
+    SQLite implementation of the `storage` module functions.
+    
+    Records are stored as JSON alongside the columns queries filter on, so
+    they round-trip unchanged (extra fields included).
+    """
+    
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self.precision = get_geohash_precision()
+    
+    def get_request(self, request_id: str) -> Optional[Request]:
+        """Get a request by ID."""
+        row = self.db.connection().execute(_GET_REQUEST, (request_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+    
+    def create_request(self, request_data: Request) -> Request:
+        """Create (or replace) a request; its geohash field is computed here."""
+        request_data["geohash"] = get_geohash_for_point(request_data["lat"], request_data["lng"], self.precision)
+        with self.db.transaction() as conn:
+            conn.execute(_PUT_REQUEST, (request_data["id"], json.dumps(request_data)))
+        return request_data
+    
+    def create_helper(self, helper_data: Helper) -> Helper:
+        """Create (or replace) a helper; its geohash field is computed here."""
+        self.create_helpers([helper_data])
+        return helper_data
+    
+    def create_helpers(self, helpers: Iterable[Helper]) -> int:
+        """
+        Create (or replace) many helpers in one transaction.
+        
+        Returns:
+            Number of helpers written
+        """
+        count = 0
+        with self.db.transaction() as conn:
+            for helper in helpers:
+                self._put_helper(conn, helper)
+                count += 1
+        return count
+    
+    def _put_helper(self, conn: sqlite3.Connection, helper: Helper) -> None:
+        helper["geohash"] = get_geohash_for_point(helper["lat"], helper["lng"], self.precision)
+        (rid,) = conn.execute(
+            _UPSERT_HELPER,
+            (helper["id"], int(helper.get("available", False)), helper_inventory(helper), json.dumps(helper)),
+        ).fetchone()
+        self.db.put_point(conn, "helpers_rtree", rid, helper["lat"], helper["lng"])
+    
+    def get_helper(self, helper_id: str) -> Optional[Helper]:
+        """Get a helper by ID."""
+        row = self.db.connection().execute(_GET_HELPER, (helper_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+    
+    def update_helper_inventory(self, helper_id: str, inventory: int) -> Optional[Helper]:
+        """Update only a helper's product inventory; None if not found."""
+        with self.db.transaction() as conn:
+            row = conn.execute(_GET_HELPER, (helper_id,)).fetchone()
+            if row is None:
+                return None
+            helper = json.loads(row[0])
+            helper["inventory"] = inventory
+            self._put_helper(conn, helper)
+        return helper
+    
+    def list_requests(self) -> List[Request]:
+        """List all stored requests."""
+        return [json.loads(data) for (data,) in self.db.connection().execute(_LIST_REQUESTS)]
+    
+    def list_helpers(self) -> List[Helper]:
+        """List all stored helpers."""
+        return [json.loads(data) for (data,) in self.db.connection().execute(_LIST_HELPERS)]
+    
+    def get_helpers_near(
+        self,
+        lat: float,
+        lng: float,
+        limit: int = 50,
+        max_radius_m: Optional[float] = None,
+        need: int = 0
+    ) -> List[Helper]:
+        """
+        Get the nearest available helpers (carrying `need`), nearest first.
+        
+        The search radius starts small and doubles until `limit` helpers
+        are found or it reaches `max_radius_m` (default from config); each
+        round is one R*Tree box query.
+        """
+        max_radius_m = get_helper_search_max_radius_m() if max_radius_m is None else max_radius_m
+        radius = min(_START_RADIUS_M, max_radius_m)
+        conn = self.db.connection()
+        while True:
+            box = bounding_box(lat, lng, radius)
+            found = []
+            for (data,) in conn.execute(_HELPERS_IN_BOX, (*box, need, need)):
+                helper = json.loads(data)
+                dist_m = haversine_meters(lat, lng, helper["lat"], helper["lng"])
+                if dist_m <= radius:
+                    found.append((dist_m, helper))
+            if len(found) >= limit or radius >= max_radius_m:
+                break
+            radius = min(radius * 2, max_radius_m)
+        
+        found.sort(key=lambda item: item[0])
+        return [helper for _, helper in found[:limit]]
+    
+    def get_cell_helpers(self, geohash: str, need: int = 0) -> List[Helper]:
+        """
+        Get the available helpers (carrying `need`) in one geohash cell.
+        
+        One R*Tree query on the cell's bounds; helpers come back in the
+        order they were first stored, like the in-memory geohash index.
+        """
+        min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+        helpers = []
+        rows = self.db.connection().execute(_HELPERS_IN_BOX_BY_RID, (min_lat, max_lat, min_lng, max_lng, need, need))
+        for (data,) in rows:
+            helper = json.loads(data)
+            # Helpers on a shared edge belong to one cell only
+            if get_geohash_for_point(helper["lat"], helper["lng"], len(geohash)) == geohash:
+                helpers.append(helper)
+        return helpers
+    
+    def record_match_attempt(self, request_id: str, candidates: List[Dict], config: Dict) -> None:
+        """Record a match attempt for analytics."""
+        self.record_match_attempts([(request_id, candidates)], config)
+    
+    def record_match_attempts(self, attempts: List[Tuple[str, List[Dict]]], config: Dict) -> None:
+        """Record the match attempts of a batch in one transaction."""
+        timestamp = datetime.utcnow().isoformat()
+        rows = [
+            (request_id, json.dumps({
+                "requestId": request_id,
+                "candidates": candidates,
+                "config": config,
+                "timestamp": timestamp,
+            }))
+            for request_id, candidates in attempts
+        ]
+        with self.db.transaction() as conn:
+            conn.executemany(_PUT_ATTEMPT, rows)
@@ -3,51 +3,372 @@ Mock storage layer for requests and helpers.
 In production, this would be replaced with Firestore queries.
 """
 
-import json
+import heapq
+import math
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, MutableMapping, NamedTuple, Optional, Tuple
 
-from .matching import Helper, Request
+from .config import (
+    get_geohash_precision,
+    get_helper_search_max_radius_m,
+    get_storage_backend,
+    get_storage_snapshot_format,
+    get_wal_compact_interval_s,
+    get_wal_compact_min_records,
+    get_wal_fsync,
+    get_write_behind_batch_size,
+    get_write_behind_max_age_ms,
+    get_write_behind_max_queue,
+)
+from .geo import (
+    box_distance_range,
+    geohash_bounds,
+    geohash_neighbors,
+    geohash_ring,
+    geohash_rings_for_radius,
+    get_geohash_for_point,
+    get_geohashes_for_points,
+)
+from .matching import PRODUCT_BITS, Helper, Request, can_supply, helper_inventory
+from .snapshot import Columns, LazyRecords, Snapshot, encode_snapshot
+from .sqlite_store import SQLiteStore, open_database
+from .wal import Compactor, WriteAheadLog
+from .write_behind import WriteBehindFull, WriteBehindQueue
 
-# In-memory storage for demo
-_requests_store: Dict[str, Request] = {}
-_helpers_store: Dict[str, Helper] = {}
+# In-memory storage for demo (LazyRecords after loading a binary snapshot)
+_requests_store: MutableMapping[str, Request] = {}
+_helpers_store: MutableMapping[str, Helper] = {}
 _match_attempts: List[Dict] = []
 
-# Optional: File-based persistence for demo
+# Spatial index: geohash cell -> helper IDs (mirrors the Firestore geohash index).
+# ID sets are dicts with None values: insertion-ordered, so candidates (and
+# score ties) come back in the same order in every process.
+_helpers_by_geohash: Dict[str, Dict[str, None]] = {}
+
+# Inventory index alongside it: (geohash cell, product bit) -> IDs of helpers
+# carrying that product (mirrors a (geohash, inventory) composite index)
+_helpers_by_product: Dict[Tuple[str, int], Dict[str, None]] = {}
+
+# Generation counters, bumped on every write: geohash cell -> helper index
+# generation, request ID -> request generation (see get_match_versions)
+_cell_generations: Dict[str, int] = {}
+_request_generations: Dict[str, int] = {}
+
+# Write listeners, called after a request/helper is stored (e.g. incremental matching)
+_request_listeners: List[Callable[[Request], None]] = []
+_helper_listeners: List[Callable[[Helper], None]] = []
+
+# Optional: File-based persistence for demo. STORAGE_FILE is the snapshot
+# (JSON, or binary with STORAGE_SNAPSHOT_FORMAT=binary; either loads);
+# writes are appended to STORAGE_FILE + ".wal" and compacted into it.
 STORAGE_FILE = os.getenv("STORAGE_FILE", "storage.json")
 
+# Binary snapshot columns (see snapshot.py): what indexes are rebuilt from
+# without decoding records
+_REQUEST_COLUMNS: Columns = {
+    "id": ("s", itemgetter("id")),
+}
+_HELPER_COLUMNS: Columns = {
+    "id": ("s", itemgetter("id")),
+    "geohash": ("s", itemgetter("geohash")),
+    "lat": ("d", itemgetter("lat")),
+    "lng": ("d", itemgetter("lng")),
+    "inventory": ("q", helper_inventory),
+}
+
+# Serializes writes with compaction (the compactor runs on its own thread)
+_write_lock = threading.RLock()
+_wal: Optional[WriteAheadLog] = None
+_compactor: Optional[Compactor] = None
+
+# With STORAGE_BACKEND=sqlite, writes go to SQLite instead of the log and
+# reads query it, so every worker process sees the others' writes; the
+# stores and indexes above stay empty (see sqlite_store). Opened by init_storage
+_sqlite: Optional[SQLiteStore] = None
+
+# Importing this module reads nothing: the stores are loaded by init_storage,
+# which every storage function calls first (see _ensure_loaded)
+_loaded = False
+
+# Pending log / SQLite writes while write-behind is running (see start_write_behind);
+# writes are enqueued under _write_lock, so the log keeps the in-memory order
+_write_queue: WriteBehindQueue[Dict] = WriteBehindQueue(
+    lambda records: _flush_writes(records),
+    max_size=get_write_behind_max_queue(),
+    batch_size=get_write_behind_batch_size(),
+    max_age_s=get_write_behind_max_age_ms() / 1000,
+    name="storage-write-behind",
+)
+
+
+def _get_wal() -> WriteAheadLog:
+    """Get the write-ahead log for the current STORAGE_FILE."""
+    global _wal
+    if _wal is None or _wal.snapshot_path != STORAGE_FILE:
+        if _wal is not None:
+            _wal.close()
+        _wal = WriteAheadLog(STORAGE_FILE, fsync=get_wal_fsync())
+    return _wal
+
+
+def init_storage() -> None:
+    """
+    Load the stores from disk (snapshot and log, or SQLite) if not loaded yet.
+    
+    Storage functions load on first use, so calling this is optional: the
+    app lifespan calls it off the event loop so no handler blocks on the
+    load. Concurrent callers wait for the one load.
+    """
+    global _sqlite, _loaded
+    with _write_lock:
+        if not _loaded:
+            if get_storage_backend() == "sqlite":
+                _sqlite = SQLiteStore(open_database())
+            _load_from_file()
+            _loaded = True
+
+
+def _ensure_loaded() -> None:
+    """Load the stores on first use (a no-op once loaded)."""
+    if not _loaded:
+        init_storage()
+
+
+def _ensure_readable() -> None:
+    """Load the stores on first use; with SQLite, commit this process's queued writes first."""
+    _ensure_loaded()
+    if _sqlite is not None:
+        _write_queue.flush()  # So a caller sees its own writes
+
 
 def _load_from_file():
-    """Load data from JSON file if it exists."""
-    if os.path.exists(STORAGE_FILE):
-        try:
-            with open(STORAGE_FILE, "r") as f:
-                data = json.load(f)
-                _requests_store.update(data.get("requests", {}))
-                _helpers_store.update(data.get("helpers", {}))
-        except Exception:
-            # If file is corrupted, start fresh
-            pass
-
-
-def _save_to_file():
-    """Save data to JSON file."""
+    """Recover the stores: the latest snapshot, then the log written after it."""
+    if _sqlite is not None:
+        return  # Read from SQLite as needed
+    
+    wal = _get_wal()
+    # A missing or corrupted snapshot starts fresh
+    data = wal.load_snapshot() or {}
+    if isinstance(data, Snapshot):
+        _attach_snapshot(data)
+    else:
+        _requests_store.update(data.get("requests", {}))
+        _helpers_store.update(data.get("helpers", {}))
+        
+        # Older files may predate geohash fields; (re)compute and index on load
+        for request in _requests_store.values():
+            _assign_geohash(request)
+        for helper in _helpers_store.values():
+            _index_helper(helper)
+    
+    for record in wal.replay():
+        _apply_record(record)
+
+
+def _apply_record(record: Dict) -> None:
+    """Apply one logged write (writes are upserts, so replays are idempotent)."""
+    op, data = record.get("op"), record.get("data")
+    if op == "request":
+        _put_request(data)
+    elif op == "helper":
+        _put_helper(data)
+    elif op == "inventory" and data["id"] in _helpers_store:
+        _set_inventory(_helpers_store[data["id"]], data["inventory"])
+
+
+def _log_write(op: str, data: Dict) -> None:
+    """
+    Queue a write for the log (or SQLite); written synchronously if write-behind is off.
+    
+    Called before the write is applied to memory, so a write the full
+    queue rejects (`WriteBehindFull`) changes nothing.
+    """
+    # Copied now: the flusher serializes it later, while the stored dict may change
+    _write_queue.put({"op": op, "data": dict(data)})
+
+
+def _flush_writes(records: List[Dict]) -> None:
+    """Persist a batch of writes: one log append, or one SQLite transaction."""
+    if _sqlite is not None:
+        with _sqlite.db.transaction():
+            for record in records:
+                op, data = record["op"], record["data"]
+                if op == "request":
+                    _sqlite.create_request(data)
+                elif op == "helper":
+                    _sqlite.create_helper(data)
+                elif op == "inventory":
+                    _sqlite.update_helper_inventory(data["id"], data["inventory"])
+                elif op == "attempts":
+                    _sqlite.record_match_attempts(data["attempts"], data["config"])
+        return
     try:
-        data = {
-            "requests": _requests_store,
-            "helpers": _helpers_store,
-        }
-        with open(STORAGE_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-    except Exception:
-        # If file write fails, continue with in-memory only
+        _get_wal().append_many(records)
+    except (OSError, TypeError, ValueError):
+        # If the log write fails, continue with in-memory only
         pass
 
 
-# Load on module import
-_load_from_file()
+def start_write_behind() -> None:
+    """Persist writes from a background thread in batches instead of in the caller."""
+    _write_queue.start()
+
+
+def stop_write_behind() -> None:
+    """Flush every queued write and persist synchronously again."""
+    _write_queue.stop()
+
+
+def _attach_snapshot(snapshot: Snapshot) -> None:
+    """
+    Load a binary snapshot without decoding its records.
+    
+    The geohash and inventory indexes are built from the snapshot's
+    columns; the stores become `LazyRecords` that decode each request or
+    helper on first access.
+    """
+    global _requests_store, _helpers_store
+    requests = snapshot.section("requests")
+    helpers = snapshot.section("helpers")
+    _requests_store = LazyRecords(requests, on_decode=_assign_geohash)
+    _helpers_store = LazyRecords(helpers, on_decode=_assign_geohash)
+    if helpers is None or not len(helpers):
+        return
+    
+    precision = get_geohash_precision()
+    cells = helpers.strings("geohash")
+    if len(cells[0]) != precision:
+        # Written at another precision: re-encode from the coordinate columns
+        cells = get_geohashes_for_points(helpers.column("lat"), helpers.column("lng"), precision)
+    
+    # Group by cell first (keeping row order), then fill each index in one update
+    groups: Dict[str, Tuple[List[str], List[int]]] = {}
+    for helper_id, cell, inventory in zip(helpers.strings("id"), cells, helpers.column("inventory")):
+        ids, inventories = groups.setdefault(cell, ([], []))
+        ids.append(helper_id)
+        inventories.append(inventory)
+    for cell, (ids, inventories) in groups.items():
+        _helpers_by_geohash.setdefault(cell, {}).update(dict.fromkeys(ids))
+        for bit in PRODUCT_BITS.values():
+            carrying = [i for i, inventory in zip(ids, inventories) if inventory & bit]
+            if carrying:
+                _helpers_by_product.setdefault((cell, bit), {}).update(dict.fromkeys(carrying))
+        _cell_generations[cell] = _cell_generations.get(cell, 0) + 1
+
+
+def _encode_binary_snapshot(state: Dict) -> bytes:
+    """Serialize the stores as a binary columnar snapshot."""
+    return encode_snapshot({
+        "requests": (state["requests"].values(), _REQUEST_COLUMNS),
+        "helpers": (state["helpers"].values(), _HELPER_COLUMNS),
+    })
+
+
+def compact() -> None:
+    """Write a fresh snapshot and truncate the log."""
+    _ensure_loaded()
+    if _sqlite is not None:
+        return  # SQLite checkpoints its own journal
+    _get_wal().compact(
+        lambda: {"requests": _requests_store, "helpers": _helpers_store},
+        _write_lock,
+        _encode_binary_snapshot if get_storage_snapshot_format() == "binary" else None,
+    )
+
+
+def start_compactor(interval_s: Optional[float] = None, min_records: Optional[int] = None) -> None:
+    """
+    Start compacting the log in the background.
+    
+    Args:
+        interval_s: Seconds between checks (default from config)
+        min_records: Compact once the log has this many records (default from config)
+    """
+    global _compactor
+    if _compactor is not None or get_storage_backend() == "sqlite":
+        return
+    _compactor = Compactor(
+        compact,
+        lambda: _get_wal().records,
+        get_wal_compact_interval_s() if interval_s is None else interval_s,
+        get_wal_compact_min_records() if min_records is None else min_records,
+    )
+    _compactor.start()
+
+
+def stop_compactor() -> None:
+    """Stop the background compactor and fold any remaining log into the snapshot."""
+    global _compactor
+    if _compactor is not None:
+        _compactor.stop()
+        _compactor = None
+    if not _loaded or _sqlite is not None:
+        return  # Nothing was written (or a load is still running; the log is kept)
+    if _get_wal().records:
+        compact()
+    _get_wal().close()
+
+
+def _assign_geohash(record: Dict) -> str:
+    """Store the geohash for a request/helper record at the index precision."""
+    geohash = get_geohash_for_point(record["lat"], record["lng"], get_geohash_precision())
+    record["geohash"] = geohash
+    return geohash
+
+
+def _index_helper(helper: Helper) -> None:
+    """
+    Add a helper to the geohash and inventory indexes, replacing any stale entry.
+    
+    A helper that stays in its cell keeps its place in the cell's index
+    (like a dict upsert), so re-saving a helper does not reorder ties.
+    """
+    helper_id = helper["id"]
+    previous = _helpers_store.get(helper_id)
+    old_cell = previous.get("geohash") if previous is not None else None
+    if old_cell is not None and helper_id not in _helpers_by_geohash.get(old_cell, {}):
+        old_cell = None  # Stored but not indexed yet (e.g. while loading)
+    old_inventory = helper_inventory(previous) if old_cell is not None else 0
+    
+    geohash = _assign_geohash(helper)
+    if old_cell != geohash:
+        if old_cell is not None:
+            _unindex_helper(helper_id, old_cell, old_inventory)
+            old_inventory = 0
+        _helpers_by_geohash.setdefault(geohash, {})[helper_id] = None
+    _reindex_inventory(helper_id, geohash, old_inventory, helper_inventory(helper))
+    _cell_generations[geohash] = _cell_generations.get(geohash, 0) + 1
+
+
+def _unindex_helper(helper_id: str, geohash: str, inventory: int) -> None:
+    """Remove a helper from a cell's geohash and inventory indexes."""
+    _cell_generations[geohash] = _cell_generations.get(geohash, 0) + 1
+    _reindex_inventory(helper_id, geohash, inventory, 0)
+    cell = _helpers_by_geohash.get(geohash)
+    if cell is not None:
+        cell.pop(helper_id, None)
+        if not cell:
+            del _helpers_by_geohash[geohash]
+
+
+def _reindex_inventory(helper_id: str, geohash: str, old: int, new: int) -> None:
+    """
+    Swap a helper's (cell, product) index entries from inventory `old` to `new`.
+    
+    Entries for products it keeps are left in place, so their order holds.
+    """
+    for bit in PRODUCT_BITS.values():
+        if old & bit and not new & bit:
+            members = _helpers_by_product.get((geohash, bit))
+            if members is not None:
+                members.pop(helper_id, None)
+                if not members:
+                    del _helpers_by_product[(geohash, bit)]
+        elif new & bit and not old & bit:
+            _helpers_by_product.setdefault((geohash, bit), {})[helper_id] = None
 
 
 def get_request(request_id: str) -> Optional[Request]:
@@ -65,6 +386,9 @@ def get_request(request_id: str) -> Optional[Request]:
     Returns:
         Request data or None if not found
     """
+    _ensure_readable()
+    if _sqlite is not None:
+        return _sqlite.get_request(request_id)
     return _requests_store.get(request_id)
 
 
@@ -78,25 +402,53 @@ def create_request(request_data: Request) -> Request:
     - Fields: lat, lng, urgency, productNeed, createdAt, geohash
     - Index: Composite index on (geohash, createdAt)
     
+    The geohash field is computed here and stored on the request.
+    
     Args:
         request_data: Request data
     
     Returns:
         Created request
     """
-    _requests_store[request_data["id"]] = request_data
-    _save_to_file()
+    _ensure_loaded()
+    with _write_lock:
+        _log_write("request", request_data)
+        _put_request(request_data)
+    for listener in _request_listeners:
+        listener(request_data)
     return request_data
 
 
-def get_helpers_near(lat: float, lng: float, limit: int = 50) -> List[Helper]:
+def _put_request(request_data: Request) -> None:
+    """Store a request (in memory; SQLite gets it from the queued write) and bump its generation."""
+    _assign_geohash(request_data)
+    if _sqlite is None:
+        _requests_store[request_data["id"]] = request_data
+    _request_generations[request_data["id"]] = _request_generations.get(request_data["id"], 0) + 1
+
+
+class HelperCell(NamedTuple):
+    """Snapshot of one geohash cell's available helpers."""
+    geohash: str
+    helpers: List[Helper]
+
+
+def get_helpers_near(
+    lat: float,
+    lng: float,
+    limit: int = 50,
+    max_radius_m: Optional[float] = None,
+    need: int = 0,
+    visited: Optional[List[str]] = None
+) -> List[Helper]:
     """
-    Get helpers near a location (coarse filtering).
+    Get helpers near a location (coarse filtering), nearest cells first.
     
     In production, this would use Firestore geo queries:
     1. Calculate geohash for (lat, lng) with precision 7
     2. Get geohash neighbors (8 cells)
     3. Query: WHERE geohash IN [neighbors] AND available == true
+       (AND inventory array-contains productNeed)
     4. Order by updatedAt DESC
     5. Limit to limit (e.g., 50-100 for server-side ranking)
     6. Return list of Helper documents
@@ -105,23 +457,275 @@ def get_helpers_near(lat: float, lng: float, limit: int = 50) -> List[Helper]:
     - Composite index: (geohash, available, updatedAt)
     - This enables efficient geo queries without full table scans
     
-    For demo, returns a sample list of helpers.
+    In-memory version: expanding-ring search over the geohash index (see
+    `get_helper_rings`), then cells are ordered by their distance from the
+    location and the first `limit` helpers are kept, so ranking only sees
+    the nearest candidates.
     
     Args:
         lat: Latitude (degrees)
         lng: Longitude (degrees)
         limit: Maximum number of candidates to return
+        max_radius_m: How far the search may grow (default from config)
+        need: Only helpers carrying these products (PRODUCT_* bits; 0 = any)
+        visited: If given, every cell of the rings searched is appended to it
+            (nothing with SQLite, whose results are not cached)
     
     Returns:
-        List of helper candidates
+        List of helper candidates in approximate distance order
     """
-    # In production: Firestore query with geohash filtering
-    # For demo: return all available helpers (simulating coarse filtering)
-    helpers = [h for h in _helpers_store.values() if h.get("available", False)]
+    if _sqlite is not None:
+        # R*Tree search with a growing radius (exact distance order)
+        _ensure_readable()
+        return _sqlite.get_helpers_near(lat, lng, limit, max_radius_m, need)
+    return nearest_helpers(lat, lng, get_helper_rings(lat, lng, limit, max_radius_m, need, visited), limit)
+
+
+def helper_search_rings(cell: str, max_radius_m: Optional[float] = None) -> int:
+    """
+    Number of rings around a geohash cell that a helper search may grow to.
+    
+    Every helper search (`get_helper_rings`, `iter_helper_cells`) and
+    `helper_search_cells` uses this, so /match and the incremental matcher
+    agree on which cells a request can draw helpers from.
+    
+    Args:
+        cell: Geohash cell of the search location
+        max_radius_m: How far the search may grow (default from config)
+    
+    Returns:
+        Ring count (at least 1)
+    """
+    if max_radius_m is None:
+        max_radius_m = get_helper_search_max_radius_m()
+    return geohash_rings_for_radius(cell, max_radius_m)
+
+
+def helper_search_cells(cell: str) -> List[str]:
+    """Every geohash cell a helper search from `cell` may read, the cell itself first."""
+    return geohash_neighbors(cell, helper_search_rings(cell))
+
+
+def get_helper_rings(
+    lat: float,
+    lng: float,
+    limit: int = 50,
+    max_radius_m: Optional[float] = None,
+    need: int = 0,
+    visited: Optional[List[str]] = None
+) -> List[HelperCell]:
+    """
+    Snapshot non-empty cells ring by ring around the query cell.
     
-    # Simulate coarse filtering by returning a sample
-    # In production, geohash neighbors would pre-filter this
-    return helpers[:limit]
+    Starts with the query cell and its 8 neighbors and adds one ring at a
+    time until at least `limit` available helpers are collected or the next
+    ring would lie beyond `max_radius_m`. The result depends only on the
+    query cell, so requests in the same cell can share it.
+    
+    Args:
+        lat: Latitude (degrees)
+        lng: Longitude (degrees)
+        limit: Stop once this many available helpers are collected
+        max_radius_m: How far the search may grow (default from config)
+        need: Only helpers carrying these products (PRODUCT_* bits; 0 = any)
+        visited: If given, every cell of the rings searched is appended to it
+    
+    Returns:
+        List of HelperCell, ring by ring (available helpers only)
+    """
+    _ensure_readable()
+    center = get_geohash_for_point(lat, lng, get_geohash_precision())
+    max_rings = helper_search_rings(center, max_radius_m)
+    
+    cells = []
+    found = 0
+    for k in range(max_rings + 1):
+        for cell in geohash_ring(center, k):
+            if visited is not None:
+                visited.append(cell)
+            if _may_have_helpers(cell, need):
+                helpers = list(_available_helpers_in(cell, need))
+                if helpers:
+                    cells.append(HelperCell(cell, helpers))
+                    found += len(helpers)
+        if k >= 1 and found >= limit:
+            break
+    return cells
+
+
+def nearest_helpers(lat: float, lng: float, cells: List[HelperCell], limit: int = 50) -> List[Helper]:
+    """
+    Flatten a cell snapshot nearest cells first, keeping the first `limit` helpers.
+    
+    Returns:
+        List of helpers in approximate distance order
+    """
+    helpers: List[Helper] = []
+    for _, cell_helpers in order_helper_cells(lat, lng, cells):
+        helpers.extend(cell_helpers)
+        if len(helpers) >= limit:
+            return helpers[:limit]
+    return helpers
+
+
+def iter_helper_cells(
+    lat: float,
+    lng: float,
+    need: int = 0,
+    max_radius_m: Optional[float] = None,
+    cache: Optional[Dict[str, List[Helper]]] = None,
+    visited: Optional[List[str]] = None
+) -> Iterator[Tuple[float, Iterable[Helper]]]:
+    """
+    Iterate geohash cells around a location, nearest cells first.
+    
+    Covers the same cells as `get_helpers_near`: the query cell and the
+    rings around it out to `max_radius_m`. Rings are added one at a time
+    as the consumer gets to them, so a consumer that stops early (e.g.
+    branch and bound in `rank_helpers_bounded`) never lists the cells of
+    the rings it skips, let alone reads their helpers. Each cell is
+    yielded as (min distance in meters from the location to the cell,
+    lazy iterator over its available helpers); empty cells are yielded
+    too, so a branch-and-bound consumer can stop at them.
+    
+    Every cell of a ring is at least as far as the nearest cell of the
+    ring inside it, so one ring of lookahead keeps the order exact.
+    
+    In production, each cell is one Firestore query on the geohash field,
+    issued only when the cell is expanded.
+    
+    Args:
+        lat: Latitude (degrees)
+        lng: Longitude (degrees)
+        need: Only helpers carrying these products (PRODUCT_* bits; 0 = any)
+        max_radius_m: How far the search may grow (default from config)
+        cache: Cell -> helpers lists shared by several iterations with the
+            same `need` (e.g. the requests of a batch); a cell's helpers are
+            read once and reused
+        visited: If given, every yielded cell is appended to it
+    
+    Returns:
+        Iterator of (min_dist_m, helpers) pairs in increasing min distance
+    """
+    _ensure_readable()
+    center = get_geohash_for_point(lat, lng, get_geohash_precision())
+    max_rings = helper_search_rings(center, max_radius_m)
+    
+    def ring(k: int) -> List[Tuple[float, str]]:
+        return [(_cell_min_distance(lat, lng, cell), cell) for cell in geohash_ring(center, k)]
+    
+    pending: List[Tuple[float, str]] = []  # Heap of listed cells not yielded yet
+    k = 0
+    # Next ring, listed but not merged (None past max_rings); its nearest
+    # cell bounds every cell not listed yet
+    ahead: Optional[List[Tuple[float, str]]] = ring(0)
+    while True:
+        floor = min(ahead)[0] if ahead else math.inf
+        if pending and pending[0][0] <= floor:
+            nearest, cell = heapq.heappop(pending)
+            if visited is not None:
+                visited.append(cell)
+            if not _may_have_helpers(cell, need):
+                yield nearest, ()
+            elif cache is None:
+                yield nearest, _available_helpers_in(cell, need)
+            else:
+                if cell not in cache:
+                    cache[cell] = list(_available_helpers_in(cell, need))
+                yield nearest, cache[cell]
+        elif ahead is not None:
+            for entry in ahead:
+                heapq.heappush(pending, entry)
+            k += 1
+            ahead = ring(k) if k <= max_rings else None
+        else:
+            return
+
+
+def get_helper_cells(lat: float, lng: float, rings: int = 1, need: int = 0) -> List[HelperCell]:
+    """
+    Snapshot the non-empty cells around a location.
+    
+    Every location in the same geohash cell gets the same cells, so a batch
+    takes one snapshot per cell and orders it per request with
+    `order_helper_cells`.
+    
+    Args:
+        lat: Latitude (degrees)
+        lng: Longitude (degrees)
+        rings: Number of neighbor rings around the query cell
+        need: Only helpers carrying these products (PRODUCT_* bits; 0 = any)
+    
+    Returns:
+        List of HelperCell (geohash order, available helpers only)
+    """
+    _ensure_readable()
+    center = get_geohash_for_point(lat, lng, get_geohash_precision())
+    
+    cells = []
+    for cell in geohash_neighbors(center, rings):
+        if _may_have_helpers(cell, need):
+            helpers = list(_available_helpers_in(cell, need))
+            if helpers:
+                cells.append(HelperCell(cell, helpers))
+    return cells
+
+
+def get_cell_helpers(geohash: str) -> List[Helper]:
+    """
+    Get the available helpers in one geohash cell (at the index precision).
+    
+    In production, this is one Firestore query on the geohash field.
+    """
+    _ensure_readable()
+    return list(_available_helpers_in(geohash))
+
+
+def order_helper_cells(lat: float, lng: float, cells: List[HelperCell]) -> List[Tuple[float, List[Helper]]]:
+    """
+    Order a cell snapshot nearest first for a location.
+    
+    Returns:
+        List of (min_dist_m, helpers) pairs, as yielded by `iter_helper_cells`
+    """
+    ordered = [(_cell_min_distance(lat, lng, cell.geohash), i) for i, cell in enumerate(cells)]
+    ordered.sort()
+    return [(nearest, cells[i].helpers) for nearest, i in ordered]
+
+
+def _cell_min_distance(lat: float, lng: float, geohash: str) -> float:
+    """Lower bound in meters on the distance from a location to a cell."""
+    nearest, _ = box_distance_range(lat, lng, *geohash_bounds(geohash))
+    # 1 m slack: the clamped point is within a hair of the true nearest
+    return max(0.0, nearest - 1.0)
+
+
+def _indexed_ids(cell: str, need: int = 0) -> Dict[str, None]:
+    """
+    IDs indexed in a cell, narrowed by product, in insertion order.
+    
+    With a need, this is the (cell, product) index of its lowest product
+    bit, so cells without that product are skipped without touching helpers.
+    """
+    if not need:
+        return _helpers_by_geohash.get(cell, {})
+    return _helpers_by_product.get((cell, need & -need), {})
+
+
+def _may_have_helpers(cell: str, need: int = 0) -> bool:
+    """Whether a cell is worth reading (always, with SQLite, which has no index in memory)."""
+    return _sqlite is not None or bool(_indexed_ids(cell, need))
+
+
+def _available_helpers_in(cell: str, need: int = 0) -> Iterator[Helper]:
+    """Iterate the available helpers in a geohash cell carrying the `need` products."""
+    if _sqlite is not None:
+        yield from _sqlite.get_cell_helpers(cell, need)
+        return
+    for helper_id in _indexed_ids(cell, need):
+        helper = _helpers_store[helper_id]
+        if helper.get("available", False) and can_supply(helper, need):
+            yield helper
 
 
 def create_helper(helper_data: Helper) -> Helper:
@@ -134,17 +738,125 @@ def create_helper(helper_data: Helper) -> Helper:
     - Fields: lat, lng, rating, available, updatedAt, geohash
     - Index: Composite index on (geohash, available, updatedAt)
     
+    The geohash field is computed here and the helper is (re)indexed.
+    
     Args:
         helper_data: Helper data
     
     Returns:
         Created helper
     """
-    _helpers_store[helper_data["id"]] = helper_data
-    _save_to_file()
+    _ensure_loaded()
+    with _write_lock:
+        _log_write("helper", helper_data)
+        _put_helper(helper_data)
+    for listener in _helper_listeners:
+        listener(helper_data)
     return helper_data
 
 
+def _put_helper(helper_data: Helper) -> None:
+    """(Re)index and store a helper (SQLite indexes it from the queued write instead)."""
+    if _sqlite is not None:
+        _assign_geohash(helper_data)
+        return
+    _index_helper(helper_data)
+    _helpers_store[helper_data["id"]] = helper_data
+
+
+def get_match_versions(request_id: str, cells: List[str]) -> Optional[Tuple[int, Tuple[int, ...]]]:
+    """
+    Get the write generations a match result for a request depends on.
+    
+    The helper index bumps a cell's generation whenever a helper enters,
+    leaves or changes in it, and a request's generation whenever it is
+    re-created, so equal versions mean a result computed from these cells
+    is still current.
+    
+    Args:
+        request_id: Request ID
+        cells: Geohash cells the result reads helpers from
+    
+    Returns:
+        (request generation, cell generations in `cells` order), or None
+        with SQLite: other processes write to it without bumping this
+        process's generations, so no result is known to be current
+    """
+    _ensure_loaded()
+    if _sqlite is not None:
+        return None
+    return (
+        _request_generations.get(request_id, 0),
+        tuple(_cell_generations.get(cell, 0) for cell in cells),
+    )
+
+
+def update_helper_inventory(helper_id: str, inventory: int) -> Optional[Helper]:
+    """
+    Update only a helper's product inventory.
+    
+    Cheaper than `create_helper`: the location stays indexed as is and only
+    the helper's (cell, product) index entries are swapped.
+    
+    In production, this would be a Firestore field update on
+    helpers/{helper_id}: {inventory}.
+    
+    Args:
+        helper_id: Helper ID
+        inventory: New inventory bitmask (PRODUCT_* bits)
+    
+    Returns:
+        Updated helper, or None if not found
+    """
+    _ensure_readable()
+    with _write_lock:
+        helper = _helpers_store.get(helper_id) if _sqlite is None else _sqlite.get_helper(helper_id)
+        if helper is None:
+            return None
+        _log_write("inventory", {"id": helper_id, "inventory": inventory})
+        if _sqlite is None:
+            _set_inventory(helper, inventory)
+        else:
+            helper["inventory"] = inventory  # A copy; SQLite gets the queued write
+    for listener in _helper_listeners:
+        listener(helper)
+    return helper
+
+
+def _set_inventory(helper: Helper, inventory: int) -> None:
+    """Swap a stored helper's inventory and its (cell, product) index entries."""
+    geohash = helper["geohash"]
+    _reindex_inventory(helper["id"], geohash, helper_inventory(helper), inventory)
+    helper["inventory"] = inventory
+    _cell_generations[geohash] = _cell_generations.get(geohash, 0) + 1
+
+
+def list_requests() -> List[Request]:
+    """List all stored requests."""
+    _ensure_readable()
+    if _sqlite is not None:
+        return _sqlite.list_requests()
+    return list(_requests_store.values())
+
+
+def list_helpers() -> List[Helper]:
+    """List all stored helpers."""
+    _ensure_readable()
+    if _sqlite is not None:
+        return _sqlite.list_helpers()
+    return list(_helpers_store.values())
+
+
+def add_request_listener(listener: Callable[[Request], None]) -> None:
+    """Call `listener` with every request stored by `create_request`."""
+    _request_listeners.append(listener)
+
+
+def add_helper_listener(listener: Callable[[Helper], None]) -> None:
+    """Call `listener` with every helper stored by `create_helper`."""
+    _helper_listeners.append(listener)
+
+
 def record_match_attempt(request_id: str, candidates: List[Dict], config: Dict):
     """
     Record a match attempt for analytics/demo.
@@ -154,11 +866,18 @@ def record_match_attempt(request_id: str, candidates: List[Dict], config: Dict):
     - Fields: requestId, candidates, config, timestamp
     - Used for analytics and debugging
     
+    With SQLite, attempts are written to its match_attempts table instead
+    of the in-memory log.
+    
     Args:
         request_id: Request ID
         candidates: Ranked candidates
         config: Matching configuration used
     """
+    _ensure_loaded()
+    if _sqlite is not None:
+        record_match_attempts([(request_id, candidates)], config)
+        return
     attempt = {
         "requestId": request_id,
         "candidates": candidates,
@@ -171,3 +890,37 @@ def record_match_attempt(request_id: str, candidates: List[Dict], config: Dict):
     if len(_match_attempts) > 100:
         _match_attempts.pop(0)
 
+
+def record_match_attempts(attempts: List[Tuple[str, List[Dict]]], config: Dict):
+    """
+    Record the match attempts of a batch in one step.
+    
+    Same records as calling `record_match_attempt` per request, with one
+    shared timestamp and one trim of the in-memory log.
+    
+    Args:
+        attempts: (request ID, ranked candidates) pairs
+        config: Matching configuration used
+    """
+    _ensure_loaded()
+    if _sqlite is not None:
+        if attempts:
+            try:
+                _log_write("attempts", {"attempts": attempts, "config": config})
+            except WriteBehindFull:
+                pass  # Analytics only: never fail a match over it
+        return
+    timestamp = datetime.utcnow().isoformat()
+    _match_attempts.extend(
+        {
+            "requestId": request_id,
+            "candidates": candidates,
+            "config": config,
+            "timestamp": timestamp,
+        }
+        for request_id, candidates in attempts
+    )
+    
+    # Keep only last 100 attempts in memory
+    if len(_match_attempts) > 100:
+        del _match_attempts[:-100]
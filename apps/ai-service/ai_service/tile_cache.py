@@ -0,0 +1,152 @@
+"""
+Bounded LRU cache for tile neighbor rings and circle coverings.
+Hot tiles are queried with the same parameters over and over, so the
+tile sets are computed once and shared as frozensets.
+"""
+
+import math
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Tuple
+
+from .geo import (
+    TILE_GRID_LEGACY,
+    TileCovering,
+    box_distance_range,
+    classify_tiles,
+    cover_circle,
+    get_tile_neighbor_keys,
+    lat_lng_to_tile_key,
+    tile_key_bounds,
+)
+
+
+class _CoveringBand(NamedTuple):
+    """Cached covering of a tile for a radius bucket, before trimming to the query point."""
+    inside: frozenset  # Inside the circle for every point of the tile and radius of the bucket
+    boxes: Tuple[Tuple[int, Tuple[float, float, float, float]], ...]  # Other candidates with bounds
+
+
+class TileCache:
+    """
+    LRU cache of neighbor rings and coverings keyed by (tile, radius bucket).
+    
+    Radii are rounded up to a multiple of `radius_bucket_m` so nearby radii
+    share entries. Neighbor rings are supersets of what the exact radius
+    needs; coverings are trimmed to the exact query point and radius on
+    every lookup.
+    """
+    
+    def __init__(self, maxsize: int = 4096, radius_bucket_m: int = 50):
+        """
+        Args:
+            maxsize: Maximum number of cached entries
+            radius_bucket_m: Radius rounding step in meters
+        """
+        if maxsize < 1 or radius_bucket_m < 1:
+            raise ValueError("maxsize and radius_bucket_m must be >= 1")
+        self.maxsize = maxsize
+        self.radius_bucket_m = radius_bucket_m
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+    
+    def neighbors(
+        self,
+        tile_key: int,
+        radius_m: float,
+        tile_size_m: int = 200,
+        grid: str = TILE_GRID_LEGACY
+    ) -> frozenset:
+        """
+        Get the (cached) square neighbor ring of a tile.
+        
+        Returns:
+            Frozenset of packed tile keys including the tile itself
+        """
+        bucket = self._bucket(radius_m)
+        key = ("ring", tile_key, bucket, tile_size_m, grid)
+        return self._get(key, lambda: frozenset(
+            get_tile_neighbor_keys(tile_key, bucket * self.radius_bucket_m, tile_size_m, grid)
+        ))
+    
+    def covering(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        tile_size_m: int = 200,
+        grid: str = TILE_GRID_LEGACY
+    ) -> TileCovering:
+        """
+        Get the circle covering of a query point, as `cover_circle` would.
+        
+        The cache holds, per (tile, radius bucket), the tiles inside the
+        circle for every point of the tile and the bounds of the other
+        candidate tiles; a lookup only classifies those candidates against
+        the exact point and radius.
+        
+        Returns:
+            TileCovering with all, inside and edge tile key sets
+        """
+        tile_key = lat_lng_to_tile_key(lat, lng, tile_size_m, grid)
+        bucket = self._bucket(radius_m)
+        key = ("cover", tile_key, bucket, tile_size_m, grid)
+        band = self._get(key, lambda: self._build_covering(tile_key, bucket, tile_size_m, grid))
+        
+        trimmed = classify_tiles(lat, lng, radius_m, band.boxes)
+        inside = band.inside | trimmed.inside
+        return TileCovering(tiles=inside | trimmed.edge, inside=inside, edge=trimmed.edge)
+    
+    def stats(self) -> Dict[str, float]:
+        """Get hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+    
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def _bucket(self, radius_m: float) -> int:
+        """Radius bucket index: radius rounded up to the bucket step."""
+        return max(1, math.ceil(radius_m / self.radius_bucket_m))
+    
+    def _get(self, key: Hashable, build: Callable[[], object]):
+        """Look up an entry, building and inserting it on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        entry = build()
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+    
+    def _build_covering(self, tile_key: int, bucket: int, tile_size_m: int, grid: str) -> _CoveringBand:
+        """Cover the source tile grown by the radius bucket."""
+        min_lat, min_lng, max_lat, max_lng = tile_key_bounds(tile_key, tile_size_m, grid)
+        center_lat = (min_lat + max_lat) / 2
+        center_lng = (min_lng + max_lng) / 2
+        _, half_diagonal = box_distance_range(center_lat, center_lng, min_lat, min_lng, max_lat, max_lng)
+        
+        # Radii in this bucket lie in ((bucket - 1) * step, bucket * step]
+        outer = bucket * self.radius_bucket_m + half_diagonal
+        inner = (bucket - 1) * self.radius_bucket_m - half_diagonal
+        
+        tiles = cover_circle(center_lat, center_lng, outer, tile_size_m, grid).tiles
+        inside = frozenset()
+        if inner > 0:
+            inside = cover_circle(center_lat, center_lng, inner, tile_size_m, grid).inside & tiles
+        boxes = tuple((key, tile_key_bounds(key, tile_size_m, grid)) for key in tiles - inside)
+        return _CoveringBand(inside=inside, boxes=boxes)
@@ -0,0 +1,187 @@
+"""
+Append-only write-ahead log with snapshot compaction.
+Each write appends one JSON line instead of rewriting the whole store;
+a compactor periodically folds the log into a snapshot file.
+
+In production, Firestore handles durability and none of this is needed.
+"""
+
+import json
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from .snapshot import Snapshot, load_snapshot
+
+
+def _encode_json(state: Dict[str, Any]) -> bytes:
+    # default=dict: stores may be lazily decoded mappings (see snapshot.LazyRecords)
+    return json.dumps(state, separators=(",", ":"), default=dict).encode("utf-8")
+
+
+class WriteAheadLog:
+    """
+    JSON-lines log next to a snapshot file (JSON or binary).
+    
+    Records must be idempotent upserts (replaying one twice gives the same
+    state), which is what makes crash recovery simple:
+    
+    - `append` writes one line to `<snapshot>.wal`.
+    - `compact` rotates the log to `<snapshot>.wal.1`, writes the snapshot
+      through a temp file + rename, then deletes the rotated log. A crash
+      at any step leaves a snapshot plus the logs written after it.
+    - `replay` yields the rotated log, then the live log, skipping a torn
+      line left by a crash mid-append.
+    """
+    
+    def __init__(self, snapshot_path: str, fsync: bool = False):
+        """
+        Args:
+            snapshot_path: Snapshot file; logs live next to it
+            fsync: fsync after every append (durable across power loss,
+                not just process crashes)
+        """
+        self.snapshot_path = snapshot_path
+        self.log_path = snapshot_path + ".wal"
+        self.rotated_path = self.log_path + ".1"
+        self.fsync = fsync
+        self.records = 0  # Records appended since the last compaction
+        self._lock = threading.Lock()
+        self._file = None
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record to the log."""
+        self.append_many([record])
+    
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """Append records with one write (and at most one fsync)."""
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.log_path, "a", encoding="utf-8")
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.records += len(records)
+    
+    def load_snapshot(self) -> Union[Snapshot, Dict[str, Any], None]:
+        """
+        Open the snapshot, or None if there is none (or it is unreadable).
+        
+        JSON snapshots are parsed; binary ones are mapped (see `snapshot`).
+        """
+        return load_snapshot(self.snapshot_path)
+    
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield the records written after the snapshot, oldest first."""
+        for path in (self.rotated_path, self.log_path):
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash
+    
+    def compact(
+        self,
+        snapshot: Callable[[], Dict[str, Any]],
+        lock: threading.RLock,
+        encode: Optional[Callable[[Dict[str, Any]], bytes]] = None
+    ) -> None:
+        """
+        Write a snapshot and drop the log records it covers.
+        
+        Args:
+            snapshot: Returns the full state to persist
+            lock: The caller's write lock; held while the state is captured
+                and the log rotated, so no write lands between the two
+            encode: Serializes the state (default compact JSON)
+        """
+        with lock:
+            data = (encode or _encode_json)(snapshot())
+            with self._lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                if os.path.exists(self.log_path):
+                    self._rotate()
+                self.records = 0
+        
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+    
+    def _rotate(self) -> None:
+        """Move the live log to the rotated path, keeping a rotated log left by a crash."""
+        if not os.path.exists(self.rotated_path):
+            os.replace(self.log_path, self.rotated_path)
+            return
+        # A previous compaction died before its snapshot landed: append to it
+        with open(self.rotated_path, "rb+") as dst:
+            size = dst.seek(0, os.SEEK_END)
+            if size:
+                dst.seek(size - 1)
+                if dst.read(1) != b"\n":
+                    dst.write(b"\n")  # Isolate a torn last line
+            with open(self.log_path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+        os.remove(self.log_path)
+    
+    def close(self) -> None:
+        """Close the log file (it is reopened on the next append)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Compactor:
+    """Background thread that compacts a log every `interval_s` once it has `min_records` records."""
+    
+    def __init__(self, compact: Callable[[], None], records: Callable[[], int], interval_s: float, min_records: int):
+        """
+        Args:
+            compact: Runs one compaction
+            records: Returns the number of records in the log
+            interval_s: Seconds between checks
+            min_records: Skip compaction while the log is shorter than this
+        """
+        self._compact = compact
+        self._records = records
+        self.interval_s = interval_s
+        self.min_records = min_records
+        self.compactions = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wal-compactor", daemon=True)
+    
+    def start(self) -> None:
+        """Start the background thread."""
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the background thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            if self._records() >= self.min_records:
+                try:
+                    self._compact()
+                    self.compactions += 1
+                except OSError:
+                    pass  # Keep logging; the next round retries
@@ -0,0 +1,190 @@
+"""
+Write-behind persistence queue.
+Request handlers apply a write to memory and enqueue its persistence; a
+background thread writes queued items in batches, so handlers never wait
+on disk (or on the queue: a full queue rejects the write, see `put`).
+
+In production, Firestore writes are already asynchronous to the caller's
+request path and batched by the client library.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindFull(Exception):
+    """Raised by `WriteBehindQueue.put` when the queue is full; the write was not queued."""
+
+
+class _Marker:
+    """Queue entry that is not a write: a flush request or the stop signal."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WriteBehindQueue(Generic[T]):
+    """
+    Bounded queue of pending writes, flushed in batches by a background thread.
+    
+    A batch is written once it has `batch_size` items or its oldest item
+    has waited `max_age_s`, whichever comes first. Items are flushed in
+    the order they were put.
+    
+    - Backpressure: when `max_size` items are pending, `put` raises
+      `WriteBehindFull` instead of waiting, so memory stays bounded under
+      write bursts and a handler on the event loop never blocks (the API
+      answers 503, see `api.routes`).
+    - A batch whose flush raises is logged and dropped; later batches
+      still flush.
+    - While the queue is not running (before `start`, after `stop`),
+      `put` writes the item synchronously instead.
+    - `flush` writes everything queued so far right away (for readers
+      that need to see their own writes); `stop` does the same, then
+      stops the thread.
+    """
+    
+    def __init__(
+        self,
+        flush: Callable[[List[T]], None],
+        max_size: int = 10000,
+        batch_size: int = 500,
+        max_age_s: float = 0.05,
+        name: str = "write-behind"
+    ):
+        """
+        Args:
+            flush: Writes one batch (called from the flusher thread)
+            max_size: Maximum pending items before `put` rejects writes
+            batch_size: Maximum items per flush
+            max_age_s: Maximum time an item waits for its batch to fill
+            name: Flusher thread name
+        """
+        if max_size < 1 or batch_size < 1:
+            raise ValueError("max_size and batch_size must be >= 1")
+        self._write_batch = flush
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.max_age_s = max_age_s
+        self.name = name
+        
+        self._queue: "queue.Queue" = queue.Queue(max_size)
+        self._thread: Optional[threading.Thread] = None
+        self._state_lock = threading.Lock()  # Orders puts against start/stop
+        self._stop: Optional[_Marker] = None
+        
+        self.enqueued = 0  # Items put while running
+        self.flushed = 0  # Items written by the flusher
+        self.batches = 0  # Flush calls
+        self.rejected = 0  # Puts refused because the queue was full
+        self.errors = 0  # Batches whose flush raised
+    
+    @property
+    def running(self) -> bool:
+        """Whether writes are currently deferred to the flusher thread."""
+        return self._thread is not None
+    
+    def start(self) -> None:
+        """Start deferring writes to the flusher thread."""
+        with self._state_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+    
+    def put(self, item: T) -> None:
+        """
+        Queue a write, or write it now if not running.
+        
+        Raises:
+            WriteBehindFull: If `max_size` writes are pending (the item is not queued)
+        """
+        with self._state_lock:
+            if self._thread is None:
+                self._write_batch([item])
+                return
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.rejected += 1
+                raise WriteBehindFull(f"{self.name}: {self.max_size} writes pending") from None
+            self.enqueued += 1
+    
+    def flush(self) -> None:
+        """Write everything queued so far without waiting for its batch to fill."""
+        with self._state_lock:
+            if self._thread is None:
+                return
+            marker = _Marker()
+            self._queue.put(marker)
+        marker.done.wait()
+    
+    def stop(self) -> None:
+        """Flush everything queued, stop the flusher thread and write synchronously from now on."""
+        with self._state_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._stop = _Marker()
+            self._queue.put(self._stop)
+        thread.join()
+    
+    def pending(self) -> int:
+        """Number of items waiting to be flushed."""
+        return self._queue.qsize()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get queue depth and flush counters."""
+        return {
+            "pending": self.pending(),
+            "maxSize": self.max_size,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+    
+    def _run(self) -> None:
+        while True:
+            batch, marker = self._collect()
+            if batch:
+                self._write(batch)
+            if marker is not None:
+                marker.done.set()
+                if marker is self._stop:
+                    return
+    
+    def _collect(self) -> Tuple[List[T], Optional[_Marker]]:
+        """Take the next batch, ended early by a marker (which is returned with it)."""
+        item = self._queue.get()
+        if isinstance(item, _Marker):
+            return [], item
+        
+        batch = [item]
+        deadline = time.monotonic() + self.max_age_s
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if isinstance(item, _Marker):
+                return batch, item
+            batch.append(item)
+        return batch, None
+    
+    def _write(self, batch: List[T]) -> None:
+        self.batches += 1
+        try:
+            self._write_batch(batch)
+            self.flushed += len(batch)
+        except Exception:
+            self.errors += 1  # Keep flushing later batches
+            logger.exception("%s: flush failed, dropped a batch of %d writes", self.name, len(batch))
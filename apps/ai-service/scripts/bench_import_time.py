@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark `python -X importtime` for ai_service.api.routes against a
+STORAGE_FILE of N helpers, to check that importing the app does not
+depend on the data file size.
+
+Reports the cumulative import time of the app and the storage modules
+(from -X importtime) plus the wall time of the whole import. Point
+--root at another checkout (e.g. a `git worktree` of an older commit) to
+compare before and after.
+
+Usage: python scripts/bench_import_time.py [helpers] [--root PATH] [--runs N]
+"""
+
+import argparse
+import sys
+import os
+import json
+import random
+import subprocess
+import tempfile
+import time
+
+# Add parent directory to path to import ai_service
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CENTER_LAT = 37.7749
+CENTER_LNG = -122.4194
+
+MODULES = ("ai_service.api.routes", "ai_service.api.matching", "ai_service.incremental", "ai_service.storage")
+
+
+def write_storage_file(path: str, count: int, rng: random.Random) -> None:
+    """Write a JSON snapshot of `count` helpers spread over the Bay Area."""
+    helpers = {
+        f"helper_{i}": {
+            "id": f"helper_{i}",
+            "lat": CENTER_LAT + rng.uniform(-0.5, 0.5),
+            "lng": CENTER_LNG + rng.uniform(-0.5, 0.5),
+            "rating": round(rng.random(), 2),
+            "available": rng.random() < 0.9,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        for i in range(count)
+    }
+    with open(path, "w") as f:
+        json.dump({"requests": {}, "helpers": helpers}, f, indent=2)
+
+
+def import_times(root: str, storage_file: str) -> dict:
+    """Import the app once in a fresh interpreter; cumulative times (ms) by module plus wall time."""
+    env = dict(os.environ, STORAGE_FILE=storage_file, PYTHONPATH=root)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import ai_service.api.routes"],
+        env=env, cwd=os.path.dirname(storage_file), capture_output=True, text=True, check=True,
+    )
+    times = {"wall": (time.perf_counter() - start) * 1000}
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() in MODULES:
+            times[parts[2].strip()] = int(parts[1]) / 1000
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("helpers", type=int, nargs="?", default=200_000)
+    parser.add_argument("--root", default=ROOT, help="Checkout to import ai_service from")
+    parser.add_argument("--runs", type=int, default=3, help="Imports per file (best is reported)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_file = os.path.join(tmp, "storage.json")
+        write_storage_file(storage_file, args.helpers, random.Random(42))
+        
+        print(f"root: {args.root}")
+        print(f"{'file':>10} {'MB':>7} " + " ".join(f"{m.rsplit('.', 1)[-1]:>10}" for m in MODULES) + f" {'wall':>8}  (ms)")
+        for name, path in (("empty", os.path.join(tmp, "missing.json")), (f"{args.helpers}", storage_file)):
+            size = os.path.getsize(path) / 1e6 if os.path.exists(path) else 0.0
+            runs = [import_times(args.root, path) for _ in range(args.runs)]
+            best = {key: min(run.get(key, 0.0) for run in runs) for key in (*MODULES, "wall")}
+            print(f"{name:>10} {size:>7.1f} " + " ".join(f"{best[m]:>10.1f}" for m in MODULES) + f" {best['wall']:>8.1f}")
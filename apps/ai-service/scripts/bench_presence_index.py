@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark nearby presence lookups as the number of online users grows.
+With the tile index, query latency should stay flat from 1k to 1M users.
+
+Usage: python scripts/bench_presence_index.py [max_users]
+"""
+
+import sys
+import os
+import random
+import time
+
+# Add parent directory to path to import ai_service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_service.geo import lat_lng_to_tile_key, tile_key_to_str
+from ai_service.repo import repo
+
+# Query point (San Francisco) and a fixed crowd of users around it
+CENTER_LAT = 37.7749
+CENTER_LNG = -122.4194
+RADIUS_M = 1000
+LOCAL_USERS = 200
+QUERIES = 200
+
+
+def add_users(start: int, count: int, rng: random.Random, now: int) -> None:
+    """Add users spread over the globe (outside the query area)."""
+    for i in range(start, start + count):
+        lat = rng.uniform(-60.0, 60.0)
+        lng = rng.uniform(-180.0, 180.0)
+        if abs(lat - CENTER_LAT) < 1.0 and abs(lng - CENTER_LNG) < 1.0:
+            lat += 5.0
+        tile_key = lat_lng_to_tile_key(lat, lng)
+        repo.save_user_presence(
+            f"user_{i}", "helper", True, lat, lng, tile_key_to_str(tile_key), now, 0.5, tile_key
+        )
+
+
+def time_queries(now: int) -> float:
+    """Average nearby lookup time in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        covering = repo.get_covering_tiles(CENTER_LAT, CENTER_LNG, RADIUS_M)
+        found = repo.get_active_presence_in_tiles(covering.tiles, now, 15)
+    elapsed = time.perf_counter() - start
+    assert len(found) >= LOCAL_USERS * 0.9
+    return elapsed / QUERIES * 1000
+
+
+if __name__ == "__main__":
+    max_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    now = int(time.time())
+    
+    # Users within ~700 m of the query point
+    for i in range(LOCAL_USERS):
+        lat = CENTER_LAT + rng.uniform(-0.005, 0.005)
+        lng = CENTER_LNG + rng.uniform(-0.005, 0.005)
+        tile_key = lat_lng_to_tile_key(lat, lng)
+        repo.save_user_presence(
+            f"local_{i}", "helper", True, lat, lng, tile_key_to_str(tile_key), now, 0.5, tile_key
+        )
+    
+    print(f"{'users':>10} {'ms/query':>10}")
+    total = 0
+    size = 1000
+    while size <= max_users:
+        add_users(total, size - total, rng, now)
+        total = size
+        print(f"{total:>10} {time_queries(now):>10.3f}")
+        size *= 10
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark helper ranking: scalar heap path vs columnar NumPy path.
+Used to pick VECTOR_RANK_THRESHOLD (the crossover helper count).
+
+Usage: python scripts/bench_rank_helpers.py
+"""
+
+import sys
+import os
+import random
+import time
+
+# Add parent directory to path to import ai_service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_service.config import get_match_weights, get_top_k
+from ai_service.matching import HelperColumns, np, rank_columns, rank_helpers
+
+SIZES = [16, 64, 128, 256, 512, 1024, 4096, 16384]
+
+
+def make_helpers(count: int, rng: random.Random) -> list:
+    """Helpers scattered within ~1 km of the request."""
+    return [
+        {
+            "id": f"helper_{i}",
+            "lat": 37.7749 + rng.uniform(-0.01, 0.01),
+            "lng": -122.4194 + rng.uniform(-0.01, 0.01),
+            "rating": rng.random(),
+            "available": rng.random() < 0.9,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    """Best-of-5 average time per call in microseconds."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+if __name__ == "__main__":
+    if np is None:
+        sys.exit("NumPy is not installed")
+    
+    rng = random.Random(42)
+    req = {
+        "id": "req_bench",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "urgent",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    weights = get_match_weights()
+    top_k = get_top_k()
+    
+    # "snapshot" ranks a prebuilt HelperColumns; "numpy" includes building it
+    print(f"{'helpers':>8} {'scalar us':>10} {'snapshot us':>12} {'numpy us':>10}")
+    for size in SIZES:
+        helpers = make_helpers(size, rng)
+        columns = HelperColumns.from_helpers(helpers)
+        assert rank_helpers(req, helpers, weights, top_k, vector_threshold=0) == \
+            rank_helpers(req, helpers, weights, top_k, vector_threshold=size + 1)
+        
+        repeat = max(5, 20000 // size)
+        scalar = best_of(lambda: rank_helpers(req, helpers, weights, top_k, vector_threshold=size + 1), repeat)
+        snapshot = best_of(lambda: rank_columns(req, columns, weights, top_k), repeat)
+        vector = best_of(lambda: rank_helpers(req, helpers, weights, top_k, vector_threshold=0), repeat)
+        print(f"{size:>8} {scalar:>10.1f} {snapshot:>12.1f} {vector:>10.1f}")
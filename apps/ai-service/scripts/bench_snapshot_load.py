@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark storage cold start: pretty-printed JSON snapshot vs binary snapshot.
+Each load runs in a fresh interpreter that loads STORAGE_FILE
+(storage.init_storage) and then answers one nearby-helpers query.
+
+Usage: python scripts/bench_snapshot_load.py [helpers]
+"""
+
+import sys
+import os
+import json
+import random
+import subprocess
+import tempfile
+import time
+
+# Add parent directory to path to import ai_service
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_service import storage
+from ai_service.config import get_geohash_precision
+from ai_service.geo import get_geohashes_for_points
+from ai_service.snapshot import encode_snapshot
+
+CENTER_LAT = 37.7749
+CENTER_LNG = -122.4194
+
+# Runs in the child interpreter; prints import (load) and first-query times
+CHILD = """
+import time
+from ai_service import storage
+start = time.perf_counter()
+storage.init_storage()
+loaded = time.perf_counter()
+found = storage.get_helpers_near({lat}, {lng}, limit=20)
+queried = time.perf_counter()
+print(loaded - start, queried - loaded, len(found))
+"""
+
+
+def make_helpers(count: int, rng: random.Random) -> list:
+    """Helpers spread over the Bay Area, with geohashes as storage writes them."""
+    lats = [CENTER_LAT + rng.uniform(-0.5, 0.5) for _ in range(count)]
+    lngs = [CENTER_LNG + rng.uniform(-0.5, 0.5) for _ in range(count)]
+    cells = get_geohashes_for_points(lats, lngs, get_geohash_precision())
+    return [
+        {
+            "id": f"helper_{i}",
+            "lat": lat,
+            "lng": lng,
+            "rating": round(rng.random(), 2),
+            "available": rng.random() < 0.9,
+            "updatedAt": "2024-01-01T00:00:00Z",
+            "geohash": cell,
+        }
+        for i, (lat, lng, cell) in enumerate(zip(lats, lngs, cells))
+    ]
+
+
+def cold_start(path: str) -> tuple:
+    """Load times (s) in a fresh interpreter: (load, first query, results)."""
+    env = dict(os.environ, STORAGE_FILE=path, PYTHONPATH=ROOT)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(lat=CENTER_LAT, lng=CENTER_LNG)],
+        env=env, cwd=os.path.dirname(path), capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(out[0]), float(out[1]), int(out[2])
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        helpers = make_helpers(count, rng)
+        print(f"generated {count} helpers in {time.perf_counter() - start:.1f}s")
+
+        json_path = os.path.join(tmp, "storage.json")
+        with open(json_path, "w") as f:
+            json.dump({"requests": {}, "helpers": {h["id"]: h for h in helpers}}, f, indent=2)
+
+        binary_path = os.path.join(tmp, "storage.bin")
+        with open(binary_path, "wb") as f:
+            f.write(encode_snapshot({
+                "requests": ([], storage._REQUEST_COLUMNS),
+                "helpers": (helpers, storage._HELPER_COLUMNS),
+            }))
+        del helpers
+
+        print(f"{'format':>8} {'MB':>8} {'load s':>8} {'query ms':>9} {'found':>6}")
+        for name, path in (("empty", os.path.join(tmp, "missing.json")), ("json", json_path), ("binary", binary_path)):
+            size = os.path.getsize(path) / 1e6 if os.path.exists(path) else 0.0
+            load_s, query_s, found = cold_start(path)
+            print(f"{name:>8} {size:>8.1f} {load_s:>8.2f} {query_s * 1000:>9.2f} {found:>6}")
@@ -14,7 +14,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ai_service.models import Venue, VenueStock
 from ai_service.repo import repo
 from ai_service.geo import lat_lng_to_tile
-from ai_service.config import get_tile_size_m
+from ai_service.config import get_tile_grid, get_tile_size_m
 
 # Sample venues in San Francisco area
 test_venues = [
@@ -53,9 +53,10 @@ if __name__ == "__main__":
     
     now = int(time.time())
     tile_size = get_tile_size_m()
+    tile_grid = get_tile_grid()
     
     for venue_data in test_venues:
-        geo = lat_lng_to_tile(venue_data["lat"], venue_data["lng"], tile_size)
+        geo = lat_lng_to_tile(venue_data["lat"], venue_data["lng"], tile_size, tile_grid)
         
         venue = Venue(
             id=venue_data["id"],
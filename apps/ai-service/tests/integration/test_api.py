@@ -17,6 +17,52 @@ def test_health_endpoint():
     assert response.json() == {"status": "ok"}
 
 
+@pytest.fixture
+def quiet_lifespan(monkeypatch):
+    """Stub the lifespan's background persistence; returns the storage module."""
+    from ai_service import storage
+    from ai_service.repo import repo
+    
+    for name in ("start_write_behind", "stop_write_behind", "start_compactor", "stop_compactor"):
+        monkeypatch.setattr(storage, name, lambda: None)
+    monkeypatch.setattr(repo, "start_write_behind", lambda: None)
+    monkeypatch.setattr(repo, "stop_write_behind", lambda: None)
+    return storage
+
+
+def test_lifespan_loads_storage_before_serving(quiet_lifespan, monkeypatch):
+    """Test startup loads the stores off the event loop before the first request."""
+    import asyncio
+    
+    loads = []
+    
+    def load():
+        try:
+            asyncio.get_running_loop()
+            loads.append("event loop")
+        except RuntimeError:
+            loads.append("worker thread")
+    
+    monkeypatch.setattr(quiet_lifespan, "init_storage", load)
+    
+    with TestClient(app) as started:
+        assert loads == ["worker thread"]
+        assert started.get("/health").status_code == 200
+
+
+def test_lifespan_logs_failed_load(quiet_lifespan, monkeypatch, caplog):
+    """Test a failed storage load is logged and aborts startup."""
+    def fail():
+        raise OSError("snapshot unreadable")
+    
+    monkeypatch.setattr(quiet_lifespan, "init_storage", fail)
+    
+    with pytest.raises(OSError):
+        with TestClient(app):
+            pass
+    assert "Loading storage failed" in caplog.text
+
+
 def test_classify_urgent():
     """Test classification of urgent message."""
     response = client.post(
@@ -70,3 +116,343 @@ def test_classify_invalid_request():
     response = client.post("/classify", json={})
     assert response.status_code == 422  # Validation error
 
+
+@pytest.fixture
+def match_client(tmp_path, monkeypatch):
+    """Client with auth bypassed and empty, file-isolated match storage."""
+    from ai_service import storage
+    from ai_service.api import matching as matching_api
+    from ai_service.auth0_verify import verify_auth0_token
+    from ai_service.incremental import IncrementalMatcher
+    from ai_service.match_cache import MatchCache
+    from ai_service.pubsub import tile_broker
+    
+    monkeypatch.setattr(storage, "STORAGE_FILE", str(tmp_path / "storage.json"))
+    monkeypatch.setattr(storage, "_requests_store", {})
+    monkeypatch.setattr(storage, "_helpers_store", {})
+    monkeypatch.setattr(storage, "_helpers_by_geohash", {})
+    monkeypatch.setattr(storage, "_helpers_by_product", {})
+    monkeypatch.setattr(storage, "_match_attempts", [])
+    matcher = IncrementalMatcher()
+    matcher.add_cell_listener(tile_broker.publish)
+    monkeypatch.setattr(matching_api, "incremental_matcher", matcher)
+    monkeypatch.setattr(matching_api, "_match_cache", MatchCache())
+    monkeypatch.setattr(storage, "_helper_listeners", [matcher.update_helper])
+    monkeypatch.setattr(storage, "_request_listeners", [matcher.track_request])
+    app.dependency_overrides[verify_auth0_token] = lambda: {"sub": "test"}
+    
+    for i in range(30):
+        storage.create_helper({
+            "id": f"helper_{i}",
+            "lat": 37.7749 + i * 0.0004,
+            "lng": -122.4194,
+            "rating": 0.5 + (i % 5) * 0.1,
+            "available": True,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        })
+    for request_id, lat in [("req_a", 37.7749), ("req_b", 37.7752), ("req_c", 37.7800)]:
+        storage.create_request({
+            "id": request_id,
+            "lat": lat,
+            "lng": -122.4194,
+            "urgency": "normal",
+            "productNeed": "pad",
+            "createdAt": "2024-01-01T00:00:00Z",
+        })
+    
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("pruning", ["true", "false"])
+def test_match_batch_matches_single_calls(match_client, monkeypatch, pruning):
+    """Test /match/batch returns per-request /match results in request order."""
+    monkeypatch.setenv("MATCH_PRUNING", pruning)
+    request_ids = ["req_c", "missing", "req_a", "req_b", "req_a"]
+    
+    response = match_client.post("/match/batch", json={"requestIds": request_ids})
+    
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["requestId"] for r in results] == request_ids
+    assert [r["found"] for r in results] == [True, False, True, True, True]
+    for result in results:
+        if result["found"]:
+            single = match_client.post("/match", json={"requestId": result["requestId"]})
+            assert result["candidates"] == single.json()["candidates"]
+            assert result["candidates"]
+
+
+@pytest.mark.parametrize("pruning", ["true", "false"])
+def test_match_reaches_helpers_past_adjacent_cells(match_client, monkeypatch, pruning):
+    """Test /match and /match/batch find a helper outside the 3x3 cells but within the max radius."""
+    from ai_service import storage
+    
+    monkeypatch.setenv("MATCH_PRUNING", pruning)
+    storage.create_helper({
+        "id": "far_helper",
+        "lat": 40.7248,  # ~1.3 km north of req_ny
+        "lng": -74.0060,
+        "rating": 0.8,
+        "available": True,
+        "updatedAt": "2024-01-01T00:00:00Z",
+    })
+    storage.create_request({
+        "id": "req_ny",
+        "lat": 40.7128,
+        "lng": -74.0060,
+        "urgency": "normal",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    })
+    
+    single = match_client.post("/match", json={"requestId": "req_ny"}).json()["candidates"]
+    batch = match_client.post("/match/batch", json={"requestIds": ["req_ny"]}).json()["results"]
+    
+    assert [c["helperId"] for c in single] == ["far_helper"]
+    assert batch[0]["candidates"] == single
+
+
+def test_match_batch_assign_mode_never_shares_helpers(match_client):
+    """Test assign mode proposes each helper to at most one request."""
+    request_ids = ["req_a", "req_b", "missing", "req_c"]
+    
+    response = match_client.post("/match/batch", json={"requestIds": request_ids, "mode": "assign"})
+    
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["requestId"] for r in results] == request_ids
+    assert [r["found"] for r in results] == [True, True, False, True]
+    assigned = [c["helperId"] for r in results for c in r["candidates"]]
+    assert len(assigned) == 3
+    assert len(set(assigned)) == 3
+
+
+def test_match_batch_assign_mode_covers_assign_radius(match_client):
+    """Test assign mode considers helpers past the adjacent cells but within ASSIGN_RADIUS_M."""
+    from ai_service import storage
+    
+    storage.create_helper({
+        "id": "far_helper",
+        "lat": 40.7210,  # ~910 m north of req_ny, two cells up
+        "lng": -74.0060,
+        "rating": 0.8,
+        "available": True,
+        "updatedAt": "2024-01-01T00:00:00Z",
+    })
+    storage.create_request({
+        "id": "req_ny",
+        "lat": 40.7128,
+        "lng": -74.0060,
+        "urgency": "normal",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    })
+    
+    response = match_client.post("/match/batch", json={"requestIds": ["req_ny"], "mode": "assign"})
+    
+    assert response.status_code == 200
+    assert [c["helperId"] for c in response.json()["results"][0]["candidates"]] == ["far_helper"]
+
+
+def test_match_batch_assign_mode_caps_edges_per_request(match_client, monkeypatch):
+    """Test ASSIGN_MAX_EDGES_PER_REQUEST bounds the assignment graph."""
+    request_ids = ["req_a", "req_b"]
+    
+    def assigned(max_edges):
+        monkeypatch.setenv("ASSIGN_MAX_EDGES_PER_REQUEST", max_edges)
+        response = match_client.post("/match/batch", json={"requestIds": request_ids, "mode": "assign"})
+        return [c["helperId"] for r in response.json()["results"] for c in r["candidates"]]
+    
+    assert len(assigned("0")) == 2
+    # Keeping one edge each, both requests only reach the same best helper
+    assert len(assigned("1")) == 1
+
+
+def test_match_candidates_follow_helper_updates(match_client):
+    """Test incremental candidates equal /match results, including after a helper update."""
+    from ai_service import storage
+    
+    def both(request_id):
+        incremental = match_client.get(f"/match/{request_id}/candidates")
+        full = match_client.post("/match", json={"requestId": request_id})
+        assert incremental.status_code == 200
+        return incremental.json()["candidates"], full.json()["candidates"]
+    
+    incremental, full = both("req_a")
+    assert incremental == full
+    
+    best = full[0]["helperId"]
+    helper = next(dict(h) for h in storage.list_helpers() if h["id"] == best)
+    helper["available"] = False
+    storage.create_helper(helper)
+    
+    incremental, full = both("req_a")
+    assert incremental == full
+    assert best not in [c["helperId"] for c in incremental]
+    
+    assert match_client.get("/match/missing/candidates").status_code == 404
+
+
+def test_match_candidates_reach_helpers_past_adjacent_cells(match_client):
+    """Test incremental candidates search the same rings as /match, beyond the 3x3 cells."""
+    from ai_service import storage
+    
+    storage.create_request({
+        "id": "req_ny",
+        "lat": 40.7128,
+        "lng": -74.0060,
+        "urgency": "normal",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    })
+    storage.create_helper({
+        "id": "far_helper",
+        "lat": 40.7248,  # ~1.3 km north of req_ny
+        "lng": -74.0060,
+        "rating": 0.8,
+        "available": True,
+        "updatedAt": "2024-01-01T00:00:00Z",
+    })
+    
+    incremental = match_client.get("/match/req_ny/candidates").json()["candidates"]
+    full = match_client.post("/match", json={"requestId": "req_ny"}).json()["candidates"]
+    
+    assert [c["helperId"] for c in full] == ["far_helper"]
+    assert incremental == full
+
+
+def test_match_cache_serves_polls_until_cells_change(match_client):
+    """Test repeated /match polls hit the cache until a visited cell changes."""
+    from ai_service import storage
+    from ai_service.config import get_geohash_precision, get_match_weights, get_top_k
+    from ai_service.geo import get_geohash_for_point
+    from ai_service.matching import product_mask, rank_helpers_bounded
+    
+    def poll():
+        response = match_client.post("/match", json={"requestId": "req_a"})
+        assert response.status_code == 200
+        return response.json()["candidates"]
+    
+    def stats():
+        return match_client.get("/match/cache/stats").json()
+    
+    first = poll()
+    assert poll() == first
+    assert (stats()["hits"], stats()["misses"]) == (1, 1)
+    
+    # A write in New York leaves the cached San Francisco result current
+    storage.create_helper({
+        "id": "far", "lat": 40.7128, "lng": -74.0060, "rating": 1.0,
+        "available": True, "updatedAt": "2024-01-01T00:00:00Z",
+    })
+    assert poll() == first
+    assert stats()["hits"] == 2
+    
+    # So does one within the search radius but in a cell the pruned search never visited
+    pruned = {"id": "pruned", "lat": 37.7749, "lng": -122.4364, "rating": 1.0}  # ~1.5 km west
+    visited = []
+    cells = storage.iter_helper_cells(37.7749, -122.4194, need=product_mask("pad"), visited=visited)
+    rank_helpers_bounded(storage.get_request("req_a"), cells, get_match_weights(), get_top_k())
+    pruned_cell = get_geohash_for_point(pruned["lat"], pruned["lng"], get_geohash_precision())
+    assert pruned_cell in storage.helper_search_cells(visited[0])
+    assert pruned_cell not in visited
+    storage.create_helper({**pruned, "available": True, "updatedAt": "2024-01-01T00:00:00Z"})
+    assert poll() == first
+    assert stats()["hits"] == 3
+    
+    best = next(dict(h) for h in storage.list_helpers() if h["id"] == first[0]["helperId"])
+    best["available"] = False
+    storage.create_helper(best)
+    
+    refreshed = poll()
+    assert best["id"] not in [c["helperId"] for c in refreshed]
+    assert stats()["stale"] == 1
+    assert stats()["hitRate"] == 0.6
+
+
+def test_match_stream_sends_snapshot_then_diff(match_client, monkeypatch):
+    """Test the SSE stream opens with the top K and pushes a diff when it changes."""
+    import json
+    import threading
+    
+    from ai_service import storage
+    
+    monkeypatch.setenv("MATCH_STREAM_MAX_S", "1")
+    monkeypatch.setenv("MATCH_STREAM_HEARTBEAT_S", "0.5")
+    newcomer = {
+        "id": "newcomer", "lat": 37.7749, "lng": -122.4194, "rating": 1.0,
+        "available": True, "updatedAt": "2024-01-01T00:00:00Z",
+    }
+    timer = threading.Timer(0.3, storage.create_helper, args=(newcomer,))
+    timer.start()
+    
+    response = match_client.get("/match/req_a/stream")
+    timer.join()
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.split("\n\n")
+        if block.startswith("event: ")
+    ]
+    assert [name for name, _ in events] == ["snapshot", "diff"]
+    snapshot, diff = events[0][1], events[1][1]
+    assert len(snapshot["candidates"]) == 5
+    assert [c["helperId"] for c in diff["entered"]] == ["newcomer"]
+    assert len(diff["left"]) == 1
+    assert diff["order"][0] == "newcomer"
+    
+    assert match_client.get("/match/missing/stream").status_code == 404
+
+
+def test_inventory_update_filters_match(match_client):
+    """Test helpers without the requested product drop out of /match."""
+    from ai_service import storage
+    
+    storage.create_request({
+        "id": "req_tampon", "lat": 37.7749, "lng": -122.4194, "urgency": "normal",
+        "productNeed": "tampon", "createdAt": "2024-01-01T00:00:00Z",
+    })
+    before = match_client.post("/match", json={"requestId": "req_tampon"}).json()["candidates"]
+    best = before[0]["helperId"]
+    
+    response = match_client.put(f"/match/helpers/{best}/inventory", json={"products": ["pad", "liner"]})
+    
+    assert response.status_code == 200
+    assert response.json() == {"helperId": best, "products": ["pad", "liner"]}
+    after = match_client.post("/match", json={"requestId": "req_tampon"}).json()["candidates"]
+    assert best not in [c["helperId"] for c in after]
+    assert match_client.put("/match/helpers/missing/inventory", json={"products": ["pad"]}).status_code == 404
+    assert match_client.put(f"/match/helpers/{best}/inventory", json={"products": ["cup"]}).status_code == 422
+
+
+def test_write_rejected_with_503_while_write_queue_full(match_client, monkeypatch):
+    """Test a write that the full write-behind queue refuses answers 503 and changes nothing."""
+    import threading
+    import time
+    
+    from ai_service import storage
+    from ai_service.write_behind import WriteBehindQueue
+    
+    gate = threading.Event()
+    writes = WriteBehindQueue(lambda batch: gate.wait(), max_size=1, batch_size=1, max_age_s=0)
+    monkeypatch.setattr(storage, "_write_queue", writes)
+    writes.start()
+    try:
+        # One write is held by the stalled flusher, one fills the queue
+        storage.create_helper(dict(storage._helpers_store["helper_0"]))
+        while writes.pending():
+            time.sleep(0.001)
+        storage.create_helper(dict(storage._helpers_store["helper_1"]))
+        
+        response = match_client.put("/match/helpers/helper_2/inventory", json={"products": ["liner"]})
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert "inventory" not in storage._helpers_store["helper_2"]
+    finally:
+        gate.set()
+        writes.stop()
+    assert writes.rejected == 1
@@ -0,0 +1,165 @@
+"""
+Unit tests for global helper assignment.
+Tests optimality against brute force, radius pruning, and helper uniqueness.
+"""
+
+import random
+
+import pytest
+
+from ai_service.assignment import _min_cost_assignment, assign_helpers
+from ai_service.matching import rank_helpers
+
+
+WEIGHTS = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+
+
+def _request(request_id: str, lat: float, lng: float, urgency: str = "normal"):
+    return {
+        "id": request_id,
+        "lat": lat,
+        "lng": lng,
+        "urgency": urgency,
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+
+
+def _helper(helper_id: str, lat: float, lng: float, rating: float = 0.8, available: bool = True):
+    return {
+        "id": helper_id,
+        "lat": lat,
+        "lng": lng,
+        "rating": rating,
+        "available": available,
+        "updatedAt": "2024-01-01T00:00:00Z",
+    }
+
+
+def _brute_force_cost(adjacency):
+    """Cheapest assignment with optional rows, by exhaustive search."""
+    best = 0.0
+    
+    def search(row, used, cost):
+        nonlocal best
+        if row == len(adjacency):
+            best = min(best, cost)
+            return
+        search(row + 1, used, cost)
+        for col, edge_cost in adjacency[row]:
+            if col not in used:
+                search(row + 1, used | {col}, cost + edge_cost)
+    
+    search(0, frozenset(), 0.0)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_min_cost_assignment_is_optimal(seed: int):
+    """Test the sparse solver matches brute force on small random graphs."""
+    rng = random.Random(seed)
+    for _ in range(200):
+        n_rows, n_cols = rng.randint(0, 6), rng.randint(0, 6)
+        adjacency = [
+            [(col, rng.choice([-3 * rng.random(), rng.random() - 0.3])) for col in range(n_cols) if rng.random() < 0.6]
+            for _ in range(n_rows)
+        ]
+        
+        match = _min_cost_assignment(adjacency, n_cols)
+        
+        used = [col for col in match if col is not None]
+        assert len(used) == len(set(used))
+        cost = sum(dict(adjacency[row])[col] for row, col in enumerate(match) if col is not None)
+        assert cost == pytest.approx(_brute_force_cost(adjacency))
+
+
+def test_assign_helpers_spreads_top_helper():
+    """Test a shared top helper goes to one request, the other gets the next best."""
+    requests = [_request("req_a", 37.7749, -122.4194), _request("req_b", 37.7750, -122.4194)]
+    helpers = [
+        _helper("star", 37.7749, -122.4194, rating=1.0),
+        _helper("good", 37.7751, -122.4194, rating=0.7),
+    ]
+    
+    # Ranked independently, both requests would get the same top helper
+    assert {rank_helpers(r, helpers, WEIGHTS, 1)[0]["id"] for r in requests} == {"star"}
+    
+    result = assign_helpers(requests, helpers, WEIGHTS, radius_m=500)
+    
+    assigned = {req_id: c["id"] for req_id, c in result.assignments.items()}
+    assert sorted(assigned.values()) == ["good", "star"]
+    assert result.edges == 4
+
+
+def test_assign_helpers_respects_radius_and_availability():
+    """Test out-of-radius and unavailable helpers are never assigned."""
+    requests = [_request("req_a", 37.7749, -122.4194), _request("req_far", 40.7128, -74.0060)]
+    helpers = [
+        _helper("near", 37.7755, -122.4194),
+        _helper("busy", 37.7749, -122.4194, available=False),
+        _helper("too_far", 37.7900, -122.4194),
+    ]
+    
+    result = assign_helpers(requests, helpers, WEIGHTS, radius_m=500)
+    
+    assert result.assignments["req_a"]["id"] == "near"
+    assert result.assignments["req_far"] is None
+    assert result.edges == 1
+
+
+def test_assign_helpers_caps_edges_per_request():
+    """Test max_edges_per_request keeps only each request's best-scoring edges."""
+    requests = [_request("req_a", 37.7749, -122.4194), _request("req_b", 37.7760, -122.4194)]
+    helpers = [
+        _helper("star", 37.7749, -122.4194, rating=1.0),
+        _helper("good", 37.7752, -122.4194, rating=0.7),
+        _helper("weak", 37.7757, -122.4194, rating=0.1),
+    ]
+    
+    result = assign_helpers(requests, helpers, WEIGHTS, radius_m=500, max_edges_per_request=1)
+    
+    # Both requests keep only their edge to "star", so one goes unassigned
+    assert result.edges == 2
+    assigned = [c["id"] for c in result.assignments.values() if c]
+    assert assigned == ["star"]
+
+
+@pytest.mark.parametrize("precision", ["5", "7"])
+def test_assign_helpers_buckets_at_configured_precision(monkeypatch, precision):
+    """Test the graph finds the same edges at a non-default GEOHASH_PRECISION."""
+    monkeypatch.setenv("GEOHASH_PRECISION", precision)
+    requests = [_request("req_a", 37.7749, -122.4194)]
+    helpers = [_helper(f"helper_{i}", 37.7749 + i * 0.0015, -122.4194) for i in range(6)]
+    
+    result = assign_helpers(requests, helpers, WEIGHTS, radius_m=500)
+    
+    assert result.edges == 3  # Helpers 0-2 lie within 500 m
+    assert result.assignments["req_a"]["id"] == "helper_0"
+
+
+def test_assign_helpers_total_beats_greedy():
+    """Test the global assignment scores at least as well as greedy first-come offers."""
+    rng = random.Random(3)
+    requests = [
+        _request(f"req_{i}", 37.7749 + rng.uniform(-0.005, 0.005), -122.4194 + rng.uniform(-0.005, 0.005))
+        for i in range(60)
+    ]
+    helpers = [
+        _helper(f"helper_{i}", 37.7749 + rng.uniform(-0.005, 0.005), -122.4194 + rng.uniform(-0.005, 0.005), rng.random())
+        for i in range(40)
+    ]
+    
+    result = assign_helpers(requests, helpers, WEIGHTS, radius_m=800)
+    
+    taken = set()
+    greedy_total = 0.0
+    for req in requests:
+        for candidate in rank_helpers(req, helpers, WEIGHTS, len(helpers)):
+            if candidate["id"] not in taken and candidate["distM"] <= 800:
+                taken.add(candidate["id"])
+                greedy_total += candidate["score"]
+                break
+    
+    assigned = [c["id"] for c in result.assignments.values() if c]
+    assert len(assigned) == len(set(assigned)) == 40
+    assert result.total_score >= greedy_total - 1e-3
@@ -3,14 +3,44 @@ Unit tests for geolocation utilities.
 Tests Haversine distance calculation and proximity band mapping.
 """
 
+import math
+import random
+
 import pytest
 
+from ai_service import geo
 from ai_service.geo import (
+    FastDistance,
+    RadiusFilter,
+    cover_circle,
+    decode_geohash,
+    geohash_bounds,
+    geohash_neighbors,
+    geohash_ring,
+    get_geohash_for_point,
+    get_geohashes_for_points,
+    haversine_many,
     haversine_meters,
+    haversine_pairwise,
     proximity_band,
+    proximity_band_from_squared,
     proximity_band_score,
     lat_lng_to_tile,
+    lat_lng_to_tile_key,
+    get_tile_neighbor_keys,
     get_tile_neighbors,
+    lat_lng_to_quad_cell,
+    pack_quad_cell,
+    pack_tile_key,
+    parse_tile,
+    quad_cell_bounds,
+    quad_cell_children,
+    quad_cell_parent,
+    quad_cell_to_quadkey,
+    quadkey_to_quad_cell,
+    tile_key_bounds,
+    tile_key_to_str,
+    unpack_tile_key,
 )
 
 
@@ -45,6 +75,61 @@ def test_haversine_meters_close_points():
     assert 100 < distance < 120
 
 
+@pytest.fixture(params=["numpy", "python"])
+def geo_backend(request, monkeypatch):
+    """Run a test against both the NumPy kernels and the pure-Python fallback."""
+    if request.param == "python":
+        monkeypatch.setattr(geo, "np", None)
+    elif geo.np is None:
+        pytest.skip("NumPy not installed")
+    return request.param
+
+
+_PARITY_POINTS = [
+    (37.7749, -122.4194),
+    (37.7750, -122.4194),
+    (37.8044, -122.2711),
+    (40.7128, -74.0060),
+    (-33.8688, 151.2093),
+    (0.0, 179.9999),
+    (0.0, -179.9999),
+]
+
+
+def test_haversine_many_matches_scalar(geo_backend):
+    """Test many-to-one kernel parity with the scalar function."""
+    lat, lng = 37.7749, -122.4194
+    lats = [p[0] for p in _PARITY_POINTS]
+    lngs = [p[1] for p in _PARITY_POINTS]
+    
+    distances = haversine_many(lat, lng, lats, lngs)
+    
+    assert len(distances) == len(_PARITY_POINTS)
+    for dist, (p_lat, p_lng) in zip(distances, _PARITY_POINTS):
+        assert dist == pytest.approx(haversine_meters(lat, lng, p_lat, p_lng), rel=1e-9, abs=1e-6)
+
+
+def test_haversine_many_empty(geo_backend):
+    """Test many-to-one kernel with no points."""
+    assert len(haversine_many(37.7749, -122.4194, [], [])) == 0
+
+
+def test_haversine_pairwise_matches_scalar(geo_backend):
+    """Test many-to-many kernel parity with the scalar function."""
+    origins = _PARITY_POINTS[:3]
+    lats = [p[0] for p in _PARITY_POINTS]
+    lngs = [p[1] for p in _PARITY_POINTS]
+    
+    matrix = haversine_pairwise([o[0] for o in origins], [o[1] for o in origins], lats, lngs)
+    
+    assert len(matrix) == len(origins)
+    for i, (o_lat, o_lng) in enumerate(origins):
+        assert len(matrix[i]) == len(_PARITY_POINTS)
+        for j, (p_lat, p_lng) in enumerate(_PARITY_POINTS):
+            expected = haversine_meters(o_lat, o_lng, p_lat, p_lng)
+            assert matrix[i][j] == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+
 @pytest.mark.parametrize("distance_m,expected_band", [
     (50, "0-100"),
     (100, "0-100"),
@@ -61,6 +146,98 @@ def test_proximity_band_mapping(distance_m: float, expected_band: str):
     assert proximity_band(distance_m) == expected_band
 
 
+@pytest.mark.parametrize("distance_m,expected_band", [
+    (50, "0-100"),
+    (100, "0-100"),
+    (250, "100-250"),
+    (500, "250-500"),
+    (1000, "500-1000"),
+    (1000.01, ">1000"),
+])
+def test_proximity_band_from_squared(distance_m: float, expected_band: str):
+    """Test squared-distance banding matches the linear bands."""
+    assert proximity_band_from_squared(distance_m ** 2) == expected_band
+
+
+def test_fast_distance_error_under_a_meter():
+    """Test equirectangular error stays well under a meter within 1.5km."""
+    lat, lng = 37.7749, -122.4194
+    fast = FastDistance(lat, lng, max_radius_m=2000)
+    
+    for dlat, dlng in [(0.001, 0), (0, 0.001), (0.009, 0.009), (-0.01, 0.012), (0.0005, -0.0003)]:
+        exact = haversine_meters(lat, lng, lat + dlat, lng + dlng)
+        assert abs(fast.meters(lat + dlat, lng + dlng) - exact) < 0.5
+
+
+def test_fast_distance_falls_back_to_haversine():
+    """Test points beyond the fast radius use exact haversine."""
+    lat, lng = 37.7749, -122.4194
+    fast = FastDistance(lat, lng, max_radius_m=2000)
+    
+    exact = haversine_meters(lat, lng, 40.7128, -74.0060)
+    assert fast.meters(40.7128, -74.0060) == pytest.approx(exact)
+    assert fast.proximity_band(40.7128, -74.0060) == ">1000"
+    assert fast.within(lat + 0.001, lng, 120)
+    assert not fast.within(lat + 0.001, lng, 100)
+
+
+def test_fast_distance_many_matches_scalar(geo_backend):
+    """Test batch squared distances match the scalar method (incl. fallback)."""
+    lat, lng = 37.7749, -122.4194
+    fast = FastDistance(lat, lng, max_radius_m=2000)
+    lats = [p[0] for p in _PARITY_POINTS]
+    lngs = [p[1] for p in _PARITY_POINTS]
+    
+    batch = fast.squared_meters_many(lats, lngs)
+    
+    for d_sq, (p_lat, p_lng) in zip(batch, _PARITY_POINTS):
+        assert d_sq == pytest.approx(fast.squared_meters(p_lat, p_lng), rel=1e-9)
+
+
+@pytest.mark.parametrize("center", [(37.7749, -122.4194), (64.0, 179.99), (-89.995, 10.0)])
+@pytest.mark.parametrize("use_fast", [False, True])
+def test_radius_filter_matches_exact_filter(geo_backend, center, use_fast):
+    """Test the box prefilter never drops a point inside the radius."""
+    lat, lng = center
+    rng = random.Random(11)
+    lats = [max(-90.0, min(90.0, lat + rng.uniform(-0.02, 0.02))) for _ in range(500)]
+    lngs = [(lng + rng.uniform(-0.05, 0.05) + 180) % 360 - 180 for _ in range(500)]
+    fast = FastDistance(lat, lng) if use_fast else None
+    radius_filter = RadiusFilter(lat, lng, 800, fast)
+    
+    result = radius_filter.filter(lats, lngs)
+    
+    expected = [i for i in range(500) if radius_filter.distance(lats[i], lngs[i]) <= radius_filter.limit]
+    assert result.indices == expected
+    assert result.stats.candidates == 500
+    assert result.stats.accepted == len(expected)
+    assert result.stats.bbox_rejected + result.stats.radius_rejected == 500 - len(expected)
+
+
+def test_radius_filter_rejects_ring_corners_before_trig(geo_backend):
+    """Test most square-ring candidates are rejected by the box stage."""
+    lat, lng = 37.7749, -122.4194
+    d = 0.02
+    lats = [lat + d * (i / 10 - 1) for i in range(21) for _ in range(21)]
+    lngs = [lng + d * (j / 10 - 1) for _ in range(21) for j in range(21)]
+    
+    result = RadiusFilter(lat, lng, 500).filter(lats, lngs)
+    
+    assert result.stats.bbox_rejected > result.stats.radius_rejected
+    assert result.stats.bbox_rejected + result.stats.radius_rejected + result.stats.accepted == 441
+
+
+def test_radius_filter_trusted_candidates(geo_backend):
+    """Test trusted candidates skip the reject stages but get distances."""
+    radius_filter = RadiusFilter(37.7749, -122.4194, 100)
+    
+    result = radius_filter.filter([37.79, 37.79], [-122.4194, -122.4194], trusted=1)
+    
+    assert result.indices == [0]
+    assert result.distances[0] == pytest.approx(haversine_meters(37.7749, -122.4194, 37.79, -122.4194))
+    assert result.stats.bbox_rejected == 1
+
+
 def test_proximity_band_score():
     """Test proximity band score mapping."""
     assert proximity_band_score("0-100") == 1.0
@@ -114,3 +291,219 @@ def test_get_tile_neighbors_invalid():
     neighbors = get_tile_neighbors("invalid", radius_m=400)
     assert neighbors == ["invalid"]  # Should return as-is
 
+
+def test_get_geohash_for_point_known_values():
+    """Test geohash encoding against well-known reference hashes."""
+    assert get_geohash_for_point(37.7749, -122.4194, precision=7) == "9q8yyk8"
+    assert get_geohash_for_point(42.6, -5.6, precision=5) == "ezs42"
+
+
+def test_decode_geohash_roundtrip():
+    """Test that decoding returns a point inside the encoded cell."""
+    lat, lng = 37.7749, -122.4194
+    geohash = get_geohash_for_point(lat, lng, precision=7)
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+    
+    assert min_lat <= lat <= max_lat
+    assert min_lng <= lng <= max_lng
+    center_lat, center_lng = decode_geohash(geohash)
+    assert get_geohash_for_point(center_lat, center_lng, precision=7) == geohash
+
+
+def test_geohash_neighbors():
+    """Test 8-neighbor expansion against known neighbors of 'dqcjq'."""
+    neighbors = geohash_neighbors("dqcjq")
+    
+    assert neighbors[0] == "dqcjq"
+    assert set(neighbors) == {
+        "dqcjq", "dqcjw", "dqcjx", "dqcjr", "dqcjp",
+        "dqcjn", "dqcjj", "dqcjm", "dqcjt",
+    }
+
+
+def test_geohash_ring_sizes():
+    """Test ring expansion returns 8k cells per ring away from the poles."""
+    assert geohash_ring("9q8yyk8", 0) == ["9q8yyk8"]
+    assert len(geohash_ring("9q8yyk8", 1)) == 8
+    assert len(geohash_ring("9q8yyk8", 2)) == 16
+    assert len(geohash_neighbors("9q8yyk8", rings=2)) == 25
+
+
+def test_geohash_ring_wraps_antimeridian():
+    """Test that neighbors wrap across the antimeridian."""
+    east = get_geohash_for_point(0.1, 179.99, precision=5)
+    west = get_geohash_for_point(0.1, -179.99, precision=5)
+    assert west in geohash_neighbors(east)
+
+
+def test_get_geohashes_for_points_matches_scalar(geo_backend):
+    """Test that batch encoding matches the scalar encoder (NumPy and fallback)."""
+    lats = [37.7749, 42.6, -33.8688, 0.0, 89.9999, -90.0]
+    lngs = [-122.4194, -5.6, 151.2093, 0.0, 180.0, -180.0]
+    
+    batch = get_geohashes_for_points(lats, lngs, precision=8)
+    expected = [get_geohash_for_point(lat, lng, precision=8) for lat, lng in zip(lats, lngs)]
+    assert batch == expected
+
+
+@pytest.mark.parametrize("tile_lat,tile_lng", [
+    (1234, 5678),
+    (21025, -53858),
+    (-45000, 90000),
+    (-1, -1),
+    (0, 0),
+])
+def test_tile_key_roundtrip(tile_lat: int, tile_lng: int):
+    """Test packed tile keys round-trip through ints and strings."""
+    key = pack_tile_key(tile_lat, tile_lng)
+    
+    assert -(1 << 63) <= key < (1 << 63)  # Fits in int64
+    assert unpack_tile_key(key) == (tile_lat, tile_lng)
+    assert tile_key_to_str(key) == f"tile_{tile_lat}_{tile_lng}"
+    assert parse_tile(tile_key_to_str(key)) == key
+
+
+def test_parse_tile_invalid():
+    """Test that non-tile strings do not parse."""
+    assert parse_tile("invalid") is None
+    assert parse_tile("tile_1_2_3") is None
+    assert parse_tile("tile_a_b") is None
+
+
+def test_lat_lng_to_tile_key_matches_string():
+    """Test that the int key and the string id describe the same tile."""
+    lat, lng = 37.7749, -122.4194
+    key = lat_lng_to_tile_key(lat, lng, tile_size_m=200)
+    assert tile_key_to_str(key) == lat_lng_to_tile(lat, lng, tile_size_m=200)
+
+
+def test_get_tile_neighbor_keys_matches_strings():
+    """Test that int neighbor generation matches the string wrapper."""
+    key = pack_tile_key(1234, -1)
+    keys = get_tile_neighbor_keys(key, radius_m=400)
+    
+    assert key in keys
+    assert [tile_key_to_str(k) for k in keys] == get_tile_neighbors("tile_1234_-1", radius_m=400)
+
+
+@pytest.mark.parametrize("grid", ["legacy", "banded"])
+@pytest.mark.parametrize("lat,lng,radius_m,tile_size_m", [
+    (37.7749, -122.4194, 400, 200),
+    (37.7749, -122.4194, 1000, 200),
+    (0.0005, 0.0005, 600, 200),
+    (-33.8688, 151.2093, 1000, 350),
+    (60.1699, 24.9384, 800, 100),
+    (0.0, 179.999, 500, 200),
+])
+def test_cover_circle_contains_all_points_in_radius(lat, lng, radius_m, tile_size_m, grid):
+    """Test the covering includes the tile of every point within the radius."""
+    covering = cover_circle(lat, lng, radius_m, tile_size_m, grid)
+    deg_lat = radius_m / 111000.0
+    deg_lng = deg_lat / math.cos(math.radians(lat))
+    
+    steps = 40
+    for i in range(steps + 1):
+        for j in range(steps + 1):
+            p_lat = lat - deg_lat + 2 * deg_lat * i / steps
+            p_lng = lng - deg_lng + 2 * deg_lng * j / steps
+            if grid == "legacy" and abs(p_lng) > 180:
+                continue  # Legacy grid does not wrap at the antimeridian
+            dist = haversine_meters(lat, lng, p_lat, p_lng)
+            key = lat_lng_to_tile_key(p_lat, (p_lng + 180) % 360 - 180, tile_size_m, grid)
+            if dist <= radius_m:
+                assert key in covering.tiles
+            if key in covering.inside:
+                assert dist <= radius_m
+
+
+def test_cover_circle_classifies_tiles():
+    """Test inside/edge split and that inside tile boxes lie within the radius."""
+    lat, lng = 10.0, 2.0
+    covering = cover_circle(lat, lng, 1000, 200)
+    
+    assert covering.inside
+    assert covering.edge
+    assert covering.tiles == covering.inside | covering.edge
+    assert not covering.inside & covering.edge
+    for key in covering.inside:
+        min_lat, min_lng, max_lat, max_lng = tile_key_bounds(key, 200)
+        for corner in [(min_lat, min_lng), (min_lat, max_lng), (max_lat, min_lng), (max_lat, max_lng)]:
+            assert haversine_meters(lat, lng, *corner) <= 1000
+
+
+def test_cover_circle_drops_square_corners():
+    """Test the covering is smaller than the full square of neighbor tiles."""
+    lat, lng = 10.0, 2.0
+    square = get_tile_neighbor_keys(lat_lng_to_tile_key(lat, lng, 200), radius_m=1000, tile_size_m=200)
+    covering = cover_circle(lat, lng, 1000, 200)
+    
+    assert len(covering.tiles) < len(square)
+
+
+def test_get_tile_neighbor_keys_respects_tile_size():
+    """Test the neighbor square scales with the configured tile size."""
+    key = pack_tile_key(10, 10)
+    assert len(get_tile_neighbor_keys(key, radius_m=400, tile_size_m=200)) == 25
+    assert len(get_tile_neighbor_keys(key, radius_m=400, tile_size_m=100)) == 81
+    assert len(get_tile_neighbor_keys(key, radius_m=400, tile_size_m=400)) == 9
+
+
+def test_banded_grid_tiles_are_stable():
+    """Test banded tiles are fixed lat/lng rectangles containing their points."""
+    for lat, lng in [(37.7749, -122.4194), (37.7801, -122.4194), (-33.8688, 151.2093), (0.0, -180.0)]:
+        key = lat_lng_to_tile_key(lat, lng, 200, grid="banded")
+        min_lat, min_lng, max_lat, max_lng = tile_key_bounds(key, 200, grid="banded")
+        assert min_lat <= lat < max_lat
+        assert min_lng <= lng < max_lng
+        
+        # Any point inside the rectangle maps to the same tile
+        mid_lat = (min_lat + max_lat) / 2
+        for p_lat in (min_lat + 1e-9, mid_lat, max_lat - 1e-9):
+            for p_lng in (min_lng + 1e-9, max_lng - 1e-9):
+                assert lat_lng_to_tile_key(p_lat, p_lng, 200, grid="banded") == key
+
+
+def test_banded_grid_columns_do_not_drift_with_latitude():
+    """Test points on one meridian inside a band share a column."""
+    tiles = {
+        lat_lng_to_tile_key(lat, -122.4194, 200, grid="banded")
+        for lat in (37.77431, 37.7745, 37.7748, 37.7750)
+    }
+    assert len(tiles) == 1
+
+
+def test_banded_neighbors_include_adjacent_tiles():
+    """Test banded neighbor squares contain tiles of nearby points."""
+    lat, lng = 37.7749, -122.4194
+    key = lat_lng_to_tile_key(lat, lng, 200, grid="banded")
+    neighbors = get_tile_neighbor_keys(key, radius_m=200, tile_size_m=200, grid="banded")
+    
+    assert key in neighbors
+    for dlat, dlng in [(0.0018, 0), (-0.0018, 0), (0, 0.0022), (0.0018, 0.0022)]:
+        assert lat_lng_to_tile_key(lat + dlat, lng + dlng, 200, grid="banded") in neighbors
+
+
+def test_unknown_grid_rejected():
+    """Test unknown grid modes raise ValueError."""
+    with pytest.raises(ValueError):
+        lat_lng_to_tile_key(37.7749, -122.4194, 200, grid="hex")
+
+
+def test_quadkey_matches_reference():
+    """Test quadkey formatting against the Bing Maps reference example."""
+    cell = pack_quad_cell(3, 3, 5)
+    assert quad_cell_to_quadkey(cell) == "213"
+    assert quadkey_to_quad_cell("213") == cell
+
+
+def test_quad_cell_hierarchy():
+    """Test parent/child relations and that cells contain their points."""
+    lat, lng = 37.7749, -122.4194
+    cell = lat_lng_to_quad_cell(lat, lng, 18)
+    min_lat, min_lng, max_lat, max_lng = quad_cell_bounds(cell)
+    
+    assert min_lat <= lat <= max_lat
+    assert min_lng <= lng <= max_lng
+    assert quad_cell_parent(cell) == lat_lng_to_quad_cell(lat, lng, 17)
+    assert cell in quad_cell_children(quad_cell_parent(cell))
+    assert quad_cell_to_quadkey(cell).startswith(quad_cell_to_quadkey(quad_cell_parent(cell)))
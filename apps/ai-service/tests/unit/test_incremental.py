@@ -0,0 +1,216 @@
+"""
+Unit tests for incremental matching.
+Tests that maintained top-K lists match a full re-rank after every change.
+"""
+
+import random
+
+from ai_service.config import get_geohash_precision
+from ai_service.geo import get_geohash_for_point
+from ai_service.incremental import IncrementalMatcher, diff_candidates, presence_to_helper
+from ai_service.matching import rank_helpers
+from ai_service.storage import helper_search_cells
+
+WEIGHTS = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+
+
+def _full_rank(matcher, request, helpers, top_k):
+    """Re-rank from scratch over the helpers in the request's search cells."""
+    precision = get_geohash_precision()
+    cells = set(helper_search_cells(get_geohash_for_point(request["lat"], request["lng"], precision)))
+    nearby = [
+        h for h in helpers.values()
+        if get_geohash_for_point(h["lat"], h["lng"], precision) in cells
+    ]
+    return rank_helpers(request, nearby, WEIGHTS, top_k)
+
+
+def test_incremental_matches_full_rank_after_updates():
+    """Test top K stays equal to a full re-rank through moves and availability changes."""
+    rng = random.Random(7)
+    matcher = IncrementalMatcher(WEIGHTS, top_k=5)
+    requests = [
+        {"id": f"r{i}", "lat": 37.7749 + rng.uniform(-0.01, 0.01),
+         "lng": -122.4194 + rng.uniform(-0.01, 0.01), "urgency": "normal"}
+        for i in range(5)
+    ]
+    helpers = {}
+    for i in range(60):
+        helper = {
+            "id": f"h{i}",
+            "lat": 37.7749 + rng.uniform(-0.02, 0.02),
+            "lng": -122.4194 + rng.uniform(-0.02, 0.02),
+            "rating": rng.choice([0.5, 0.8, 1.0]),
+            "available": rng.random() < 0.8,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        helpers[helper["id"]] = helper
+        matcher.update_helper(helper)
+    for request in requests:
+        matcher.track_request(request)
+    
+    for _ in range(200):
+        helper = dict(helpers[f"h{rng.randrange(60)}"])
+        helper["lat"] += rng.uniform(-0.005, 0.005)
+        helper["lng"] += rng.uniform(-0.005, 0.005)
+        helper["available"] = rng.random() < 0.8
+        helpers[helper["id"]] = helper
+        matcher.update_helper(helper)
+        
+        for request in requests:
+            assert matcher.candidates(request["id"]) == _full_rank(matcher, request, helpers, 5)
+
+
+def test_far_helper_update_leaves_requests_untouched():
+    """Test updates outside every request's search cells do no work."""
+    matcher = IncrementalMatcher(WEIGHTS, top_k=3)
+    matcher.track_request({"id": "r1", "lat": 37.7749, "lng": -122.4194, "urgency": "urgent"})
+    matcher.update_helper({"id": "near", "lat": 37.7750, "lng": -122.4195, "rating": 0.9, "available": True})
+    updates, rebuilds = matcher.updates, matcher.rebuilds
+    
+    matcher.update_helper({"id": "far", "lat": 40.7128, "lng": -74.0060, "rating": 1.0, "available": True})
+    
+    assert (matcher.updates, matcher.rebuilds) == (updates, rebuilds)
+    assert [c["id"] for c in matcher.candidates("r1")] == ["near"]
+
+
+def test_remove_helper_and_untracked_request():
+    """Test removal drops the helper and untracked requests return None."""
+    matcher = IncrementalMatcher(WEIGHTS, top_k=3)
+    matcher.track_request({"id": "r1", "lat": 37.7749, "lng": -122.4194, "urgency": "low"})
+    presence = {
+        "userId": "u1", "role": "helper", "lat": 37.7750, "lng": -122.4195,
+        "available": True, "lastSeenAt": "2024-01-01T00:00:00Z",
+    }
+    matcher.update_helper(presence_to_helper(presence))
+    assert [c["id"] for c in matcher.candidates("r1")] == ["u1"]
+    
+    matcher.remove_helper("u1")
+    assert matcher.candidates("r1") == []
+    
+    matcher.untrack_request("r1")
+    assert matcher.candidates("r1") is None
+    assert not matcher.is_tracked("r1")
+
+
+def test_helper_source_seeds_only_searched_cells():
+    """Test stored helpers are read per searched cell, once, and later updates win."""
+    precision = get_geohash_precision()
+    stored = [
+        {"id": "near", "lat": 37.7750, "lng": -122.4195, "rating": 0.9, "available": True},
+        {"id": "moved", "lat": 37.7751, "lng": -122.4194, "rating": 0.5, "available": True},
+        {"id": "far", "lat": 40.7128, "lng": -74.0060, "rating": 1.0, "available": True},
+    ]
+    reads = []
+    
+    def source(cell):
+        reads.append(cell)
+        return [h for h in stored if get_geohash_for_point(h["lat"], h["lng"], precision) == cell]
+    
+    matcher = IncrementalMatcher(WEIGHTS, top_k=3, helper_source=source)
+    matcher.update_helper({"id": "moved", "lat": 40.7128, "lng": -74.0060, "rating": 0.5, "available": True})
+    assert reads == []
+    
+    matcher.track_request({"id": "r1", "lat": 37.7749, "lng": -122.4194, "urgency": "urgent"})
+    matcher.track_request({"id": "r2", "lat": 37.7749, "lng": -122.4194, "urgency": "low"})
+    
+    assert sorted(reads) == sorted(helper_search_cells("9q8yyk"))
+    assert [c["id"] for c in matcher.candidates("r1")] == ["near"]
+    assert [c["id"] for c in matcher.candidates("r2")] == ["near"]
+
+
+class _Clock:
+    """Settable time source for eviction tests."""
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+def test_evict_drops_expired_presence_helpers():
+    """Test helpers fed with an expiry leave candidate lists once it passes, unless refreshed."""
+    clock = _Clock()
+    matcher = IncrementalMatcher(WEIGHTS, top_k=3, clock=clock)
+    seen = []
+    matcher.add_cell_listener(seen.append)
+    matcher.track_request({"id": "r1", "lat": 37.7749, "lng": -122.4194, "urgency": "low"})
+    
+    def presence(user_id, last_seen_at):
+        return presence_to_helper({
+            "userId": user_id, "role": "helper", "lat": 37.7750, "lng": -122.4195,
+            "available": True, "lastSeenAt": last_seen_at,
+        })
+    
+    matcher.update_helper(presence("u1", 1000), expires_at=1900)
+    matcher.update_helper(presence("u2", 1000), expires_at=1900)
+    matcher.update_helper({"id": "stored", "lat": 37.7750, "lng": -122.4194, "rating": 0.5, "available": True})
+    clock.now = 1500
+    matcher.update_helper(presence("u2", 1500), expires_at=2400)
+    
+    assert matcher.evict() == {"helpers": 0, "requests": 0}
+    clock.now = 1900
+    seen.clear()
+    assert matcher.evict() == {"helpers": 1, "requests": 0}
+    assert sorted(c["id"] for c in matcher.candidates("r1")) == ["stored", "u2"]
+    assert seen == [{"9q8yyk"}]
+    
+    clock.now = 10_000
+    assert matcher.evict()["helpers"] == 1
+    assert [c["id"] for c in matcher.candidates("r1")] == ["stored"]
+    assert matcher.stats()["helpers"] == 1 and matcher.stats()["evictedHelpers"] == 2
+
+
+def test_evict_untracks_idle_requests():
+    """Test requests nobody reads for request_idle_s are untracked; reads keep them."""
+    clock = _Clock()
+    matcher = IncrementalMatcher(WEIGHTS, top_k=3, request_idle_s=60, clock=clock)
+    matcher.track_request({"id": "read", "lat": 37.7749, "lng": -122.4194, "urgency": "low"})
+    matcher.track_request({"id": "idle", "lat": 37.7749, "lng": -122.4194, "urgency": "low"})
+    matcher.track_request({"id": "streamed", "lat": 37.7749, "lng": -122.4194, "urgency": "low"})
+    
+    clock.now += 45
+    assert matcher.candidates("read") == []
+    matcher.touch("streamed")
+    clock.now += 30
+    
+    assert matcher.evict() == {"helpers": 0, "requests": 1}
+    assert not matcher.is_tracked("idle")
+    assert matcher.is_tracked("read") and matcher.is_tracked("streamed")
+    
+    clock.now += 60
+    assert matcher.evict()["requests"] == 2
+    assert matcher.stats()["requests"] == 0
+    matcher.touch("read")  # Untracked: nothing to defer
+    assert matcher.evict() == {"helpers": 0, "requests": 0}
+
+
+def test_diff_candidates():
+    """Test diffs report entered, left, updated and reordered candidates."""
+    a = {"id": "a", "score": 0.9, "distM": 10.0, "rating": 0.8}
+    b = {"id": "b", "score": 0.8, "distM": 20.0, "rating": 0.8}
+    c = {"id": "c", "score": 0.7, "distM": 30.0, "rating": 0.8}
+    moved_b = dict(b, score=0.95, distM=5.0)
+    
+    assert diff_candidates([a, b], [a, b]) == {"entered": [], "left": [], "updated": [], "order": []}
+    assert diff_candidates([a, b], [moved_b, a, c]) == {
+        "entered": [c],
+        "left": [],
+        "updated": [moved_b],
+        "order": ["b", "a", "c"],
+    }
+    assert diff_candidates([a, b], [a])["left"] == ["b"]
+
+
+def test_cell_listeners_get_old_and_new_cells():
+    """Test helper changes report the cells they touched."""
+    matcher = IncrementalMatcher(WEIGHTS, top_k=3)
+    seen = []
+    matcher.add_cell_listener(seen.append)
+    
+    matcher.update_helper({"id": "h", "lat": 37.7750, "lng": -122.4195, "rating": 0.9, "available": True})
+    matcher.update_helper({"id": "h", "lat": 40.7128, "lng": -74.0060, "rating": 0.9, "available": True})
+    matcher.remove_helper("h")
+    
+    assert seen == [{"9q8yyk"}, {"9q8yyk", "dr5reg"}, {"dr5reg"}]
@@ -0,0 +1,99 @@
+"""
+Unit tests for the versioned /match result cache.
+Tests version checks, hit-rate accounting, eviction, and cell generations.
+"""
+
+import pytest
+
+from ai_service import storage
+from ai_service.match_cache import MatchCache, match_cache_key
+
+WEIGHTS = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+
+
+def test_hit_only_while_versions_match():
+    """Test entries are served while their cells' versions match and dropped once stale."""
+    cache = MatchCache(maxsize=10)
+    key = match_cache_key("req1", WEIGHTS, 3, True)
+    ranked = [{"id": "h1", "score": 0.9, "distM": 10.0, "rating": 0.8}]
+    generations = {"a": 1, "b": 2, "c": 5}
+    looked_up = []
+    
+    def versions(cells):
+        looked_up.append(tuple(cells))
+        return tuple(generations[cell] for cell in cells)
+    
+    assert cache.get(key, versions) is None
+    cache.put(key, ["a", "b"], (1, 2), ranked)
+    assert cache.get(key, versions) is ranked
+    generations["c"] += 1  # Not a visited cell
+    assert cache.get(key, versions) is ranked
+    assert looked_up == [("a", "b"), ("a", "b")]
+    generations["b"] += 1
+    assert cache.get(key, versions) is None
+    assert cache.get(key, versions) is None  # Stale entry was dropped
+    
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stale"]) == (2, 3, 1)
+    assert stats["hitRate"] == 0.4
+    assert stats["size"] == 0
+
+
+def test_key_covers_configuration():
+    """Test weights, top K and search path each get their own entry."""
+    keys = {
+        match_cache_key("req1", WEIGHTS, 3, True),
+        match_cache_key("req1", dict(reversed(list(WEIGHTS.items()))), 3, True),
+        match_cache_key("req1", {**WEIGHTS, "trust": 0.3}, 3, True),
+        match_cache_key("req1", WEIGHTS, 5, True),
+        match_cache_key("req1", WEIGHTS, 3, False),
+    }
+    assert len(keys) == 4
+
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted first."""
+    cache = MatchCache(maxsize=2)
+    
+    def versions(cells):
+        return 0
+    
+    cache.put("a", [], 0, [])
+    cache.put("b", [], 0, [])
+    cache.get("a", versions)
+    cache.put("c", [], 0, [])
+    
+    assert cache.get("b", versions) is None
+    assert cache.get("a", versions) == []
+    assert cache.stats()["size"] == 2
+    with pytest.raises(ValueError):
+        MatchCache(maxsize=0)
+
+
+def test_cell_generations_track_helper_writes(tmp_path, monkeypatch):
+    """Test helper writes bump only the cells they touch."""
+    monkeypatch.setattr(storage, "STORAGE_FILE", str(tmp_path / "storage.json"))
+    monkeypatch.setattr(storage, "_helpers_store", {})
+    monkeypatch.setattr(storage, "_helpers_by_geohash", {})
+    monkeypatch.setattr(storage, "_helpers_by_product", {})
+    monkeypatch.setattr(storage, "_cell_generations", {})
+    helper = {
+        "id": "h1", "lat": 37.7750, "lng": -122.4194, "rating": 0.8,
+        "available": True, "updatedAt": "2024-01-01T00:00:00Z",
+    }
+    cells = ["9q8yyk", "dr5reg"]  # San Francisco, New York
+    
+    before = storage.get_match_versions("req1", cells)
+    storage.create_helper(dict(helper))
+    after_create = storage.get_match_versions("req1", cells)
+    storage.create_helper(dict(helper, available=False))
+    after_update = storage.get_match_versions("req1", cells)
+    storage.create_helper(dict(helper, lat=40.7128, lng=-74.0060))
+    after_move = storage.get_match_versions("req1", cells)
+    
+    assert before == (0, (0, 0))
+    assert after_create[1][0] > before[1][0]
+    assert after_update[1][0] > after_create[1][0]
+    assert after_update[1][1] == 0
+    assert after_move[1][0] > after_update[1][0]
+    assert after_move[1][1] > 0
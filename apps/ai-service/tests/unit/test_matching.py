@@ -3,14 +3,31 @@ Unit tests for matching algorithm.
 Tests urgency mapping, proximity scoring, and ranking logic.
 """
 
+import random
+
 import pytest
 
+from ai_service.geo import haversine_meters
 from ai_service.matching import (
+    ALL_PRODUCTS,
+    PRODUCT_LINER,
+    PRODUCT_PAD,
+    PRODUCT_TAMPON,
     Helper,
+    HelperColumns,
     Request,
+    can_supply,
+    inventory_mask,
+    inventory_products,
+    product_mask,
     proximity_score,
+    proximity_scores,
+    rank_columns,
     rank_helpers,
+    rank_helpers_bounded,
+    score_from_distance,
     score_helper,
+    score_upper_bound,
     urgency_level,
 )
 
@@ -203,3 +220,240 @@ def test_rank_helpers_empty_result():
     
     assert len(ranked) == 0
 
+
+def test_rank_helpers_ties_keep_input_order():
+    """Test that equal scores keep their input order."""
+    req: Request = {
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "normal",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    helpers = [
+        {
+            "id": f"helper_{i}",
+            "lat": 37.7749,
+            "lng": -122.4194,
+            "rating": 0.9 if i == 3 else 0.5,
+            "available": True,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        for i in range(6)
+    ]
+    
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    ranked = rank_helpers(req, helpers, weights, top_k=4)
+    
+    assert [c["id"] for c in ranked] == ["helper_3", "helper_0", "helper_1", "helper_2"]
+
+
+def test_rank_helpers_matches_full_sort():
+    """Test that heap top-K matches scoring every helper and sorting."""
+    rng = random.Random(5)
+    req: Request = {
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "urgent",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    helpers = [
+        {
+            "id": f"helper_{i}",
+            "lat": 37.7749 + rng.uniform(-0.01, 0.01),
+            "lng": -122.4194 + rng.uniform(-0.01, 0.01),
+            "rating": rng.choice([0.5, 0.8, rng.random()]),
+            "available": rng.random() < 0.8,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        for i in range(200)
+    ]
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    
+    expected = sorted(
+        (
+            {
+                "id": h["id"],
+                "score": round(score_helper(req, h, weights), 4),
+                "distM": round(haversine_meters(req["lat"], req["lng"], h["lat"], h["lng"]), 2),
+                "rating": h["rating"],
+            }
+            for h in helpers
+            if h["available"]
+        ),
+        key=lambda c: c["score"],
+        reverse=True,
+    )[:10]
+    
+    assert rank_helpers(req, helpers, weights, top_k=10) == expected
+
+
+@pytest.mark.parametrize("meters", [0, 100, 100.01, 250, 251, 500, 750, 1000, 1000.5, 5000])
+def test_proximity_scores_vectorized(meters: float):
+    """Test vectorized band lookup matches proximity_score at the edges."""
+    np = pytest.importorskip("numpy")
+    assert proximity_scores(np.array([meters]))[0] == proximity_score(meters)
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 50, 500])
+def test_rank_columns_matches_scalar_path(top_k: int):
+    """Test the columnar path returns exactly the scalar path's ranking."""
+    pytest.importorskip("numpy")
+    rng = random.Random(9)
+    req: Request = {
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "low",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    helpers = [
+        {
+            "id": f"helper_{i}",
+            "lat": 37.7749 + rng.uniform(-0.015, 0.015),
+            "lng": -122.4194 + rng.uniform(-0.015, 0.015),
+            "rating": rng.choice([0.5, 0.8, 1.0]),  # Many ties
+            "available": rng.random() < 0.8,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        for i in range(300)
+    ]
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    
+    scalar = rank_helpers(req, helpers, weights, top_k, vector_threshold=len(helpers) + 1)
+    columnar = rank_columns(req, HelperColumns.from_helpers(helpers), weights, top_k)
+    
+    assert columnar == scalar
+    assert rank_helpers(req, helpers, weights, top_k, vector_threshold=0) == scalar
+
+
+def _cells_around(req: Request, rng: random.Random, rings: int, per_cell: int, step_deg: float):
+    """Build (min_dist, helpers) cells in rings of growing distance from req."""
+    cells = []
+    for ring in range(rings):
+        helpers = [
+            {
+                "id": f"helper_{ring}_{i}",
+                "lat": req["lat"] + ring * step_deg + rng.uniform(0, step_deg * 0.5),
+                "lng": req["lng"],
+                "rating": round(rng.uniform(0.6, 1.0), 2),
+                "available": rng.random() < 0.9,
+                "updatedAt": "2024-01-01T00:00:00Z",
+            }
+            for i in range(per_cell)
+        ]
+        min_dist = haversine_meters(req["lat"], req["lng"], req["lat"] + ring * step_deg, req["lng"])
+        cells.append((min_dist, helpers))
+    return cells
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 40])
+def test_rank_helpers_bounded_matches_full_ranking(top_k: int):
+    """Test branch and bound returns the same top K as ranking everything."""
+    rng = random.Random(13)
+    req: Request = {
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "normal",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    cells = _cells_around(req, rng, rings=6, per_cell=20, step_deg=0.001)
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    
+    everyone = [h for _, helpers in cells for h in helpers]
+    expected = rank_helpers(req, everyone, weights, top_k, vector_threshold=len(everyone) + 1)
+    result = rank_helpers_bounded(req, cells, weights, top_k)
+    
+    assert result.candidates == expected
+    assert result.cells_visited + result.cells_pruned == len(cells)
+
+
+def test_rank_helpers_bounded_prunes_far_cells():
+    """Test far cells are pruned once the near cell fills the top K."""
+    rng = random.Random(17)
+    req: Request = {
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "urgent",
+        "productNeed": "pad",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    # Ring 0 holds 200 helpers within ~60 m; later rings start 150 m+ away
+    cells = _cells_around(req, rng, rings=8, per_cell=200, step_deg=0.0011)
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    
+    result = rank_helpers_bounded(req, cells, weights, top_k=5)
+    
+    assert result.cells_visited == 1
+    assert result.cells_pruned == 7
+    assert result.helpers_scored == sum(h["available"] for h in cells[0][1])
+    assert all(c["id"].startswith("helper_0_") for c in result.candidates)
+
+
+def test_score_upper_bound_dominates_scores():
+    """Test the band bound is never below an actual score at that distance."""
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    urgency_term = weights["urgency"] * urgency_level("normal")
+    for dist in [0, 50, 100, 150, 400, 900, 3000]:
+        bound = score_upper_bound(urgency_term, dist, weights)
+        for further in [dist, dist + 1, dist + 200, dist + 5000]:
+            assert score_from_distance(urgency_term, further, 1.0, weights) <= bound
+
+
+def test_product_masks():
+    """Test productNeed and inventory names map to bits."""
+    assert product_mask("tampon") == PRODUCT_TAMPON
+    assert product_mask("Pads") == PRODUCT_PAD
+    assert product_mask("") == 0
+    assert product_mask("cup") == 0
+    assert inventory_mask(["pad", "liner"]) == PRODUCT_PAD | PRODUCT_LINER
+    assert inventory_products(ALL_PRODUCTS) == ["pad", "tampon", "liner"]
+    with pytest.raises(ValueError):
+        inventory_mask(["cup"])
+    
+    assert can_supply({"inventory": PRODUCT_PAD}, 0)
+    assert not can_supply({"inventory": PRODUCT_PAD}, PRODUCT_TAMPON)
+    assert can_supply({}, PRODUCT_TAMPON)  # Unreported inventory matches anything
+
+
+def test_ranking_filters_on_product_before_scoring():
+    """Test every ranking path drops helpers without the requested product."""
+    rng = random.Random(21)
+    req: Request = {
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "urgent",
+        "productNeed": "tampon",
+        "createdAt": "2024-01-01T00:00:00Z",
+    }
+    helpers = []
+    for i in range(200):
+        helper = {
+            "id": f"helper_{i}",
+            "lat": 37.7749 + rng.uniform(-0.01, 0.01),
+            "lng": -122.4194 + rng.uniform(-0.01, 0.01),
+            "rating": rng.choice([0.5, 0.8, 1.0]),
+            "available": True,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        }
+        if i % 4:
+            helper["inventory"] = rng.randrange(ALL_PRODUCTS + 1)
+        helpers.append(helper)
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    by_id = {h["id"]: h for h in helpers}
+    
+    scalar = rank_helpers(req, helpers, weights, 20, vector_threshold=len(helpers) + 1)
+    eligible = [h for h in helpers if can_supply(h, PRODUCT_TAMPON)]
+    
+    assert scalar == rank_helpers(req, eligible, weights, 20, vector_threshold=len(helpers) + 1)
+    assert all(can_supply(by_id[c["id"]], PRODUCT_TAMPON) for c in scalar)
+    assert rank_helpers(req, helpers, weights, 20, vector_threshold=0) == scalar
+    assert rank_helpers_bounded(req, [(0.0, helpers)], weights, 20).candidates == scalar
@@ -7,6 +7,7 @@ import time
 
 import pytest
 
+from ai_service.geo import parse_tile
 from ai_service.models import LocationUpdateRequest
 from ai_service.repo import repo
 
@@ -151,3 +152,47 @@ def test_presence_filters_by_geo():
     assert userId1 in user_ids
     assert userId2 not in user_ids
 
+
+def test_presence_lookup_by_tile_keys():
+    """Test presence lookup with packed tile keys."""
+    now = int(time.time())
+    repo.save_user_presence(
+        userId="test_user_tile_key",
+        role="helper",
+        available=True,
+        lat=37.7749,
+        lng=-122.4194,
+        geo="tile_4321_-8765",
+        now=now,
+        rating=0.7,
+    )
+    
+    presence_list = repo.get_active_presence_in_tiles(
+        {parse_tile("tile_4321_-8765")},
+        now=now,
+        ttl_min=15
+    )
+    
+    assert [p["userId"] for p in presence_list] == ["test_user_tile_key"]
+    assert presence_list[0]["geo"] == "tile_4321_-8765"
+
+
+def test_presence_moves_between_tiles():
+    """Test a user changing tile is only found in the new tile."""
+    now = int(time.time())
+    for geo in ("tile_5000_6000", "tile_5000_6001"):
+        repo.save_user_presence(
+            userId="test_user_mover",
+            role="helper",
+            available=True,
+            lat=37.7749,
+            lng=-122.4194,
+            geo=geo,
+            now=now,
+        )
+    
+    old_tile = repo.get_active_presence_in_geos(["tile_5000_6000"], now=now, ttl_min=15)
+    new_tile = repo.get_active_presence_in_geos(["tile_5000_6001"], now=now, ttl_min=15)
+    
+    assert "test_user_mover" not in [p["userId"] for p in old_tile]
+    assert [p["userId"] for p in new_tile] == ["test_user_mover"]
@@ -0,0 +1,82 @@
+"""
+Unit tests for the in-process tile pub/sub.
+Tests tile-keyed delivery, coalescing, and unsubscribe.
+"""
+
+import asyncio
+import threading
+
+from ai_service.pubsub import TileBroker
+
+
+def test_publish_reaches_only_matching_subscriptions():
+    """Test subscribers wake only for their own tiles, with changes coalesced."""
+    async def scenario():
+        broker = TileBroker()
+        sf = broker.subscribe(["9q8yyk", "9q8yym"])
+        ny = broker.subscribe(["dr5reg"])
+        
+        broker.publish({"9q8yyk"})
+        broker.publish({"9q8yym", "dr5xxx"})
+        changed = await asyncio.wait_for(sf.wait(), 1)
+        
+        try:
+            await asyncio.wait_for(ny.wait(), 0.05)
+            woke = True
+        except asyncio.TimeoutError:
+            woke = False
+        return broker, changed, woke
+    
+    broker, changed, ny_woke = asyncio.run(scenario())
+    
+    assert changed == {"9q8yyk", "9q8yym"}
+    assert not ny_woke
+    assert broker.stats()["published"] == 2
+    assert broker.stats()["delivered"] == 2
+
+
+def test_unsubscribe_drops_tiles():
+    """Test unsubscribed subscriptions are forgotten."""
+    async def scenario():
+        broker = TileBroker()
+        subscription = broker.subscribe(["9q8yyk"])
+        assert broker.stats()["subscriptions"] == 1
+        broker.unsubscribe(subscription)
+        broker.publish({"9q8yyk"})
+        return broker
+    
+    broker = asyncio.run(scenario())
+    
+    assert broker.stats()["tiles"] == 0
+    assert broker.stats()["delivered"] == 0
+
+
+def test_publish_from_threads_while_subscribing():
+    """Test worker threads can publish while the loop subscribes and unsubscribes."""
+    async def scenario():
+        broker = TileBroker()
+        watcher = broker.subscribe(["9q8yyk"])
+        stop = threading.Event()
+        
+        def publisher():
+            while not stop.is_set():
+                broker.publish({"9q8yyk", "9q8yym"})
+        
+        threads = [threading.Thread(target=publisher) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in range(500):
+                broker.unsubscribe(broker.subscribe(["9q8yym", "9q8yyk"]))
+                await asyncio.sleep(0)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        changed = await asyncio.wait_for(watcher.wait(), 1)
+        return broker, changed
+    
+    broker, changed = asyncio.run(scenario())
+    
+    assert changed == {"9q8yyk"}
+    assert broker.stats()["subscriptions"] == 1
@@ -0,0 +1,89 @@
+"""
+Unit tests for the binary snapshot format.
+Tests column round-trips, lazy record decoding, and format detection.
+"""
+
+import json
+from operator import itemgetter
+
+import pytest
+
+from ai_service.snapshot import LazyRecords, Snapshot, encode_snapshot, load_snapshot
+
+COLUMNS = {
+    "id": ("s", itemgetter("id")),
+    "lat": ("d", itemgetter("lat")),
+    "inventory": ("q", lambda r: r.get("inventory", 7)),
+}
+
+RECORDS = [
+    {"id": "a", "lat": 37.5, "inventory": 1, "note": "café"},
+    {"id": "b", "lat": -12.25},
+    {"id": "c", "lat": 0.0, "inventory": 4, "nested": {"x": [1, 2]}},
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "store.bin"
+    path.write_bytes(encode_snapshot({"items": (RECORDS, COLUMNS), "empty": ([], COLUMNS)}))
+    return Snapshot(str(path))
+
+
+def test_columns_and_records_round_trip(snapshot):
+    """Test columns and full records decode to what was written."""
+    items = snapshot.section("items")
+    assert sorted(snapshot.sections()) == ["empty", "items"]
+    assert len(items) == 3
+    assert items.strings("id") == ["a", "b", "c"]
+    assert list(items.column("lat")) == [37.5, -12.25, 0.0]
+    assert list(items.column("inventory")) == [1, 7, 4]
+    assert list(items.records()) == RECORDS
+    assert items.record(2) == RECORDS[2]
+
+    with pytest.raises(TypeError):
+        items.column("id")
+    assert snapshot.section("missing") is None
+    assert snapshot.section("empty").strings("id") == []
+
+
+def test_lazy_records_decode_on_access(snapshot):
+    """Test records are decoded only when read and writes replace them."""
+    decoded = []
+    records = LazyRecords(snapshot.section("items"), on_decode=lambda r: decoded.append(r["id"]))
+    assert len(records) == 3 and records.pending == 3
+    assert "b" in records and "z" not in records
+
+    assert records["b"] == RECORDS[1]
+    assert records["b"] is records["b"]
+    assert decoded == ["b"] and records.pending == 2
+
+    records["a"] = {"id": "a", "lat": 1.0}
+    del records["c"]
+    assert records.pending == 0
+    assert records.get("a") == {"id": "a", "lat": 1.0}
+    assert sorted(records) == ["a", "b"]
+    assert decoded == ["b"]
+    with pytest.raises(KeyError):
+        records["c"]
+
+
+def test_load_snapshot_detects_format(tmp_path):
+    """Test JSON and binary files both load; missing or corrupt files give None."""
+    json_path = tmp_path / "store.json"
+    json_path.write_text(json.dumps({"helpers": {}}, indent=2))
+    binary_path = tmp_path / "store.bin"
+    binary_path.write_bytes(encode_snapshot({"items": (RECORDS, COLUMNS)}))
+    corrupt_path = tmp_path / "corrupt.json"
+    corrupt_path.write_text("{not json")
+
+    assert load_snapshot(str(json_path)) == {"helpers": {}}
+    assert isinstance(load_snapshot(str(binary_path)), Snapshot)
+    assert load_snapshot(str(corrupt_path)) is None
+    assert load_snapshot(str(tmp_path / "missing")) is None
+
+
+def test_string_columns_reject_separator():
+    """Test NUL characters in string columns are refused."""
+    with pytest.raises(ValueError):
+        encode_snapshot({"items": ([{"id": "a\0b", "lat": 0.0}], COLUMNS)})
@@ -0,0 +1,115 @@
+"""
+Unit tests for in-memory spatial indexes.
+Tests grid and quadtree inserts, moves, and radius queries.
+"""
+
+import random
+
+import pytest
+
+from ai_service.geo import haversine_meters
+from ai_service.spatial_index import GridIndex, QuadTreeIndex
+
+
+CENTER = (37.7749, -122.4194)
+
+
+def _scatter(index: QuadTreeIndex, count: int, spread_deg: float, prefix: str, seed: int = 7):
+    """Insert `count` random points around CENTER and return their positions."""
+    rng = random.Random(seed)
+    points = {}
+    for i in range(count):
+        lat = CENTER[0] + rng.uniform(-spread_deg, spread_deg)
+        lng = CENTER[1] + rng.uniform(-spread_deg, spread_deg)
+        index.insert(f"{prefix}{i}", lat, lng)
+        points[f"{prefix}{i}"] = (lat, lng)
+    return points
+
+
+def test_quadtree_query_finds_all_points_in_radius():
+    """Test uncapped queries return every point within the radius."""
+    index = QuadTreeIndex(leaf_capacity=4)
+    points = _scatter(index, 500, 0.02, "p")
+    
+    result = index.query(CENTER[0], CENTER[1], 800)
+    
+    expected = {
+        pid for pid, (lat, lng) in points.items()
+        if haversine_meters(CENTER[0], CENTER[1], lat, lng) <= 800
+    }
+    assert expected
+    assert expected <= set(result.ids)
+    assert not result.truncated
+
+
+def test_quadtree_move_and_remove():
+    """Test that moving an ID re-indexes it and removal drops it."""
+    index = QuadTreeIndex()
+    index.insert("u1", 40.7128, -74.0060)
+    assert index.query(CENTER[0], CENTER[1], 500).ids == []
+    
+    index.insert("u1", CENTER[0], CENTER[1])
+    assert index.query(CENTER[0], CENTER[1], 500).ids == ["u1"]
+    assert len(index) == 1
+    
+    index.remove("u1")
+    assert index.query(CENTER[0], CENTER[1], 500).ids == []
+    assert len(index) == 0
+
+
+def test_quadtree_bounds_work_in_hot_spots():
+    """Test a dense hot spot is capped by max_candidates, nearest cells first."""
+    index = QuadTreeIndex(leaf_capacity=16)
+    _scatter(index, 2000, 0.0005, "hot")  # ~50m cluster around the center
+    _scatter(index, 50, 0.01, "far", seed=11)
+    
+    result = index.query(CENTER[0], CENTER[1], 1000, max_candidates=100)
+    
+    assert len(result.ids) == 100
+    assert result.truncated
+    assert all(pid.startswith("hot") for pid in result.ids)
+    assert result.cells_visited < 100
+
+
+def test_quadtree_sparse_area_uses_coarse_cells():
+    """Test sparse areas are answered without refining to fine cells."""
+    index = QuadTreeIndex(leaf_capacity=32)
+    _scatter(index, 20, 0.005, "s")
+    
+    result = index.query(CENTER[0], CENTER[1], 1000)
+    
+    assert len(result.ids) == 20
+    assert result.cells_visited <= 9
+
+
+def test_quadtree_rejects_bad_levels():
+    """Test invalid level configuration raises ValueError."""
+    with pytest.raises(ValueError):
+        QuadTreeIndex(min_level=12, max_level=10)
+
+
+def test_grid_index_moves_ids_between_tiles():
+    """Test moving an ID leaves it in exactly one tile."""
+    index = GridIndex()
+    index.move("a", 1)
+    index.move("b", 1)
+    index.move("a", 2)
+    
+    assert sorted(index.ids_in({1})) == ["b"]
+    assert sorted(index.ids_in({1, 2})) == ["a", "b"]
+    assert index.tile_of("a") == 2
+    assert index.count(1) == 1
+    assert len(index) == 2
+
+
+def test_grid_index_remove_and_unknown_tiles():
+    """Test removal, None tiles and lookups of empty tiles."""
+    index = GridIndex()
+    index.move("a", 1)
+    index.move("b", None)
+    index.remove("a")
+    index.remove("missing")
+    
+    assert list(index.ids_in({1, 2, 3})) == []
+    assert index.tile_of("a") is None
+    assert len(index) == 0
@@ -0,0 +1,252 @@
+"""
+Unit tests for the SQLite backend.
+Tests storage and repository behavior against a temporary database file.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from ai_service import storage
+from ai_service.geo import haversine_meters, parse_tile
+from ai_service.matching import PRODUCT_PAD, PRODUCT_TAMPON
+from ai_service.models import StockReport, Venue, VenueStock
+from ai_service.repo import SQLiteRepository
+from ai_service.sqlite_store import SQLiteDatabase, SQLiteStore, bounding_box
+from ai_service.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "test.db"))
+    yield database
+    database.close()
+
+
+def _helper(helper_id, lat, lng, **fields):
+    return {"id": helper_id, "lat": lat, "lng": lng, "rating": 0.8, "available": True, **fields}
+
+
+def test_requests_and_helpers_survive_reopen(tmp_path):
+    """Test records round-trip and persist across connections."""
+    path = str(tmp_path / "test.db")
+    store = SQLiteStore(SQLiteDatabase(path))
+    store.create_request({"id": "r1", "lat": 37.7749, "lng": -122.4194, "urgency": "urgent"})
+    store.create_helpers([_helper("h1", 37.7750, -122.4195), _helper("h2", 37.7760, -122.4200)])
+    store.db.close()
+    
+    reopened = SQLiteStore(SQLiteDatabase(path))
+    assert reopened.get_request("r1")["geohash"] == "9q8yyk"
+    assert reopened.get_request("missing") is None
+    assert sorted(h["id"] for h in reopened.list_helpers()) == ["h1", "h2"]
+    reopened.db.close()
+
+
+def test_get_helpers_near_orders_and_filters(db):
+    """Test nearest-first results filtered by radius, availability and inventory."""
+    store = SQLiteStore(db)
+    store.create_helpers([
+        _helper("near", 37.7750, -122.4195, inventory=PRODUCT_PAD),
+        _helper("mid", 37.7790, -122.4194),
+        _helper("off", 37.7751, -122.4194, available=False),
+        _helper("far", 37.8200, -122.4194),
+    ])
+    
+    assert [h["id"] for h in store.get_helpers_near(37.7749, -122.4194)] == ["near", "mid"]
+    assert [h["id"] for h in store.get_helpers_near(37.7749, -122.4194, limit=1)] == ["near"]
+    assert [h["id"] for h in store.get_helpers_near(37.7749, -122.4194, need=PRODUCT_TAMPON)] == ["mid"]
+    assert [h["id"] for h in store.get_helpers_near(37.7749, -122.4194, max_radius_m=100)] == ["near"]
+    
+    store.update_helper_inventory("near", PRODUCT_TAMPON)
+    assert [h["id"] for h in store.get_helpers_near(37.7749, -122.4194, need=PRODUCT_TAMPON)] == ["near", "mid"]
+    assert store.update_helper_inventory("missing", PRODUCT_PAD) is None
+
+
+def test_bounding_box_contains_radius():
+    """Test every point on the query circle lies inside the box."""
+    lat, lng, radius = 60.0, 10.0, 1000.0
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+    assert haversine_meters(lat, lng, max_lat, lng) >= radius * 0.999
+    assert haversine_meters(lat, lng, lat, max_lng) >= radius * 0.999
+    assert min_lat < lat < max_lat and min_lng < lng < max_lng
+
+
+def test_repository_presence(db, monkeypatch):
+    """Test presence upserts, tile and radius lookups, TTL and listeners."""
+    repository = SQLiteRepository(db)
+    seen = []
+    monkeypatch.setattr("ai_service.repo._presence_listeners", [seen.append])
+    now = 1_700_000_000
+    
+    repository.save_user_presence("u1", "helper", True, 37.7749, -122.4194, "tile_1_2", now, rating=0.9)
+    repository.save_user_presence("u2", "helper", True, 37.7750, -122.4195, "tile_1_2", now - 5)
+    repository.save_user_presence("u3", "requester", True, 37.7751, -122.4194, "tile_1_2", now - 3600)
+    repository.save_user_presence("u2", "helper", False, 37.7750, -122.4195, "tile_1_2", now)
+    
+    active = repository.get_active_presence_in_geos(["tile_1_2", "not_a_tile"], now, ttl_min=15)
+    assert [p["userId"] for p in active] == ["u1"]
+    assert active[0]["rating"] == 0.9 and active[0]["tileKey"] == parse_tile("tile_1_2")
+    
+    near = repository.get_active_presence_near(37.7749, -122.4194, 500, now, ttl_min=120)
+    assert [p["userId"] for p in near] == ["u1", "u3"]
+    assert repository.get_active_presence_near(40.7128, -74.0060, 500, now, ttl_min=120) == []
+    assert [p["userId"] for p in seen] == ["u1", "u2", "u3", "u2"]
+    
+    # Lookups spanning more tiles than one statement binds
+    keys = {parse_tile(f"tile_1_{i}") for i in range(200)}
+    assert [p["userId"] for p in repository.get_active_presence_in_tiles(keys, now, ttl_min=15)] == ["u1"]
+
+
+def test_repository_venues_and_reports(db):
+    """Test venue storage, stock updates and stock reports."""
+    repository = SQLiteRepository(db)
+    venue = Venue(
+        id="v1", name="Library", lat=37.7749, lng=-122.4194, geo="tile_3_4",
+        stock=VenueStock(pads="G", tampons="Y", liners="R"), stockUpdatedAt=100,
+    )
+    repository.create_venue(venue)
+    
+    assert repository.get_venue("v1") == venue
+    assert repository.get_venue("missing") is None
+    assert [v.id for v in repository.list_venues_in_geos(["tile_3_4"])] == ["v1"]
+    assert [v.id for v in repository.list_venues_near(37.7750, -122.4194, 200)] == ["v1"]
+    
+    repository.set_venue_stock("v1", VenueStock(pads="R", tampons="R", liners="R"), 200)
+    assert repository.get_venue("v1").stock.pads == "R"
+    assert repository.get_venue("v1").stockUpdatedAt == 200
+    
+    for created_at in (150, 250):
+        repository.add_stock_report(StockReport(
+            venueId="v1", userId="u1", pads=-1, tampons=0, liners=1, createdAt=created_at,
+        ))
+    assert [r.createdAt for r in repository.get_stock_reports("v1", since=200)] == [250]
+
+
+def test_batch_commits_once_and_rolls_back(db):
+    """Test batched writes are all-or-nothing."""
+    repository = SQLiteRepository(db)
+    with pytest.raises(RuntimeError):
+        with repository.batch():
+            repository.save_user_presence("u1", "helper", True, 37.7749, -122.4194, "tile_1_2", 100)
+            raise RuntimeError("abort")
+    assert repository.get_active_presence_in_geos(["tile_1_2"], 100, ttl_min=15) == []
+    
+    with repository.batch():
+        for i in range(10):
+            repository.save_user_presence(f"u{i}", "helper", True, 37.7749, -122.4194, "tile_1_2", 100)
+    assert len(repository.get_active_presence_in_geos(["tile_1_2"], 100, ttl_min=15)) == 10
+
+
+def test_concurrent_writers(db):
+    """Test writes from several threads all land."""
+    store = SQLiteStore(db)
+    
+    def write(worker):
+        for i in range(25):
+            store.create_helper(_helper(f"w{worker}-{i}", 37.7749, -122.4194))
+    
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(store.list_helpers()) == 100
+
+
+def test_write_behind_reads_own_venue_writes(db):
+    """Test queued writes land on stop and venue/stock reads see them at once."""
+    repository = SQLiteRepository(db)
+    repository.start_write_behind()
+    try:
+        repository.create_venue(Venue(
+            id="v1", name="Library", lat=37.7749, lng=-122.4194, geo="tile_3_4",
+            stock=VenueStock(pads="G", tampons="Y", liners="R"), stockUpdatedAt=100,
+        ))
+        repository.add_stock_report(StockReport(
+            venueId="v1", userId="u1", pads=-1, tampons=0, liners=1, createdAt=150,
+        ))
+        assert [r.createdAt for r in repository.get_stock_reports("v1", since=0)] == [150]
+        assert repository.get_venue("v1").name == "Library"
+        
+        repository.save_user_presence("u1", "helper", True, 37.7749, -122.4194, "tile_1_2", 100)
+    finally:
+        repository.stop_write_behind()
+    
+    assert [p["userId"] for p in repository.get_active_presence_in_geos(["tile_1_2"], 100, ttl_min=15)] == ["u1"]
+
+
+def test_storage_reads_other_workers_writes(tmp_path, monkeypatch):
+    """Test storage in SQLite mode reads the database, so writes by other processes show up."""
+    path = str(tmp_path / "shared.db")
+    monkeypatch.setattr(storage, "_sqlite", SQLiteStore(SQLiteDatabase(path)))
+    monkeypatch.setattr(storage, "_loaded", True)
+    monkeypatch.setattr(storage, "_write_queue", WriteBehindQueue(storage._flush_writes, max_age_s=60))
+    other = SQLiteStore(SQLiteDatabase(path))  # Another worker's connections
+    
+    storage.start_write_behind()
+    try:
+        storage.create_request({"id": "r1", "lat": 37.7749, "lng": -122.4194, "urgency": "urgent"})
+        storage.create_helper(_helper("mine", 37.7750, -122.4195, inventory=PRODUCT_TAMPON))
+        other.create_helper(_helper("theirs", 37.7790, -122.4194, inventory=PRODUCT_PAD))
+        
+        # Own queued writes are committed before reading
+        assert storage.get_request("r1")["geohash"] == "9q8yyk"
+        assert [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194)] == ["mine", "theirs"]
+        cells = storage.iter_helper_cells(37.7749, -122.4194, need=PRODUCT_PAD)
+        assert [h["id"] for _, helpers in cells for h in helpers] == ["theirs"]
+        assert [h["id"] for h in storage.get_cell_helpers("9q8yym")] == ["theirs"]
+        
+        assert storage.update_helper_inventory("theirs", PRODUCT_TAMPON)["inventory"] == PRODUCT_TAMPON
+        storage.record_match_attempts([("r1", [{"helperId": "mine"}])], {"topK": 1})
+        assert storage.get_match_versions("r1", ["9q8yyk"]) is None  # Not cacheable
+    finally:
+        storage.stop_write_behind()
+    
+    assert other.get_request("r1")["id"] == "r1"
+    assert other.get_helper("theirs")["inventory"] == PRODUCT_TAMPON
+    assert other.db.connection().execute("SELECT request_id FROM match_attempts").fetchall() == [("r1",)]
+    assert storage._helpers_store == {} and storage._helpers_by_geohash == {}
+    storage._sqlite.db.close()
+    other.db.close()
+
+
+def test_get_cell_helpers_keeps_cell_and_order(db):
+    """Test cell lookups return only the cell's helpers, in first-stored order."""
+    store = SQLiteStore(db)
+    store.create_helpers([
+        _helper("b", 37.7752, -122.4194),
+        _helper("a", 37.7750, -122.4195, inventory=PRODUCT_TAMPON),
+        _helper("next_cell", 37.7800, -122.4194),
+    ])
+    store.create_helper(_helper("b", 37.7753, -122.4194))  # Update keeps its place
+    
+    assert [h["id"] for h in store.get_cell_helpers("9q8yyk")] == ["b", "a"]
+    assert [h["id"] for h in store.get_cell_helpers("9q8yyk", need=PRODUCT_PAD)] == ["b"]
+    assert [h["id"] for h in store.get_cell_helpers("9q8yym")] == ["next_cell"]
+
+
+def test_import_opens_no_database(tmp_path):
+    """Test importing the app in SQLite mode creates no database until first use."""
+    app_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = tmp_path / "ai_service.db"
+    script = (
+        "import os, sys\n"
+        "import ai_service.api.routes\n"
+        "from ai_service.repo import repo\n"
+        "print(os.path.exists(sys.argv[1]))\n"
+        "repo.start_write_behind()\n"
+        "repo.stop_write_behind()\n"
+        "print(os.path.exists(sys.argv[1]))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script, str(path)],
+        env=dict(os.environ, STORAGE_BACKEND="sqlite", SQLITE_PATH=str(path), PYTHONPATH=app_root),
+        cwd=str(tmp_path),
+        capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    
+    assert out == ["False", "True"]
@@ -0,0 +1,285 @@
+"""
+Unit tests for the mock storage layer.
+Tests geohash indexing and spatial candidate lookup.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ai_service import storage
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Point storage at a temp file and start from empty stores."""
+    monkeypatch.setattr(storage, "STORAGE_FILE", str(tmp_path / "storage.json"))
+    monkeypatch.setattr(storage, "_requests_store", {})
+    monkeypatch.setattr(storage, "_helpers_store", {})
+    monkeypatch.setattr(storage, "_helpers_by_geohash", {})
+    monkeypatch.setattr(storage, "_helpers_by_product", {})
+
+
+def _helper(helper_id: str, lat: float, lng: float, available: bool = True):
+    return {
+        "id": helper_id,
+        "lat": lat,
+        "lng": lng,
+        "rating": 0.8,
+        "available": available,
+        "updatedAt": "2024-01-01T00:00:00Z",
+    }
+
+
+def test_create_request_stores_geohash():
+    """Test that created requests carry a geohash."""
+    request = storage.create_request({
+        "id": "req1",
+        "lat": 37.7749,
+        "lng": -122.4194,
+        "urgency": "urgent",
+        "productNeed": "tampon",
+        "createdAt": "2024-01-01T00:00:00Z",
+    })
+    
+    assert request["geohash"] == "9q8yyk"
+    assert storage.get_request("req1")["geohash"] == "9q8yyk"
+
+
+def test_get_helpers_near_uses_geohash_cells():
+    """Test that only helpers in the query cell or its neighbors are returned."""
+    storage.create_helper(_helper("near", 37.7750, -122.4194))
+    storage.create_helper(_helper("far", 40.7128, -74.0060))  # New York
+    storage.create_helper(_helper("busy", 37.7750, -122.4194, available=False))
+    
+    helpers = storage.get_helpers_near(37.7749, -122.4194)
+    
+    assert [h["id"] for h in helpers] == ["near"]
+
+
+def test_create_helper_reindexes_on_move():
+    """Test that re-creating a helper moves it between geohash cells."""
+    storage.create_helper(_helper("mover", 40.7128, -74.0060))
+    assert storage.get_helpers_near(37.7749, -122.4194) == []
+    
+    storage.create_helper(_helper("mover", 37.7750, -122.4194))
+    
+    assert [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194)] == ["mover"]
+    assert storage.get_helpers_near(40.7128, -74.0060) == []
+
+
+def test_iter_helper_cells_nearest_first():
+    """Test cells come nearest first and cover the get_helpers_near cells."""
+    storage.create_helper(_helper("center", 37.7750, -122.4194))
+    storage.create_helper(_helper("east", 37.7750, -122.4070))
+    storage.create_helper(_helper("busy", 37.7750, -122.4194, available=False))
+    storage.create_helper(_helper("far", 40.7128, -74.0060))
+    
+    cells = list(storage.iter_helper_cells(37.7749, -122.4194))
+    dists = [d for d, _ in cells]
+    ids = [h["id"] for _, helpers in cells for h in helpers]
+    
+    assert dists == sorted(dists)
+    assert dists[0] == 0.0
+    assert ids == ["center", "east"]
+    assert sorted(ids) == sorted(h["id"] for h in storage.get_helpers_near(37.7749, -122.4194))
+
+
+def test_iter_helper_cells_grows_to_max_radius_lazily(monkeypatch):
+    """Test the bounded search reaches helpers past the 3x3 cells and lists rings only as needed."""
+    from ai_service.matching import rank_helpers_bounded
+    
+    storage.create_helper(_helper("ring3", 37.7869, -122.4194))  # ~1.3 km north
+    request = {"id": "req1", "lat": 37.7749, "lng": -122.4194, "urgency": "normal"}
+    weights = {"urgency": 0.5, "proximity": 0.3, "trust": 0.2}
+    
+    def ranked(**kwargs):
+        cells = storage.iter_helper_cells(37.7749, -122.4194, **kwargs)
+        return [c["id"] for c in rank_helpers_bounded(request, cells, weights, top_k=3).candidates]
+    
+    assert ranked() == ["ring3"]
+    assert ranked(max_radius_m=500) == []
+    
+    # Once the center cell fills the top K, farther rings are never listed
+    for i in range(3):
+        storage.create_helper(_helper(f"center{i}", 37.7750, -122.4194))
+    listed = []
+    ring = storage.geohash_ring
+    monkeypatch.setattr(storage, "geohash_ring", lambda cell, k: listed.append(k) or ring(cell, k))
+    
+    assert ranked() == ["center0", "center1", "center2"]
+    assert max(listed) <= 2
+
+
+def test_get_helpers_near_expands_rings_until_limit():
+    """Test the search grows past the 3x3 cells only while short of the limit."""
+    for i in range(3):
+        storage.create_helper(_helper(f"center{i}", 37.7750, -122.4194))
+    storage.create_helper(_helper("ring2", 37.7839, -122.4194))
+    storage.create_helper(_helper("ring1", 37.7809, -122.4194))
+    
+    ids = [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194, limit=10)]
+    assert sorted(ids[:3]) == ["center0", "center1", "center2"]
+    assert ids[3:] == ["ring1", "ring2"]
+    
+    ids = [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194, limit=4)]
+    assert sorted(ids) == ["center0", "center1", "center2", "ring1"]
+
+
+def test_get_helpers_near_stops_at_max_radius():
+    """Test the search never grows beyond the max radius."""
+    storage.create_helper(_helper("ring3", 37.7899, -122.4194))
+    
+    assert [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194)] == ["ring3"]
+    assert storage.get_helpers_near(37.7749, -122.4194, max_radius_m=500) == []
+
+
+def test_product_index_and_inventory_update():
+    """Test lookups by product use the inventory index and follow cheap updates."""
+    from ai_service.matching import PRODUCT_PAD, PRODUCT_TAMPON
+    
+    storage.create_helper(dict(_helper("pads_only", 37.7750, -122.4194), inventory=PRODUCT_PAD))
+    storage.create_helper(dict(_helper("both", 37.7751, -122.4194), inventory=PRODUCT_PAD | PRODUCT_TAMPON))
+    storage.create_helper(_helper("unreported", 37.7752, -122.4194))
+    
+    def near(need):
+        return sorted(h["id"] for h in storage.get_helpers_near(37.7749, -122.4194, need=need))
+    
+    assert near(0) == ["both", "pads_only", "unreported"]
+    assert near(PRODUCT_TAMPON) == ["both", "unreported"]
+    
+    before = storage.get_match_versions("req1", ["9q8yyk"])
+    updated = storage.update_helper_inventory("pads_only", PRODUCT_TAMPON)
+    
+    assert updated["inventory"] == PRODUCT_TAMPON
+    assert updated["geohash"] == "9q8yyk"
+    assert near(PRODUCT_TAMPON) == ["both", "pads_only", "unreported"]
+    assert near(PRODUCT_PAD) == ["both", "unreported"]
+    assert storage.get_match_versions("req1", ["9q8yyk"]) != before
+    assert storage.update_helper_inventory("missing", PRODUCT_PAD) is None
+
+
+def test_cell_index_keeps_insertion_order():
+    """Test helpers in a cell come back in the order they were stored, across re-saves."""
+    from ai_service.matching import PRODUCT_PAD, PRODUCT_TAMPON
+    
+    ids = [f"tied_{i}" for i in range(8)]
+    for helper_id in ids:
+        storage.create_helper(_helper(helper_id, 37.7750, -122.4194))
+    
+    def near(need=0):
+        return [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194, need=need)]
+    
+    assert near() == ids
+    
+    # Re-saving in place and dropping a product keep the remaining order
+    storage.create_helper(_helper("tied_2", 37.7750, -122.4194))
+    storage.update_helper_inventory("tied_5", PRODUCT_TAMPON)
+    assert near() == ids
+    assert near(PRODUCT_TAMPON) == ids
+    assert near(PRODUCT_PAD) == [i for i in ids if i != "tied_5"]
+    
+    # A helper that leaves and re-enters the cell goes last
+    storage.create_helper(_helper("tied_0", 40.7128, -74.0060))
+    storage.create_helper(_helper("tied_0", 37.7750, -122.4194))
+    assert near() == ids[1:] + ["tied_0"]
+
+
+def test_recovery_replays_snapshot_and_log(monkeypatch):
+    """Test a restart rebuilds the stores and index from snapshot plus log tail."""
+    from ai_service.matching import PRODUCT_PAD
+    
+    storage.create_helper(_helper("before", 37.7750, -122.4194))
+    storage.compact()
+    storage.create_helper(_helper("after", 37.7751, -122.4194))
+    storage.create_helper(_helper("before", 37.7752, -122.4194, available=False))
+    storage.update_helper_inventory("after", PRODUCT_PAD)
+    storage.create_request({
+        "id": "req1", "lat": 37.7749, "lng": -122.4194, "urgency": "urgent",
+        "productNeed": "pad", "createdAt": "2024-01-01T00:00:00Z",
+    })
+    expected = {h["id"]: dict(h) for h in storage.list_helpers()}
+    
+    # Simulate a restart: empty stores, then recover from disk
+    storage._get_wal().close()
+    monkeypatch.setattr(storage, "_requests_store", {})
+    monkeypatch.setattr(storage, "_helpers_store", {})
+    monkeypatch.setattr(storage, "_helpers_by_geohash", {})
+    monkeypatch.setattr(storage, "_helpers_by_product", {})
+    storage._load_from_file()
+    
+    assert {h["id"]: h for h in storage.list_helpers()} == expected
+    assert storage.get_request("req1")["geohash"] == "9q8yyk"
+    assert [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194, need=PRODUCT_PAD)] == ["after"]
+
+
+def test_write_behind_defers_log_writes_until_flushed(monkeypatch):
+    """Test writes apply to memory at once and reach the log in order on stop."""
+    from ai_service.write_behind import WriteBehindQueue
+    
+    monkeypatch.setattr(storage, "_write_queue", WriteBehindQueue(storage._flush_writes, max_age_s=60))
+    storage.start_write_behind()
+    try:
+        storage.create_helper(_helper("a", 37.7750, -122.4194))
+        storage.create_helper(_helper("a", 37.7751, -122.4194, available=False))
+        assert [h["id"] for h in storage.list_helpers()] == ["a"]
+        assert list(storage._get_wal().replay()) == []
+    finally:
+        storage.stop_write_behind()
+    
+    records = list(storage._get_wal().replay())
+    assert [r["data"]["available"] for r in records] == [True, False]
+
+
+def test_binary_snapshot_recovery_decodes_lazily(monkeypatch):
+    """Test a binary snapshot restores the indexes and decodes helpers on access."""
+    from ai_service.snapshot import LazyRecords
+    
+    monkeypatch.setenv("STORAGE_SNAPSHOT_FORMAT", "binary")
+    storage.create_helper(_helper("near", 37.7750, -122.4194))
+    storage.create_helper(_helper("far", 40.7128, -74.0060))
+    storage.create_request({
+        "id": "req1", "lat": 37.7749, "lng": -122.4194, "urgency": "urgent",
+        "createdAt": "2024-01-01T00:00:00Z",
+    })
+    storage.compact()
+    storage.create_helper(_helper("after", 37.7751, -122.4194))
+    expected = {h["id"]: dict(h) for h in storage.list_helpers()}
+    
+    # Simulate a restart
+    storage._get_wal().close()
+    monkeypatch.setattr(storage, "_requests_store", {})
+    monkeypatch.setattr(storage, "_helpers_store", {})
+    monkeypatch.setattr(storage, "_helpers_by_geohash", {})
+    monkeypatch.setattr(storage, "_helpers_by_product", {})
+    storage._load_from_file()
+    
+    assert isinstance(storage._helpers_store, LazyRecords)
+    assert [h["id"] for h in storage.get_helpers_near(37.7749, -122.4194)] == ["near", "after"]
+    assert storage._helpers_store.pending == 1  # "far" was never read
+    assert storage.get_request("req1")["geohash"] == "9q8yyk"
+    assert {h["id"]: h for h in storage.list_helpers()} == expected
+
+
+def test_import_loads_nothing_until_first_use(tmp_path):
+    """Test importing the app reads no data and storage loads on first access."""
+    app_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = tmp_path / "storage.json"
+    path.write_text(json.dumps({"requests": {}, "helpers": {"h1": _helper("h1", 37.7750, -122.4194)}}))
+    script = (
+        "import ai_service.api.routes\n"
+        "from ai_service import storage\n"
+        "print(storage._loaded, len(storage._helpers_store))\n"
+        "print([h['id'] for h in storage.get_helpers_near(37.7749, -122.4194)], storage._loaded)\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        env=dict(os.environ, STORAGE_FILE=str(path), PYTHONPATH=app_root),
+        cwd=str(tmp_path),
+        capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    
+    assert out == ["False 0", "['h1'] True"]
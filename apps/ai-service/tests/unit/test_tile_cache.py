@@ -0,0 +1,94 @@
+"""
+Unit tests for the tile neighbor/covering LRU cache.
+Tests hit/miss accounting, eviction, and covering soundness.
+"""
+
+import random
+
+import pytest
+
+from ai_service.geo import cover_circle, haversine_meters, lat_lng_to_tile_key, tile_key_bounds, unpack_tile_key
+from ai_service.tile_cache import TileCache
+
+
+def test_neighbors_hits_and_misses():
+    """Test repeated lookups in the same radius bucket hit the cache."""
+    cache = TileCache(maxsize=10, radius_bucket_m=50)
+    tile = lat_lng_to_tile_key(37.7749, -122.4194)
+    
+    first = cache.neighbors(tile, 400)
+    second = cache.neighbors(tile, 380)  # Same 50m bucket
+    
+    assert isinstance(first, frozenset)
+    assert first is second
+    assert tile in first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hitRate"] == 0.5
+
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted at maxsize."""
+    cache = TileCache(maxsize=2)
+    a = lat_lng_to_tile_key(37.7749, -122.4194)
+    b = lat_lng_to_tile_key(40.7128, -74.0060)
+    c = lat_lng_to_tile_key(51.5074, -0.1278)
+    
+    cache.neighbors(a, 400)
+    cache.neighbors(b, 400)
+    cache.neighbors(a, 400)  # a is now most recent
+    cache.neighbors(c, 400)  # evicts b
+    
+    assert cache.stats()["size"] == 2
+    cache.neighbors(a, 400)
+    assert cache.stats()["hits"] == 2
+    cache.neighbors(b, 400)
+    assert cache.stats()["misses"] == 4
+
+
+@pytest.mark.parametrize("grid", ["legacy", "banded"])
+def test_cached_covering_is_sound_for_points_in_tile(grid):
+    """Test a cached covering holds for any query point in the source tile."""
+    cache = TileCache(radius_bucket_m=50)
+    rng = random.Random(3)
+    tile = lat_lng_to_tile_key(10.0, 2.0, 200, grid)
+    min_lat, min_lng, max_lat, max_lng = tile_key_bounds(tile, 200, grid)
+    
+    for _ in range(20):
+        q_lat = rng.uniform(min_lat, max_lat)
+        q_lng = rng.uniform(min_lng, max_lng)
+        if lat_lng_to_tile_key(q_lat, q_lng, 200, grid) != tile:
+            continue
+        radius = rng.uniform(300, 1000)
+        covering = cache.covering(q_lat, q_lng, radius, 200, grid)
+        
+        for _ in range(200):
+            p_lat = q_lat + rng.uniform(-0.01, 0.01)
+            p_lng = q_lng + rng.uniform(-0.01, 0.01)
+            dist = haversine_meters(q_lat, q_lng, p_lat, p_lng)
+            key = lat_lng_to_tile_key(p_lat, p_lng, 200, grid)
+            if dist <= radius:
+                assert key in covering.tiles
+            if key in covering.inside:
+                assert dist <= radius
+
+
+@pytest.mark.parametrize("grid", ["legacy", "banded"])
+def test_cached_covering_matches_cover_circle(grid):
+    """Test cached coverings are trimmed to the query point's exact covering."""
+    cache = TileCache(radius_bucket_m=50)
+    rng = random.Random(7)
+    
+    for _ in range(100):
+        lat = 37.7749 + rng.uniform(-0.002, 0.002)  # A few hot tiles
+        lng = -122.4194 + rng.uniform(-0.002, 0.002)
+        radius = rng.uniform(100, 2000)
+        cached = cache.covering(lat, lng, radius, 200, grid)
+        exact = cover_circle(lat, lng, radius, 200, grid)
+        
+        assert cached.inside == exact.inside
+        assert exact.tiles <= cached.tiles
+        # At most one boundary tile per row end that the row walk skips
+        rows = {unpack_tile_key(key)[0] for key in cached.tiles}
+        assert len(cached.tiles - exact.tiles) <= 2 * len(rows)
+    assert cache.stats()["hits"] > 0
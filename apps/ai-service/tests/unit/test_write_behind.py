@@ -0,0 +1,142 @@
+"""
+Unit tests for the write-behind persistence queue.
+Tests batching by size and age, backpressure, flushing, errors and shutdown.
+"""
+
+import threading
+import time
+
+import pytest
+
+from ai_service.write_behind import WriteBehindFull, WriteBehindQueue
+
+
+class _Sink:
+    """Records flushed batches; can be paused to simulate a slow disk."""
+    
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+    
+    def __call__(self, batch):
+        self.gate.wait()
+        self.batches.append(list(batch))
+    
+    @property
+    def items(self):
+        return [item for batch in self.batches for item in batch]
+
+
+def test_writes_synchronously_when_not_running():
+    """Test puts before start and after stop are written immediately."""
+    sink = _Sink()
+    writes = WriteBehindQueue(sink)
+    writes.put(1)
+    assert sink.batches == [[1]]
+    
+    writes.start()
+    writes.stop()
+    writes.put(2)
+    assert sink.batches == [[1], [2]]
+    assert writes.enqueued == 0
+
+
+def test_batches_by_size_and_stop_flushes_everything():
+    """Test full batches are flushed and stop writes the remainder in order."""
+    sink = _Sink()
+    writes = WriteBehindQueue(sink, batch_size=10, max_age_s=60)
+    sink.gate.clear()
+    writes.start()
+    for i in range(25):
+        writes.put(i)
+    sink.gate.set()
+    writes.stop()
+    
+    assert sink.items == list(range(25))
+    assert all(len(batch) <= 10 for batch in sink.batches)
+    assert writes.flushed == 25 and writes.pending() == 0
+
+
+def test_batches_by_age():
+    """Test a partial batch is flushed once its oldest item is old enough."""
+    sink = _Sink()
+    writes = WriteBehindQueue(sink, batch_size=100, max_age_s=0.02)
+    writes.start()
+    try:
+        writes.put("a")
+        deadline = time.monotonic() + 2
+        while not sink.batches and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert sink.batches == [["a"]]
+    finally:
+        writes.stop()
+
+
+def test_flush_writes_queued_items_now():
+    """Test flush returns once everything put before it is written."""
+    sink = _Sink()
+    writes = WriteBehindQueue(sink, batch_size=100, max_age_s=60)
+    writes.start()
+    try:
+        writes.put("a")
+        writes.put("b")
+        writes.flush()
+        assert sink.items == ["a", "b"]
+    finally:
+        writes.stop()
+
+
+def test_backpressure_rejects_puts_while_full():
+    """Test put refuses writes while the queue is full instead of waiting or growing it."""
+    sink = _Sink()
+    writes = WriteBehindQueue(sink, max_size=2, batch_size=1, max_age_s=0)
+    sink.gate.clear()
+    writes.start()
+    
+    # One item is held by the stalled flusher, two fill the queue
+    writes.put(0)
+    while writes.pending():
+        time.sleep(0.001)
+    writes.put(1)
+    writes.put(2)
+    with pytest.raises(WriteBehindFull):
+        writes.put(3)
+    assert writes.pending() == 2
+    
+    sink.gate.set()
+    writes.stop()
+    assert sink.items == [0, 1, 2]
+    assert writes.rejected == 1
+    assert writes.enqueued == 3
+
+
+def test_flush_errors_do_not_stop_the_flusher(caplog):
+    """Test a failing batch is counted and logged with its size, and later batches still flush."""
+    flushed = []
+    
+    def flush(batch):
+        if "bad" in batch:
+            raise OSError("disk full")
+        flushed.extend(batch)
+    
+    writes = WriteBehindQueue(flush, batch_size=2, max_age_s=60, name="test-writes")
+    writes.start()
+    writes.put("bad")
+    writes.put("lost")
+    writes.put("good")
+    writes.stop()
+    
+    assert flushed == ["good"]
+    assert writes.errors == 1
+    assert writes.flushed == 1
+    [record] = caplog.records
+    assert record.levelname == "ERROR"
+    assert record.getMessage() == "test-writes: flush failed, dropped a batch of 2 writes"
+    assert record.exc_info[0] is OSError
+
+
+def test_rejects_empty_sizes():
+    """Test queue sizes must be positive."""
+    with pytest.raises(ValueError):
+        WriteBehindQueue(print, max_size=0)